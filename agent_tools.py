@@ -0,0 +1,27 @@
+"""crewai tools bound to a run workspace."""
+from crewai_tools import FileWriterTool
+
+
+class WorkspaceFileWriterTool(FileWriterTool):
+    """FileWriterTool pinned to one file inside a run workspace.
+
+    Whatever filename or directory the agent asks for, the content lands in
+    `directory/filename`, so runs cannot overwrite each other's documents.
+    """
+
+    directory: str
+    filename: str
+
+    def __init__(self, directory, filename, **kwargs):
+        kwargs.setdefault(
+            "description",
+            f"A tool to save the final document. Provide the full document as 'content'; "
+            f"it is always saved as {filename}.",
+        )
+        super().__init__(directory=directory, filename=filename, **kwargs)
+
+    def _run(self, **kwargs):
+        kwargs["directory"] = self.directory
+        kwargs["filename"] = self.filename
+        kwargs["overwrite"] = "True"
+        return super()._run(**kwargs)
@@ -0,0 +1,178 @@
+"""SQLite store of the structured facts pipelines extract, shared between runs.
+
+The outputs of extraction tasks (the requirements extracted from an SRS, the
+test scenarios extracted from an SRS and SDD) are validated and stored as typed
+records, linked to the hashes of the documents they describe (a run's inputs
+and the documents it generated) and to the models and task prompt that
+produced them. A later run over the same documents, in any session, job or
+batch, takes the record instead of making the extraction call again, as long
+as the models and the extraction prompt are unchanged.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+ARTIFACT_DB_PATH = os.getenv("ARTIFACT_DB_PATH", os.path.join(".cache", "artifacts.sqlite3"))
+ARTIFACTS_ENABLED = os.getenv("ARTIFACTS_ENABLED", "true").lower() not in ("0", "false", "no")
+ARTIFACTS_KEEP_PER_DOCUMENT = int(os.getenv("ARTIFACTS_KEEP_PER_DOCUMENT", "3"))
+
+# Artifact kinds: (description, minimum length of a usable record).
+ARTIFACT_KINDS = {
+    "requirements": ("Functional, non-functional and technical requirements", 200),
+    "scenarios": ("Test scenarios grouped by feature", 100),
+}
+# Pipeline tasks whose outputs are stored and read back, by artifact kind they produce.
+ARTIFACT_TASKS = {
+    "extract_srs": "requirements",
+    "extract_test_scenarios": "scenarios",
+}
+
+_JSON_BLOCK = re.compile(r"```(?:json)?\s*(\{.*\}|\[.*\])\s*```", re.DOTALL)
+
+
+class ArtifactError(ValueError):
+    """A task output is not a valid record of its artifact kind."""
+
+
+class Artifact:
+    """One stored record: the text of a task output and its parsed JSON, if it had any."""
+
+    def __init__(self, id, kind, text, data, pipeline, task, models, prompt, created_at):
+        self.id = id
+        self.kind = kind
+        self.text = text
+        self.data = data
+        self.pipeline = pipeline
+        self.task = task
+        # routing.models_signature() and run_cache.prompt_fingerprint() of the producing task
+        self.models = models
+        self.prompt = prompt
+        self.created_at = created_at
+
+
+def validate_artifact(kind, text):
+    """Return (text, data) for a record of `kind`, raising ArtifactError if it is unusable.
+
+    `text` is kept exactly as given, so a stored task output can stand in for the task
+    without changing the prompts downstream. `data` is the parsed JSON when the output is JSON or contains a fenced JSON block.
+    """
+    if kind not in ARTIFACT_KINDS:
+        raise ArtifactError(f"Unknown artifact kind: {kind}")
+    text = text or ""
+    stripped = text.strip()
+    min_chars = ARTIFACT_KINDS[kind][1]
+    if len(stripped) < min_chars:
+        raise ArtifactError(f"{kind} output is too short to be reused ({len(stripped)} < {min_chars} characters)")
+    data = None
+    match = _JSON_BLOCK.search(stripped)
+    for candidate in (stripped, match.group(1) if match else None):
+        if candidate is None:
+            continue
+        try:
+            data = json.loads(candidate)
+            break
+        except ValueError:
+            continue
+    return text, data
+
+
+class ArtifactStore:
+    """Typed artifact records indexed by document hash."""
+
+    def __init__(self, path=ARTIFACT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " id INTEGER PRIMARY KEY, kind TEXT NOT NULL, text TEXT NOT NULL, data TEXT,"
+                " pipeline TEXT, task TEXT, models TEXT, prompt TEXT, created_at REAL);"
+                "CREATE TABLE IF NOT EXISTS artifact_documents ("
+                " artifact_id INTEGER NOT NULL REFERENCES artifacts (id) ON DELETE CASCADE,"
+                " document_hash TEXT NOT NULL, PRIMARY KEY (document_hash, artifact_id));"
+                "CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, created_at);"
+            )
+            # Stores created before records were keyed on their models and prompt.
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(artifacts)")}
+            for column in ("models", "prompt"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE artifacts ADD COLUMN {column} TEXT")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.commit()
+        return self._conn
+
+    def put(self, kind, text, document_hashes, pipeline=None, task=None, models=None, prompt=None):
+        """Validate and store a record linked to `document_hashes`; returns its ID.
+
+        `models` and `prompt` identify the models and task prompt that produced it.
+        """
+        text, data = validate_artifact(kind, text)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO artifacts (kind, text, data, pipeline, task, models, prompt, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, text, json.dumps(data) if data is not None else None, pipeline, task, models, prompt,
+                     time.time()),
+                )
+                artifact_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT OR IGNORE INTO artifact_documents (artifact_id, document_hash) VALUES (?, ?)",
+                    [(artifact_id, document_hash) for document_hash in set(document_hashes)],
+                )
+        self.prune()
+        return artifact_id
+
+    def latest(self, kind, *document_hashes, task=None, models=None, prompt=None):
+        """Most recent record of `kind` linked to every one of `document_hashes`, or None.
+
+        With `task`, `models` or `prompt`, only records produced by that pipeline task,
+        with those models or from that task prompt are considered.
+        """
+        hashes = sorted(set(document_hashes))
+        placeholders = ", ".join("?" for _ in hashes)
+        filters = {"task": task, "models": models, "prompt": prompt}
+        filters = {column: value for column, value in filters.items() if value is not None}
+        conditions = "".join(f" AND a.{column} = ?" for column in filters)
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT a.id, a.kind, a.text, a.data, a.pipeline, a.task, a.models, a.prompt, a.created_at"
+                " FROM artifacts a JOIN artifact_documents d ON d.artifact_id = a.id"
+                f" WHERE a.kind = ?{conditions} AND d.document_hash IN ({placeholders})"
+                " GROUP BY a.id HAVING COUNT(DISTINCT d.document_hash) = ?"
+                " ORDER BY a.created_at DESC LIMIT 1",
+                [kind, *filters.values(), *hashes, len(hashes)],
+            ).fetchone()
+        if row is None:
+            return None
+        artifact_id, kind, text, data, *rest = row
+        return Artifact(artifact_id, kind, text, json.loads(data) if data else None, *rest)
+
+    def prune(self, keep_per_document=ARTIFACTS_KEEP_PER_DOCUMENT):
+        """Delete records that are not among the newest `keep_per_document` of their kind for any document."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM artifacts WHERE id NOT IN ("
+                    " SELECT artifact_id FROM ("
+                    "  SELECT d.artifact_id, ROW_NUMBER() OVER ("
+                    "   PARTITION BY d.document_hash, a.kind ORDER BY a.created_at DESC) AS rank"
+                    "  FROM artifact_documents d JOIN artifacts a ON a.id = d.artifact_id)"
+                    " WHERE rank <= ?)",
+                    (keep_per_document,),
+                )
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,449 @@
+"""Deterministic assembly of the final SRS, SDD and test case documents.
+
+The last task of each pipeline only reorders and formats the text it is given,
+so instead of another long LLM round trip the upstream output is parsed into a
+tree of markdown sections, the ordering and heading rules of its document type
+in document_layouts.yaml are applied and the document is rendered locally.
+Test cases are parsed into records and rendered as one table per feature.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+
+import yaml
+
+DOCUMENT_LAYOUTS_PATH = os.getenv(
+    "DOCUMENT_LAYOUTS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "document_layouts.yaml")
+)
+DOCUMENT_ASSEMBLY = os.getenv("DOCUMENT_ASSEMBLY", "true").lower() not in ("0", "false", "no")
+
+_RULE_TARGETS = ("after", "before", "into")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_BOLD_LINE = re.compile(r"^(?:\*\*|__)([^*_]+?)(?:\*\*|__):?\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_OUTER_FENCE = re.compile(r"^\s*```(?:markdown|md)?[ \t]*\n(.*?)\n```\s*$", re.DOTALL | re.IGNORECASE)
+_NUMBERING = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+[.)]|[A-Za-z][.)])\s+(?=\S)")
+_WORD = re.compile(r"[a-z0-9]+")
+# "TC-LOGIN-001: Valid login", "Test Case 3 - Valid login", "Test Case: Valid login"
+_CASE_TITLE = re.compile(
+    r"^(?:(TC[-_]?[\w-]*\d[\w-]*)|Test\s+Case(?!s)(?:\s+ID)?\s*#?\s*([\w-]*\d[\w-]*)?)\s*[:.–—-]?\s*(.*)$",
+    re.IGNORECASE,
+)
+_FIELD = re.compile(r"^\s*(?:[-*+]\s+|\d+[.)]\s+)?(?:\*\*|__)?([^:*_|]{2,40}?)\s*(?:\*\*|__)?\s*:\s*(?:\*\*|__)?\s*(.*)$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}")
+
+
+class LayoutError(Exception):
+    """The layouts file is malformed."""
+
+
+@functools.lru_cache(maxsize=None)
+def load_layouts(path=DOCUMENT_LAYOUTS_PATH):
+    """Parse and validate the layouts at `path`, by document file name ({} without a file)."""
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r") as f:
+        layouts = (yaml.safe_load(f) or {}).get("documents") or {}
+    for name, layout in layouts.items():
+        for rule in layout.get("rules") or []:
+            targets = [target for target in _RULE_TARGETS if target in rule]
+            if "move" not in rule or len(targets) != 1:
+                raise LayoutError(f"{name}: a rule needs `move` and one of {', '.join(_RULE_TARGETS)}: {rule}")
+        test_cases = layout.get("test_cases")
+        if test_cases is not None:
+            names = [column.get("name") for column in test_cases.get("columns") or []]
+            if not names or None in names:
+                raise LayoutError(f"{name}: test_cases needs named columns")
+            for key in ("id_column", "title_column"):
+                if test_cases.get(key) and test_cases[key] not in names:
+                    raise LayoutError(f"{name}: {key} {test_cases[key]!r} is not a column")
+        if not isinstance(layout.get("fill") or {}, dict):
+            raise LayoutError(f"{name}: fill maps task names to section names")
+    return layouts
+
+
+def layout_for(file_name):
+    """The layout of document `file_name`, or None when it has none."""
+    return load_layouts().get(file_name)
+
+
+def layout_signature(file_name):
+    """Stable hash of the layout of `file_name`, for cache keys."""
+    payload = json.dumps(layout_for(file_name), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# ================================
+# Section tree
+# ================================
+
+class Section:
+    """A heading with the lines under it (up to its first subsection) and its subsections."""
+
+    def __init__(self, title=None, lines=None, children=None):
+        self.title = title
+        self.lines = lines if lines is not None else []
+        self.children = children if children is not None else []
+
+    @property
+    def key(self):
+        return _key(self.title or "")
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _key(title):
+    title = _NUMBERING.sub("", title.strip().strip("*_`: ")).replace("&", " and ")
+    return " ".join(_WORD.findall(title.lower()))
+
+
+def _names(entry):
+    return [_key(name) for name in (entry if isinstance(entry, list) else [entry])]
+
+
+def _matches(key, names):
+    return any(key == name or key.startswith(name + " ") for name in names)
+
+
+def _unwrap(text):
+    """Drop a code fence around the whole document, as models often add one."""
+    match = _OUTER_FENCE.match(text)
+    return match.group(1) if match else text
+
+
+def parse_sections(text, heading_names=()):
+    """Parse markdown into a tree of Sections under a root without a title.
+
+    Lines that are only bold text count as headings when they name one of
+    `heading_names` (one level below the enclosing heading), since models often
+    write subsections such as **In Scope** that way.
+    """
+    names = [name for entry in heading_names for name in _names(entry)]
+    root = Section()
+    stack = [(0, root, False)]
+    fence = None
+    for line in _unwrap(text).splitlines():
+        if fence:
+            stack[-1][1].lines.append(line)
+            if line.strip().startswith(fence):
+                fence = None
+            continue
+        match = _FENCE.match(line)
+        if match:
+            fence = match.group(1)
+            stack[-1][1].lines.append(line)
+            continue
+        heading = _HEADING.match(line.strip())
+        bold = None if heading else _BOLD_LINE.match(line.strip())
+        if heading:
+            level, title, is_bold = len(heading.group(1)), heading.group(2), False
+        elif bold and _matches(_key(bold.group(1)), names):
+            # A bold heading after another one is its sibling, otherwise a subsection.
+            level = stack[-1][0] if stack[-1][2] else min(stack[-1][0] + 1, 6)
+            title, is_bold = bold.group(1), True
+        else:
+            stack[-1][1].lines.append(line)
+            continue
+        while len(stack) > 1 and stack[-1][0] >= level:
+            stack.pop()
+        section = Section(title)
+        stack[-1][1].children.append(section)
+        stack.append((level, section, is_bold))
+    return root
+
+
+def _find(root, entry, exclude=None):
+    names = _names(entry)
+    for section in root.walk():
+        if section is not root and section is not exclude and _matches(section.key, names):
+            return section
+    return None
+
+
+def _parent(root, section):
+    for candidate in root.walk():
+        if section in candidate.children:
+            return candidate
+    return None
+
+
+def _ordered(sections, order):
+    """Sort `sections` by `order`; unlisted sections keep following the section before them."""
+    ranks = [_names(entry) for entry in order]
+    groups = []
+    for section in sections:
+        rank = next((i for i, names in enumerate(ranks) if _matches(section.key, names)), None)
+        if rank is None and groups:
+            groups[-1][2].append(section)
+        else:
+            groups.append((-1 if rank is None else rank, len(groups), [section]))
+    return [section for _, _, group in sorted(groups, key=lambda group: group[:2]) for section in group]
+
+
+def _apply_rule(root, rule):
+    target = next(target for target in _RULE_TARGETS if target in rule)
+    moved = _find(root, rule["move"])
+    anchor = _find(root, rule[target], exclude=moved) if moved is not None else None
+    if anchor is None or any(section is anchor for section in moved.walk()):
+        return
+    _parent(root, moved).children.remove(moved)
+    if target == "into":
+        anchor.children.append(moved)
+        return
+    siblings = _parent(root, anchor).children
+    siblings.insert(siblings.index(anchor) + (target == "after"), moved)
+
+
+def _trim(lines):
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return lines[start:end]
+
+
+def _clean_title(title, renumber):
+    title = title.strip().strip("*_").strip().rstrip(":").strip()
+    return _NUMBERING.sub("", title) if renumber else title
+
+
+def render_sections(root, title, number_depth=0):
+    """Render a section tree as markdown under an H1 `title`, numbering `number_depth` heading levels."""
+    lines = [f"# {title}", ""]
+    body = _trim(root.lines)
+    if body:
+        lines += body + [""]
+    for i, section in enumerate(root.children):
+        _render(section, 2, [i + 1], number_depth, lines)
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def _render(section, level, number, number_depth, lines):
+    title = _clean_title(section.title, number_depth > 0)
+    if len(number) <= number_depth:
+        title = ".".join(str(n) for n in number) + ("." if len(number) == 1 else "") + f" {title}"
+    lines += [f"{'#' * min(level, 6)} {title}", ""]
+    body = _trim(section.lines)
+    if body:
+        lines += body + [""]
+    for i, child in enumerate(section.children):
+        _render(child, level + 1, number + [i + 1], number_depth, lines)
+
+
+def _without_title(root):
+    """The document's own title and a root whose top-level sections are the ones under it."""
+    if len(root.children) == 1 and not _trim(root.lines):
+        return _clean_title(root.children[0].title, False), Section(None, root.children[0].lines, root.children[0].children)
+    return None, root
+
+
+def _fill(root, text, section, heading_names):
+    """Add to `root` what the earlier upstream output `text` has and `root` lacks.
+
+    With a `section` name the whole output is that section, added when `root` has no
+    section of that name; otherwise each of its top-level sections is added unless
+    `root` has one of the same name.
+    """
+    earlier = _without_title(parse_sections(text, heading_names))[1]
+    if section is not None:
+        if _find(root, section) is None:
+            title = section[0] if isinstance(section, list) else section
+            root.children.append(Section(title, earlier.lines, earlier.children))
+        return
+    for child in earlier.children:
+        if not child.key or _find(root, child.title) is None:
+            root.children.append(child)
+
+
+def assemble_sections(text, layout, earlier=()):
+    """Apply a layout's ordering and heading rules to a markdown document and render it.
+
+    `earlier` holds (task name, text) pairs of upstream outputs that fill in sections the
+    document lacks, named by the layout's `fill` mapping (see _fill).
+    """
+    order = layout.get("order") or []
+    rules = layout.get("rules") or []
+    fill = layout.get("fill") or {}
+    heading_names = list(order) + [rule[key] for rule in rules for key in ("move",) + _RULE_TARGETS if key in rule]
+    title, root = _without_title(parse_sections(text, heading_names))
+    title = title or layout.get("title") or "Document"
+    for name, earlier_text in earlier:
+        _fill(root, earlier_text, fill.get(name), heading_names)
+    if order:
+        root.children = _ordered(root.children, order)
+    for rule in rules:
+        _apply_rule(root, rule)
+    return render_sections(root, title, layout.get("number_depth") or 0)
+
+
+# ================================
+# Test cases
+# ================================
+
+class TestCase:
+    """One test case: its ID, title, feature and field values by column name."""
+
+    def __init__(self, feature="", id=None, title=""):
+        self.feature = feature
+        self.id = id
+        self.title = title
+        self.fields = {}
+
+    def update(self, other):
+        """Fill in the fields this case lacks from `other`, a version of it from another output."""
+        for column, value in other.fields.items():
+            if not any(line.strip() for line in self.fields.get(column, [])):
+                self.fields[column] = value
+
+
+def _columns(layout):
+    return [(column["name"], _names(column.get("fields") or []) + _names(column["name"])) for column in layout["columns"]]
+
+
+def _column_for(label, columns):
+    key = _key(label)
+    return next((name for name, keys in columns if key in keys), None)
+
+
+def _table_cells(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def parse_test_cases(text, layout):
+    """Parse test cases from headings such as `### TC-001: Title`, labelled fields and markdown tables."""
+    columns = _columns(layout)
+    id_column = layout.get("id_column")
+    cases, case, field, feature, table = [], None, None, "", None
+    for line in _unwrap(text).splitlines():
+        stripped = line.strip()
+        if table is not None:
+            if stripped.startswith("|"):
+                if not _TABLE_SEPARATOR.match(stripped):
+                    row = TestCase(feature)
+                    for column, value in zip(table, _table_cells(stripped)):
+                        if column is not None:
+                            row.fields[column] = [part for part in re.split(r"<br\s*/?>", value) if part.strip()]
+                    cases.append(row)
+                continue
+            table = None
+        if stripped.startswith("|"):
+            header = [_column_for(cell, columns) for cell in _table_cells(stripped)]
+            if sum(column is not None for column in header) >= 2:
+                table, case, field = header, None, None
+                continue
+        heading = _HEADING.match(stripped) or _BOLD_LINE.match(stripped)
+        if heading:
+            title = _clean_title(heading.group(heading.lastindex), False)
+            match = _CASE_TITLE.match(title)
+            if match:
+                case, field = TestCase(feature, match.group(1) or None, match.group(3).strip(" *")), None
+                cases.append(case)
+                continue
+            if heading.re is _HEADING:
+                feature, case, field = _clean_title(title, True), None, None
+                continue
+        match = _FIELD.match(line)
+        column = _column_for(match.group(1), columns) if match else None
+        if column is not None:
+            if case is None or (column == id_column and (case.id or case.fields.get(column))):
+                case = TestCase(feature)
+                cases.append(case)
+            case.fields[column] = [match.group(2).strip()] if match.group(2).strip() else []
+            field = column
+        elif case is not None and field is not None and stripped:
+            case.fields[field].append(stripped)
+    return cases
+
+
+def _numbered(cases, layout):
+    """Give every case an ID (from its heading or ID field, or the next free TC-NNN) and a title."""
+    id_column, title_column = layout.get("id_column"), layout.get("title_column")
+    taken = set()
+    for case in cases:
+        case.id = case.id or " ".join(case.fields.get(id_column, [])).strip() or None
+        taken.add(case.id)
+    n = 0
+    for case in cases:
+        while case.id is None or not case.id.strip():
+            n += 1
+            if f"TC-{n:03d}" not in taken:
+                case.id = f"TC-{n:03d}"
+                taken.add(case.id)
+        if id_column:
+            case.fields[id_column] = [case.id]
+        if title_column and case.title and not any(line.strip() for line in case.fields.get(title_column, [])):
+            case.fields[title_column] = [case.title]
+    return cases
+
+
+def _cell(lines):
+    return "<br>".join(line.strip().replace("|", "\\|") for line in lines if line.strip())
+
+
+def assemble_test_cases(texts, layout):
+    """Render the test cases of the last of `texts` that has any as one table per feature.
+
+    Earlier texts (e.g. the generated cases before review) fill in fields the final
+    version of a case lacks. Returns None when no text has parseable test cases.
+    """
+    spec = layout["test_cases"]
+    parsed = [parse_test_cases(text, spec) for text in texts]
+    primary = next((i for i in range(len(parsed) - 1, -1, -1) if parsed[i]), None)
+    if primary is None:
+        return None
+    cases = parsed[primary]
+    for earlier in parsed[:primary]:
+        by_id = {case.id: case for case in earlier if case.id}
+        by_title = {_key(case.title): case for case in earlier if case.title}
+        for case in cases:
+            match = by_id.get(case.id) if case.id else None
+            match = match or (by_title.get(_key(case.title)) if case.title else None)
+            if match is not None:
+                case.update(match)
+    cases = _numbered(cases, spec)
+
+    names = [column["name"] for column in spec["columns"]]
+    lines = [f"# {layout.get('title') or 'Test Cases'}", ""]
+    features = []
+    for case in cases:
+        if case.feature not in features:
+            features.append(case.feature)
+    for feature in features:
+        if feature:
+            lines += [f"## {feature}", ""]
+        lines.append("| " + " | ".join(names) + " |")
+        lines.append("|" + "|".join(" --- " for _ in names) + "|")
+        for case in cases:
+            if case.feature == feature:
+                lines.append("| " + " | ".join(_cell(case.fields.get(name, [])) for name in names) + " |")
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def assemble_document(file_name, texts, names=None):
+    """Assemble document `file_name` from the upstream outputs `texts` (in context order).
+
+    The last output is the document; the earlier ones, produced by the tasks `names`,
+    fill in the test case fields or sections it lacks.
+    """
+    layout = layout_for(file_name)
+    if layout is None:
+        raise LayoutError(f"No layout for {file_name}")
+    outputs = [
+        (name, text) for name, text in zip(names or [None] * len(texts), texts) if text and text.strip()
+    ]
+    if not outputs:
+        return assemble_sections("", layout)
+    texts = [text for _, text in outputs]
+    if layout.get("test_cases"):
+        document = assemble_test_cases(texts, layout)
+        if document is not None:
+            return document
+        return assemble_sections(texts[-1], layout)
+    return assemble_sections(texts[-1], layout, earlier=outputs[:-1])
@@ -0,0 +1,341 @@
+"""Offline benchmark of the pipelines against a deterministic stub LLM.
+
+No provider is contacted: every agent talks to StubLLM, whose provider call
+sleeps for a latency drawn from a configurable distribution and returns a
+canned answer. Everything in front of the provider (response cache, rate
+limiter, deadlines, streaming) runs as in production, so the suite isolates
+orchestration overhead (scheduling, prompt building, tools, caching, file
+handling) from model latency. Each run gets an empty response cache, so every
+call misses it and reaches the stub. All stores are kept in a scratch
+directory that is removed on exit.
+
+For each pipeline and concurrency level the suite reports end-to-end latency,
+per-stage latency, peak traced memory and throughput. Results can be saved as
+a baseline and later runs compared against it; regressions beyond the
+tolerance make the command exit with status 1.
+
+Examples:
+    python benchmark.py --save-baseline
+    python benchmark.py --pipelines generate_srs --concurrency 1 4 16
+    python benchmark.py --latency-dist fixed --latency-mean 0   # pure overhead
+    python benchmark.py --startup                                # cold import time of the app
+"""
+__import__('pysqlite3')
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import argparse
+import atexit
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep benchmark runs away from the real caches, stores, workspaces and metrics, and offline.
+_SCRATCH = tempfile.mkdtemp(prefix="benchmark-")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ["RUN_CACHE_DIR"] = os.path.join(_SCRATCH, "runs")
+os.environ["INGEST_CACHE_DIR"] = os.path.join(_SCRATCH, "ingest")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_SCRATCH, "llm_cache.sqlite3")
+os.environ["ARTIFACT_DB_PATH"] = os.path.join(_SCRATCH, "artifacts.sqlite3")
+os.environ["CHECKPOINT_DIR"] = os.path.join(_SCRATCH, "checkpoints")
+os.environ["REVISIONS_DIR"] = os.path.join(_SCRATCH, "revisions")
+os.environ["BLOB_DIR"] = os.path.join(_SCRATCH, "blobs")
+os.environ["LLM_CASSETTE_MODE"] = "off"
+os.environ["WORKSPACE_ROOT"] = os.path.join(_SCRATCH, "workspaces")
+os.environ["METRICS_DIR"] = os.path.join(_SCRATCH, "metrics")
+os.environ["METRICS_JSONL"] = os.path.join(_SCRATCH, "metrics", "task_metrics.jsonl")
+os.environ["METRICS_PROM"] = os.path.join(_SCRATCH, "metrics", "pipeline_metrics.prom")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+
+from jobs import Job
+from llm import CachedLLM
+from metrics import current_task
+from pipelines import PIPELINES
+from response_cache import LLMCache
+from workspace import Workspace
+
+DEFAULT_BASELINE = os.getenv("BENCHMARK_BASELINE", os.path.join("benchmarks", "baseline.json"))
+DEFAULT_CONCURRENCY = (1, 4, 16)
+
+SAMPLE_DOCUMENT = """# 1. Introduction
+The clinic portal lets patients book appointments and view their records.
+
+## 1.1 Purpose
+Reduce front-desk workload and give patients self-service access.
+
+## 1.2 Scope
+In scope: registration, appointment booking, reminders, EHR summary view.
+Out of scope: billing and insurance claims.
+
+# 2. Functional Requirements
+## 2.1 Patient Registration
+Patients register with email, password and date of birth. Accounts are verified by email.
+
+## 2.2 Appointment Management
+Patients book, reschedule and cancel appointments. Doctors publish available slots.
+
+# 3. Non-Functional Requirements
+Pages load within 2 seconds. PHI is encrypted at rest and in transit (HIPAA).
+"""
+
+
+class StubLLM(CachedLLM):
+    """LLM that never leaves the process: its provider call sleeps a sampled latency and returns a canned answer.
+
+    `responses` maps task names to answers; other tasks get `default_response`.
+    """
+
+    def __init__(self, latency_dist="lognormal", latency_mean=0.05, latency_spread=0.5, seed=0,
+                 responses=None, default_response=None, **kwargs):
+        super().__init__(model="stub/benchmark", **kwargs)
+        self.latency_dist = latency_dist
+        self.latency_mean = latency_mean
+        self.latency_spread = latency_spread
+        self.responses = responses or {}
+        self.default_response = default_response or SAMPLE_DOCUMENT
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _latency(self):
+        if self.latency_mean <= 0:
+            return 0.0
+        with self._random_lock:
+            if self.latency_dist == "fixed":
+                return self.latency_mean
+            if self.latency_dist == "uniform":
+                spread = self.latency_mean * self.latency_spread
+                return self._random.uniform(self.latency_mean - spread, self.latency_mean + spread)
+            # Log-normal with the given median and shape: a long right tail like real providers.
+            return self._random.lognormvariate(0, self.latency_spread) * self.latency_mean
+
+    def _answer(self):
+        time.sleep(max(0.0, self._latency()))
+        task = current_task()
+        answer = self.responses.get(task.task if task else None, self.default_response)
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+    def _complete(self, messages, **kwargs):
+        return self._answer()
+
+    def _stream_tokens(self, messages, params):
+        return iter(re.findall(r"\S+\s*", self._answer()))
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run_once(kind, llm_options, index):
+    # A stub of its own with an empty response cache: every call misses it, like a first run.
+    path = os.path.join(_SCRATCH, "llm", f"{uuid.uuid4().hex}.sqlite3")
+    llm = StubLLM(**dict(llm_options, seed=llm_options.get("seed", 0) + index), cache=LLMCache(path))
+    workspace = Workspace.create()
+    try:
+        for file_name in PIPELINES[kind]["inputs"]:
+            with open(workspace.file_path(file_name), "w") as f:
+                f.write(SAMPLE_DOCUMENT)
+        job = Job(kind, workspace=workspace)
+        started = time.perf_counter()
+        PIPELINES[kind]["run"](workspace, job=job, force=True, llm=llm)
+        return time.perf_counter() - started, job.timings
+    finally:
+        workspace.cleanup()
+
+
+def run_level(kind, concurrency, runs, llm_options):
+    """Run `runs` pipeline executions, `concurrency` at a time, and summarize them."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: _run_once(kind, llm_options, i), range(runs)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durations = [seconds for seconds, _ in results]
+    stages = {}
+    for _, timings in results:
+        for row in timings:
+            stages.setdefault(row["Stage"], []).append(row["Duration (s)"])
+    return {
+        "pipeline": kind,
+        "concurrency": concurrency,
+        "runs": runs,
+        "e2e_p50": round(statistics.median(durations), 3),
+        "e2e_p95": round(_percentile(durations, 0.95), 3),
+        "throughput_per_min": round(runs / elapsed * 60, 2),
+        "peak_memory_mb": round(peak / 1024 / 1024, 1),
+        "stages_p50": {stage: round(statistics.median(values), 3) for stage, values in stages.items()},
+    }
+
+
+# Imports everything app.py imports at startup, in a fresh interpreter.
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+__import__('pysqlite3')
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+import streamlit
+import jobs, pipelines, response_cache, run_cache, workspace
+print(json.dumps({"seconds": time.perf_counter() - started, "crewai_loaded": "crewai" in sys.modules}))
+"""
+
+
+def measure_startup(repeats):
+    """Cold-import the app's modules `repeats` times in new interpreters and summarize."""
+    samples = []
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, "-c", _STARTUP_PROBE], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    seconds = [sample["seconds"] for sample in samples]
+    return {
+        "repeats": repeats,
+        "import_p50": round(statistics.median(seconds), 3),
+        "import_max": round(max(seconds), 3),
+        "crewai_loaded": any(sample["crewai_loaded"] for sample in samples),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for result in results:
+        base = baseline.get(f"{result['pipeline']}@{result['concurrency']}")
+        if not base:
+            continue
+        label = f"{result['pipeline']} x{result['concurrency']}"
+        for metric in ("e2e_p50", "e2e_p95", "peak_memory_mb"):
+            if base[metric] and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{label}: {metric} {base[metric]} -> {result[metric]}")
+        if result["throughput_per_min"] < base["throughput_per_min"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: throughput_per_min {base['throughput_per_min']} -> {result['throughput_per_min']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline orchestration against a stub LLM.")
+    parser.add_argument("--pipelines", nargs="+", choices=sorted(PIPELINES),
+                        default=["generate_srs", "generate_sdd", "generate_test_cases"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--rounds", type=int, default=1, help="Runs per level = concurrency x rounds")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.05,
+                        help="Stub latency in seconds (median for lognormal)")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="Relative half-width (uniform) or sigma (lognormal)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", help="JSON file mapping task names to canned answers")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare with or save")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging")
+    parser.add_argument("--output", help="Also write the full results to this JSON file")
+    parser.add_argument("--startup", action="store_true",
+                        help="Only measure cold import time of the web app (no pipelines are run)")
+    parser.add_argument("--startup-repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return run_startup(args)
+
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+    llm_options = {
+        "latency_dist": args.latency_dist,
+        "latency_mean": args.latency_mean,
+        "latency_spread": args.latency_spread,
+        "seed": args.seed,
+        "responses": responses,
+    }
+
+    results = []
+    for kind in args.pipelines:
+        for concurrency in args.concurrency:
+            result = run_level(kind, concurrency, concurrency * args.rounds, llm_options)
+            results.append(result)
+            print(f"{kind:<22} x{concurrency:<3} e2e p50 {result['e2e_p50']:>7.3f}s  "
+                  f"p95 {result['e2e_p95']:>7.3f}s  {result['throughput_per_min']:>8.2f} runs/min  "
+                  f"peak {result['peak_memory_mb']:>6.1f} MB")
+
+    report = {"settings": llm_options | {"rounds": args.rounds}, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    keyed = {f"{result['pipeline']}@{result['concurrency']}": result for result in results}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        baseline.update({"settings": report["settings"], "results": keyed})
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if "results" not in baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    if baseline.get("settings") != report["settings"]:
+        print("Warning: baseline was recorded with different stub settings; comparison may be meaningless.")
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 1 if regressions else 0
+
+
+def run_startup(args):
+    """--startup mode: measure, then save or compare against the baseline's "startup" entry."""
+    result = measure_startup(args.startup_repeats)
+    print(f"app import p50 {result['import_p50']:.3f}s  max {result['import_max']:.3f}s  "
+          f"crewai loaded at startup: {'yes' if result['crewai_loaded'] else 'no'}")
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        baseline["startup"] = result
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Startup baseline written to {args.baseline}")
+        return 0
+    base = baseline.get("startup")
+    if base and result["import_p50"] > base["import_p50"] * (1 + args.tolerance):
+        print(f"REGRESSION startup: import_p50 {base['import_p50']} -> {result['import_p50']}")
+        return 1
+    if result["crewai_loaded"]:
+        print("REGRESSION startup: crewai is imported at app startup")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
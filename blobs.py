@@ -0,0 +1,127 @@
+"""Content-addressed store for uploaded documents.
+
+Uploads are streamed to disk in fixed-size chunks and hashed while they are
+written, so memory stays flat whatever the document size and no second pass
+is needed to key them. Each blob is stored once under its SHA-256: uploading
+the same file again only refreshes the existing copy, and workspaces hardlink
+the blob instead of copying it (see ingest.ingest_file). The digest is handed on
+to the extraction and run caches, so downstream keys cost nothing to compute.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(".cache", "blobs"))
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "50"))
+BLOB_STORE_MAX_MB = float(os.getenv("BLOB_STORE_MAX_MB", "1000"))
+BLOB_MAX_AGE_DAYS = float(os.getenv("BLOB_MAX_AGE_DAYS", "7"))
+
+_CHUNK_SIZE = 1024 * 1024
+# Blobs used this recently are never evicted: a workspace may still be copying them.
+_IN_USE_SECONDS = 300
+
+
+class UploadTooLarge(ValueError):
+    """An upload exceeded the configured maximum size."""
+
+
+class BlobStore:
+    """Uploaded files stored once per content hash, with age- and size-based eviction."""
+
+    def __init__(self, directory=BLOB_DIR, max_upload_bytes=None, max_bytes=None, max_age_seconds=None):
+        self.directory = directory
+        self.max_upload_bytes = (
+            max_upload_bytes if max_upload_bytes is not None else int(UPLOAD_MAX_MB * 1024 * 1024)
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(BLOB_STORE_MAX_MB * 1024 * 1024)
+        self.max_age_seconds = (
+            max_age_seconds if max_age_seconds is not None else BLOB_MAX_AGE_DAYS * 24 * 3600
+        )
+        self._lock = threading.Lock()
+
+    def path(self, digest):
+        """Path of the blob with SHA-256 `digest`."""
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put_stream(self, stream, name=None):
+        """Store the bytes read from `stream` and return their SHA-256 hex digest.
+
+        Raises UploadTooLarge (naming `name`) as soon as more than the maximum
+        upload size has been read; nothing is stored in that case.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if self.max_upload_bytes and size > self.max_upload_bytes:
+                        raise UploadTooLarge(
+                            f"{name or 'Upload'} is larger than the "
+                            f"{self.max_upload_bytes / (1024 * 1024):.0f} MB limit"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+            key = digest.hexdigest()
+            path = self.path(key)
+            try:
+                # Already stored: keep the existing copy and mark it as recently used.
+                os.utime(path)
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                # Not stored, or evicted by another process since: store this copy.
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        self.evict()
+        return key
+
+    def put_file(self, source_path):
+        """Store a file from disk, read in chunks, and return its SHA-256 hex digest."""
+        with open(source_path, "rb") as f:
+            return self.put_stream(f, name=os.path.basename(source_path))
+
+    def evict(self):
+        """Remove blobs unused for longer than the maximum age, then the least recently used until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime < _IN_USE_SECONDS:
+                        continue
+                    if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                        _remove(path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+
+
+def _remove(path):
+    """Delete a blob file that another thread or process may have deleted already."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+blob_store = BlobStore()
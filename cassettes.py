@@ -0,0 +1,168 @@
+"""Record LLM calls of pipeline runs to a cassette file and replay them offline.
+
+With LLM_CASSETTE_MODE=record every LLM call the agents make is appended to
+the cassette at LLM_CASSETTE_PATH, one JSON line per call holding the task,
+the model, the normalized messages, the sampling parameters, the response and
+how long the call took. With LLM_CASSETTE_MODE=replay the same calls are
+answered from the cassette with no network, no rate limiting and no cost, so
+the rest of the pipeline (tool I/O, file writes, assembly) can be profiled on
+its own and slow production runs can be reproduced locally.
+
+Calls are matched like the response cache matches them (response_cache.LLMCache.key),
+so concurrent tasks may replay in any order. A call with no recording raises
+CassetteMismatch naming the task and showing how its prompt differs from the
+closest recorded one.
+"""
+import difflib
+import json
+import os
+import threading
+
+from response_cache import LLMCache, normalize_messages
+
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join("cassettes", "cassette.jsonl"))
+
+MODES = ("off", "record", "replay")
+_DIFF_LINES = 40
+
+
+class CassetteError(Exception):
+    """A cassette setting or file is invalid."""
+
+
+class CassetteMismatch(Exception):
+    """A replayed LLM call has no matching recording in the cassette."""
+
+
+class Cassette:
+    """LLM calls recorded to, or replayed from, one JSON lines file."""
+
+    def __init__(self, path, mode):
+        if mode not in ("record", "replay"):
+            raise CassetteError(f"Cassette mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries = None
+        self._responses = {}
+        self._served = {}
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def record(self, task, model, messages, params, response, seconds):
+        """Append one call to the cassette; the first call of the process starts the file afresh."""
+        entry = {
+            "key": LLMCache.key(model, messages, params),
+            "task": task,
+            "model": model,
+            "messages": normalize_messages(messages),
+            "params": params,
+            "response": response,
+            "seconds": round(seconds, 3),
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def replay(self, task, model, messages, params):
+        """Return the recorded response of a call, or raise CassetteMismatch when there is none.
+
+        A call made more often than it was recorded gets its last recorded response again.
+        """
+        key = LLMCache.key(model, messages, params)
+        with self._lock:
+            self._load()
+            responses = self._responses.get(key)
+            if responses is None:
+                raise CassetteMismatch(self._explain(task, model, messages))
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return responses[min(served, len(responses) - 1)]
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            raise CassetteError(f"Cassette {self.path} does not exist; record it first with LLM_CASSETTE_MODE=record")
+        except ValueError as e:
+            raise CassetteError(f"Cassette {self.path} is not valid JSON lines: {e}")
+        for entry in entries:
+            self._responses.setdefault(entry["key"], []).append(entry["response"])
+        self._entries = entries
+
+    def _explain(self, task, model, messages):
+        """Describe how a call differs from the closest recording (same task first, then any)."""
+        messages = normalize_messages(messages)
+        heading = f"No recorded LLM response in {self.path} for task {task!r} (model {model})"
+        candidates = [entry for entry in self._entries if entry["task"] == task] or self._entries
+        if not candidates:
+            return f"{heading}: the cassette is empty"
+
+        def shared_prefix(entry):
+            count = 0
+            for recorded, current in zip(entry["messages"], messages):
+                if recorded != current:
+                    break
+                count += 1
+            return count
+
+        closest = max(candidates, key=shared_prefix)
+        if closest["model"] != model:
+            return f"{heading}: the closest recording, of task {closest['task']!r}, used model {closest['model']}"
+        index = shared_prefix(closest)
+        if index == len(messages) == len(closest["messages"]):
+            return f"{heading}: the prompt matches a recording of task {closest['task']!r} but the parameters differ"
+        if index >= len(closest["messages"]) or index >= len(messages):
+            return (
+                f"{heading}: the call has {len(messages)} messages where the closest recording, "
+                f"of task {closest['task']!r}, has {len(closest['messages'])}"
+            )
+        recorded, current = closest["messages"][index], messages[index]
+        diff = list(difflib.unified_diff(
+            recorded["content"].splitlines(), current["content"].splitlines(),
+            fromfile="recorded", tofile="current", lineterm="",
+        ))
+        if len(diff) > _DIFF_LINES:
+            diff = diff[:_DIFF_LINES] + [f"... ({len(diff) - _DIFF_LINES} more diff lines)"]
+        if recorded["role"] != current["role"]:
+            diff.insert(0, f"role: {recorded['role']} -> {current['role']}")
+        return (
+            f"{heading}: message {index + 1} differs from the closest recording, "
+            f"of task {closest['task']!r}:\n" + "\n".join(diff)
+        )
+
+
+_active = None
+_configured = False
+_active_lock = threading.Lock()
+
+
+def use_cassette(path, mode):
+    """Record or replay the LLM calls of LLMs built from now on with the cassette at `path` ("off" stops)."""
+    global _active, _configured
+    if mode not in MODES:
+        raise CassetteError(f"Cassette mode must be one of {', '.join(MODES)}, not {mode!r}")
+    with _active_lock:
+        _active = None if mode == "off" else Cassette(path, mode)
+        _configured = True
+    return _active
+
+
+def active_cassette():
+    """The cassette set by use_cassette(), else the one configured by LLM_CASSETTE_MODE and LLM_CASSETTE_PATH."""
+    if not _configured:
+        use_cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE)
+    return _active
@@ -0,0 +1,85 @@
+"""Per-task checkpoints of pipeline runs that have not finished yet.
+
+Every task output of a run is saved as soon as the task completes, under a key
+derived like the run cache key from the pipeline, the input document hashes,
+the models and the prompts. When a run fails (a timeout, a rate limit, a
+malformed tool call) the next run with the same key restores the completed
+tasks and starts from the first incomplete one; changing an input or a prompt
+changes the key, so stale outputs are never reused. A successful run clears
+its checkpoints, since the run cache takes over from there.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join(".cache", "checkpoints"))
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "48"))
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+_SAFE_NAME = re.compile(r"^[\w.-]+$")
+
+
+class CheckpointStore:
+    """Task outputs of unfinished runs, one directory per run key and one file per task."""
+
+    def __init__(self, directory=CHECKPOINT_DIR, max_age_seconds=None):
+        self.directory = directory
+        self.max_age_seconds = (
+            max_age_seconds if max_age_seconds is not None else CHECKPOINT_MAX_AGE_HOURS * 3600
+        )
+        self._lock = threading.Lock()
+
+    def _run_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """Return {task name: output text} saved for the run `key` ({} when there is none)."""
+        self.purge()
+        run_dir = self._run_dir(key)
+        outputs = {}
+        try:
+            names = os.listdir(run_dir)
+        except FileNotFoundError:
+            return outputs
+        for name in names:
+            if not name.endswith(".md"):
+                continue
+            try:
+                with open(os.path.join(run_dir, name), "r", encoding="utf-8") as f:
+                    outputs[name[:-3]] = f.read()
+            except FileNotFoundError:
+                # Cleared by a run that just finished or purged; the task simply runs again.
+                continue
+        return outputs
+
+    def save(self, key, task_name, text):
+        """Save the output of `task_name` for the run `key`."""
+        if not _SAFE_NAME.match(task_name):
+            raise ValueError(f"Task name cannot be used as a checkpoint file name: {task_name!r}")
+        run_dir = self._run_dir(key)
+        os.makedirs(run_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=run_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, os.path.join(run_dir, f"{task_name}.md"))
+
+    def clear(self, key):
+        """Drop the checkpoints of the run `key`, e.g. once it succeeded or regeneration is forced."""
+        shutil.rmtree(self._run_dir(key), ignore_errors=True)
+
+    def purge(self):
+        """Remove the checkpoints of runs not touched for longer than the maximum age."""
+        if not self.max_age_seconds:
+            return
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            try:
+                entries = list(os.scandir(self.directory))
+            except FileNotFoundError:
+                return
+            for entry in entries:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
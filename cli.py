@@ -0,0 +1,233 @@
+"""Headless batch runner for the SRS, SDD and test case pipelines.
+
+Examples:
+    python cli.py srs brds/ --parallel 4
+    python cli.py sdd "exports/*srs*.md" --output-dir sdds
+    python cli.py testcases project/ --manifest testcases_manifest.json
+    python cli.py testcases project/ --sharded
+    python cli.py chain brds/ --parallel 2
+    python cli.py srs brds/portal_brd_v4.md --incremental
+    python cli.py srs brds/ --record cassettes/brds.jsonl
+    python cli.py srs brds/ --replay cassettes/brds.jsonl --force
+
+For `testcases`, each input is an SRS document; its SDD is the sibling file
+with "srs" replaced by "sdd" in the name (e.g. portal_srs.md -> portal_sdd.md).
+
+Running a command again after some documents failed, or were only partly generated
+because a task ran out of its deadline, resumes each of them from its first incomplete
+task (see checkpoints.py); --force starts them over.
+
+Outputs are named after their input, e.g. portal_brd.srs1.md; inputs from different
+directories keep their path relative to the directory all inputs share, so
+brds/a/spec.md and brds/b/spec.md write a/spec.srs1.md and b/spec.srs1.md.
+
+--record saves every LLM call of the run to a cassette and --replay answers the
+calls from it with no network (see cassettes.py). Add --force when replaying
+documents the run cache already holds, or nothing runs at all.
+"""
+__import__('pysqlite3')
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from cassettes import use_cassette
+from jobs import Job
+from pipelines import PIPELINES, PartialRun
+from revisions import RevisedRun, revision_lineage
+from run_cache import CachedRun
+from workspace import Workspace
+
+COMMANDS = {
+    "srs": "generate_srs",
+    "sdd": "generate_sdd",
+    "testcases": "generate_test_cases",
+    "chain": "generate_full_chain",
+}
+DOCUMENT_EXTENSIONS = (".txt", ".md", ".pdf")
+
+
+def expand_inputs(patterns):
+    """Resolve files, directories and glob patterns to a sorted list of document paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern)
+        paths.update(
+            path for path in candidates
+            if os.path.isfile(path) and path.lower().endswith(DOCUMENT_EXTENSIONS)
+        )
+    return sorted(paths)
+
+
+def find_sdd_for(srs_path):
+    """Return the SDD sibling of an SRS document, or None if there is none."""
+    directory, name = os.path.split(srs_path)
+    if "srs" not in name.lower():
+        return None
+    stem = re.sub("srs", "sdd", os.path.splitext(name)[0], flags=re.IGNORECASE)
+    for extension in DOCUMENT_EXTENSIONS:
+        candidate = os.path.join(directory, stem + extension)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def collect_jobs(kind, paths):
+    """Map each input document to the workspace files it provides.
+
+    Returns (jobs, failures) where jobs is a list of (source path, {workspace file: path}).
+    """
+    jobs, failures = [], []
+    for path in paths:
+        if kind in ("generate_srs", "generate_full_chain"):
+            jobs.append((path, {"brd.txt": path}))
+        elif kind == "generate_sdd":
+            jobs.append((path, {"srs.txt": path}))
+        elif "sdd" in os.path.basename(path).lower():
+            continue  # SDDs are picked up alongside their SRS
+        else:
+            sdd_path = find_sdd_for(path)
+            if sdd_path:
+                jobs.append((path, {"srs.txt": path, "sdd.txt": sdd_path}))
+            else:
+                failures.append({"input": path, "status": "failed", "error": "No matching SDD document found"})
+    return jobs, failures
+
+
+def output_stems(sources):
+    """Name the outputs of each source after its path relative to the directory all sources share.
+
+    Sources that would still share a name (e.g. spec.md and spec.pdf) keep their extension.
+    """
+    paths = {source: os.path.abspath(source) for source in sources}
+    if not paths:
+        return {}
+    base = os.path.commonpath([os.path.dirname(path) for path in paths.values()])
+    relative = {source: os.path.relpath(path, base) for source, path in paths.items()}
+    stems = {source: os.path.splitext(path)[0] for source, path in relative.items()}
+    counts = Counter(stems.values())
+    return {source: stem if counts[stem] == 1 else relative[source] for source, stem in stems.items()}
+
+
+def run_document(kind, source, files, output_dir, force, incremental=False, sharded=False, stem=None):
+    """Run one pipeline over one document and return its manifest entry.
+
+    Outputs are written to `output_dir` as `{stem}.{output name}` (by default the source's file name stem).
+    """
+    entry = {"input": source, "inputs": files, "pipeline": kind}
+    started = time.perf_counter()
+    workspace = Workspace.create()
+    workspace.hold()
+    job = Job(kind, workspace=workspace)
+    try:
+        for file_name, path in files.items():
+            workspace.add_file(path, file_name)
+        kwargs = {"force": force}
+        if incremental and PIPELINES[kind].get("revisable"):
+            kwargs["lineage"] = revision_lineage(source, scope=os.path.dirname(os.path.abspath(source)))
+        if sharded and kind == "generate_test_cases":
+            kwargs["sharded"] = True
+        result = PIPELINES[kind]["run"](workspace, job=job, **kwargs)
+        stem = stem or os.path.splitext(os.path.basename(source))[0]
+        outputs = []
+        for output_name in PIPELINES[kind]["outputs"]:
+            output_path = os.path.join(output_dir, f"{stem}.{output_name}")
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.copyfile(workspace.file_path(output_name), output_path)
+            outputs.append(output_path)
+        entry.update({
+            "status": "partial" if isinstance(result, PartialRun) else "succeeded",
+            "outputs": outputs,
+            "cached": isinstance(result, CachedRun),
+            "truncated_tasks": result.truncated_tasks if isinstance(result, PartialRun) else None,
+            "revised_sections": result.revised_sections if isinstance(result, RevisedRun) else None,
+            "workspace": workspace.path,
+        })
+    except Exception as e:
+        entry.update({"status": "failed", "error": str(e), "workspace": workspace.path})
+    finally:
+        workspace.release()
+    entry["seconds"] = round(time.perf_counter() - started, 2)
+    entry["stages"] = job.timings
+    entry["resumed_tasks"] = job.resumed_tasks
+    if job.metrics is not None:
+        entry["metrics"] = job.metrics.totals()
+    return entry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-generate SRS, SDD or test case documents.")
+    parser.add_argument("command", choices=sorted(COMMANDS), help="Pipeline to run")
+    parser.add_argument("inputs", nargs="+", help="Input files, directories or glob patterns")
+    parser.add_argument("--parallel", type=int, default=2, help="Documents processed at the same time")
+    parser.add_argument("--output-dir", default="batch_output", help="Directory for generated documents")
+    parser.add_argument("--manifest", help="Manifest path (default: <output-dir>/manifest.json)")
+    parser.add_argument("--force", action="store_true", help="Ignore cached results and regenerate")
+    parser.add_argument("--incremental", action="store_true",
+                        help="srs/sdd: only regenerate sections changed since the previous revision of each input")
+    parser.add_argument("--sharded", action="store_true",
+                        help="testcases: generate and review the test cases of each feature in parallel")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", help="Record every LLM call to this cassette file")
+    cassette.add_argument("--replay", metavar="CASSETTE",
+                          help="Answer every LLM call from this cassette file instead of the provider")
+    args = parser.parse_args(argv)
+
+    kind = COMMANDS[args.command]
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("No input documents matched")
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.record or args.replay:
+        use_cassette(args.record or args.replay, "record" if args.record else "replay")
+
+    jobs, entries = collect_jobs(kind, paths)
+    stems = output_stems([source for source, _ in jobs])
+    started_at = datetime.now()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        futures = [pool.submit(run_document, kind, source, files, args.output_dir, args.force, args.incremental,
+                               args.sharded, stem=stems[source])
+                   for source, files in jobs]
+        for future in as_completed(futures):
+            entry = future.result()
+            entries.append(entry)
+            print(f"[{entry['status']}] {entry['input']} ({entry['seconds']}s)"
+                  + (f": {entry['error']}" if entry.get("error") else ""))
+
+    manifest = {
+        "pipeline": kind,
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - started, 2),
+        "parallel": args.parallel,
+        "succeeded": sum(entry["status"] == "succeeded" for entry in entries),
+        "partial": sum(entry["status"] == "partial" for entry in entries),
+        "failed": sum(entry["status"] == "failed" for entry in entries),
+        "documents": sorted(entries, key=lambda entry: entry["input"]),
+    }
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"{manifest['succeeded']} succeeded, {manifest['partial']} partial, {manifest['failed']} failed; "
+          f"manifest written to {manifest_path}")
+    return 1 if manifest["failed"] or manifest["partial"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Hedged LLM calls and per-task deadlines, to cut the tail of run times.
+
+A call that runs past the observed p90 latency of its model and task is most
+likely stuck, so a duplicate request is fired and whichever finishes first is
+used. Duplicates are billed, so they are capped at a share of all calls
+(LLM_HEDGE_MAX_EXTRA) and only fired when the rate limiter can admit them
+right away.
+
+Every task also has a deadline: a budget of wall time for all of its LLM calls
+(see the `deadline` of the tiers in model_routes.yaml). A call that would
+outlive its attempt timeout is abandoned and the next model of the route is
+tried; once the task's budget is spent, a streamed task returns the text
+received so far and any other task fails with TaskDeadlineExceeded, leaving
+its run's checkpoints for a resume.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "5"))
+# Duplicate requests allowed, as a share of all provider calls.
+LLM_HEDGE_MAX_EXTRA = float(os.getenv("LLM_HEDGE_MAX_EXTRA", "0.1"))
+# Default per-task budget in seconds when a task's route sets none; 0 means no deadline.
+TASK_DEADLINE_SECONDS = float(os.getenv("TASK_DEADLINE_SECONDS", "0"))
+
+_WINDOW = 100
+
+
+class CallTimedOut(Exception):
+    """An LLM call did not finish within its attempt timeout and was abandoned."""
+
+
+class TaskDeadlineExceeded(Exception):
+    """A task spent its whole deadline budget before its LLM calls finished."""
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls per key, for hedging thresholds."""
+
+    def __init__(self, window=_WINDOW, min_samples=LLM_HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, fraction=LLM_HEDGE_PERCENTILE):
+        """The `fraction` percentile of the recent latencies of `key`, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[int(fraction * (len(samples) - 1))]
+
+
+class HedgeBudget:
+    """Caps duplicate requests at `max_extra` times the number of calls made."""
+
+    def __init__(self, max_extra=LLM_HEDGE_MAX_EXTRA):
+        self.max_extra = max_extra
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def note_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def available(self):
+        """Whether one more duplicate request fits under the cap, without reserving it."""
+        with self._lock:
+            return self.hedges + 1 <= self.max_extra * self.calls
+
+    def try_spend(self):
+        """Reserve one duplicate request; False when that would exceed the cap."""
+        with self._lock:
+            if self.hedges + 1 > self.max_extra * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+def _start(call):
+    """Run `call()` on a daemon thread, so an abandoned call never holds up the caller or shutdown."""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(call())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True, name="llm-call").start()
+    return future
+
+
+def hedged_call(call, hedge_after=None, timeout=None, deadline=None, may_hedge=lambda: True):
+    """Return (result of `call()`, whether a duplicate was fired).
+
+    After `hedge_after` seconds without a result a duplicate call is started if
+    `may_hedge()` allows it, and the first successful result wins; an attempt that fails
+    while another is running is ignored. Raises CallTimedOut after `timeout` seconds and
+    TaskDeadlineExceeded after `deadline` seconds (whichever comes first), leaving the
+    abandoned attempts to finish in the background.
+    """
+    started = time.monotonic()
+    attempts = [_start(call)]
+    hedged = False
+    error = None
+    while True:
+        elapsed = time.monotonic() - started
+        limits = [limit for limit in (timeout, deadline) if limit is not None]
+        if hedge_after is not None and not hedged:
+            limits.append(hedge_after)
+        wait_for = max(0.0, min(limits) - elapsed) if limits else None
+        done, _ = wait(attempts, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), hedged
+            error = future.exception()
+        attempts = [future for future in attempts if not future.done()]
+        if not attempts:
+            raise error
+        elapsed = time.monotonic() - started
+        if deadline is not None and elapsed >= deadline and (timeout is None or deadline <= timeout):
+            raise TaskDeadlineExceeded("Task deadline passed while waiting for an LLM call")
+        if timeout is not None and elapsed >= timeout:
+            raise CallTimedOut(f"LLM call timed out after {timeout:.0f}s")
+        if hedge_after is not None and not hedged and elapsed >= hedge_after:
+            hedged = may_hedge()
+            if hedged:
+                attempts.append(_start(call))
+            else:
+                hedge_after = None
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
@@ -0,0 +1,192 @@
+"""Turn uploaded documents into plain markdown text the agents can read.
+
+PDFs are extracted page by page with pdfplumber, so only one page is parsed
+and held in memory at a time, and the result is normalized to markdown.
+Extracted text is cached by the SHA-256 of the original file, so re-uploading
+the same PDF skips extraction entirely; entries unused for
+INGEST_CACHE_MAX_AGE_DAYS, then the least recently used beyond
+INGEST_CACHE_MAX_MB, are evicted. Text and markdown files pass through.
+Callers that already know the digest (uploads from the blob store) pass it in,
+so the file is not read again just to hash it.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from run_cache import file_digest, remember_digest
+
+INGEST_CACHE_DIR = os.getenv("INGEST_CACHE_DIR", os.path.join(".cache", "ingest"))
+INGEST_CACHE_MAX_MB = float(os.getenv("INGEST_CACHE_MAX_MB", "500"))
+INGEST_CACHE_MAX_AGE_DAYS = float(os.getenv("INGEST_CACHE_MAX_AGE_DAYS", "7"))
+
+# Entries used this recently are never evicted: ingest_file may still be linking or copying them.
+_IN_USE_SECONDS = 300
+
+_PDF_MAGIC = b"%PDF-"
+# A short title only: a longer numbered line is far more often the first line of a list item.
+_NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+([A-Z][^.!?:;]{1,60})$")
+_NUMBERED_ITEM = re.compile(r"^\d+[.)]\s+")
+_BULLET = re.compile(r"^[•●▪‣⁃◦\-\*]\s*")
+_PAGE_NUMBER = re.compile(r"^(page\s+)?\d+(\s+of\s+\d+)?$", re.IGNORECASE)
+
+
+def is_pdf(path):
+    """True if the file starts with the PDF magic bytes, whatever its name."""
+    with open(path, "rb") as f:
+        return f.read(len(_PDF_MAGIC)) == _PDF_MAGIC
+
+
+def iter_pdf_pages(path):
+    """Yield the text of each PDF page in order, releasing each page once it is read."""
+    import pdfplumber  # deferred: only needed when a PDF is actually uploaded
+
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            try:
+                yield page.extract_text() or ""
+            finally:
+                page.flush_cache()
+
+
+def page_to_markdown(text):
+    """Normalize one page of extracted text: rejoin wrapped lines, mark headings and bullets."""
+    blocks, paragraph = [], []
+
+    def flush():
+        if paragraph:
+            blocks.append(" ".join(paragraph))
+            paragraph.clear()
+
+    lines = [" ".join(raw_line.split()) for raw_line in text.splitlines()]
+    for i, line in enumerate(lines):
+        wrapped = i + 1 < len(lines) and lines[i + 1][:1].islower()
+        if not line:
+            flush()
+        elif _PAGE_NUMBER.match(line):
+            continue
+        elif _NUMBERED_HEADING.match(line) and not wrapped:
+            flush()
+            level = min(line.split()[0].rstrip(".").count(".") + 1, 4)
+            blocks.append(f"{'#' * level} {line}")
+        elif _NUMBERED_ITEM.match(line):
+            flush()
+            paragraph.append(line)
+        elif _BULLET.match(line):
+            flush()
+            blocks.append(_BULLET.sub("- ", line))
+        elif paragraph and paragraph[-1].endswith("-") and line[:1].islower():
+            paragraph[-1] = paragraph[-1][:-1] + line
+        elif blocks and blocks[-1].startswith("- ") and not paragraph and line[:1].islower():
+            blocks[-1] = f"{blocks[-1]} {line}"
+        else:
+            paragraph.append(line)
+    flush()
+    return "\n\n".join(blocks)
+
+
+class IngestCache:
+    """Extracted document text stored on disk under the source file's SHA-256, with age- and size-based eviction."""
+
+    def __init__(self, directory=INGEST_CACHE_DIR, max_bytes=None, max_age_seconds=None):
+        self.directory = directory
+        self.max_bytes = max_bytes if max_bytes is not None else int(INGEST_CACHE_MAX_MB * 1024 * 1024)
+        self.max_age_seconds = (
+            max_age_seconds if max_age_seconds is not None else INGEST_CACHE_MAX_AGE_DAYS * 24 * 3600
+        )
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.md")
+
+    def extract(self, source_path, digest=None):
+        """Return the path of the cached markdown for a PDF, extracting it on a miss."""
+        digest = digest or file_digest(source_path)
+        path = self._path(digest)
+        try:
+            # The modification time marks the last use, for eviction.
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                for number, page_text in enumerate(iter_pdf_pages(source_path), start=1):
+                    markdown = page_to_markdown(page_text)
+                    if markdown:
+                        f.write(f"<!-- page {number} -->\n\n{markdown}\n\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def evict(self):
+        """Remove entries unused for longer than the maximum age, then the least recently used until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".md"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime < _IN_USE_SECONDS:
+                        continue
+                    if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                        _remove(path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+ingest_cache = IngestCache()
+
+
+def ingest_file(source_path, dest_path, cache=None, digest=None):
+    """Put the agent-readable text of `source_path` at `dest_path` and return `dest_path`.
+
+    PDFs are converted (or served from the extraction cache); anything else is taken as is.
+    The text is hardlinked rather than copied where the filesystem allows, so identical
+    inputs share storage; inputs are therefore never written in place. `digest` is the
+    SHA-256 of `source_path` when the caller already knows it.
+    """
+    if is_pdf(source_path):
+        source_path = (cache or ingest_cache).extract(source_path, digest)
+        digest = None
+    if os.path.abspath(source_path) != os.path.abspath(dest_path):
+        _link_or_copy(source_path, dest_path)
+    if digest:
+        remember_digest(dest_path, digest)
+    return dest_path
+
+
+def _link_or_copy(source_path, dest_path):
+    """Hardlink `dest_path` to `source_path`, copying it instead where linking is not possible."""
+    _remove(dest_path)
+    try:
+        os.link(source_path, dest_path)
+    except OSError:
+        shutil.copyfile(source_path, dest_path)
@@ -0,0 +1,178 @@
+"""Background jobs for pipeline runs.
+
+Generations are submitted to a bounded worker pool and tracked by job ID, so
+they keep running across Streamlit reruns and browser reconnects, report
+per-task progress and can be cancelled while in flight.
+"""
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import RunCancelled
+
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+JOB_RETENTION_MINUTES = float(os.getenv("JOB_RETENTION_MINUTES", "120"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class Job:
+    """State of one pipeline run: status, per-task progress, timings, metrics and result."""
+
+    def __init__(self, kind, workspace=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.workspace = workspace
+        self.status = QUEUED
+        self.tasks = {}
+        self.task_started_at = {}
+        self.streams = {}
+        self.timings = []
+        self.metrics = None
+        # Tasks restored from the checkpoints of an earlier, failed run.
+        self.resumed_tasks = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def set_tasks(self, names):
+        """Register the pipeline's task names so progress can be reported before they start."""
+        with self._lock:
+            self.tasks = {name: QUEUED for name in names}
+
+    def task_started(self, name):
+        with self._lock:
+            self.tasks[name] = RUNNING
+            self.task_started_at[name] = time.time()
+
+    def task_completed(self, name, output=None):
+        with self._lock:
+            self.tasks[name] = SUCCEEDED
+
+    def task_rows(self):
+        """Status of every task, with seconds since it started for running tasks."""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "Task": name,
+                    "Status": state,
+                    "Elapsed (s)": round(now - self.task_started_at[name]) if state == RUNNING else "",
+                }
+                for name, state in self.tasks.items()
+            ]
+
+    def progress(self):
+        """Fraction of tasks completed, between 0 and 1."""
+        with self._lock:
+            if not self.tasks:
+                return 1.0 if self.status == SUCCEEDED else 0.0
+            return sum(state == SUCCEEDED for state in self.tasks.values()) / len(self.tasks)
+
+    def cancel(self):
+        """Ask the job to stop; in-flight LLM calls finish but no further calls are made."""
+        self.cancel_event.set()
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps them addressable by ID."""
+
+    def __init__(self, max_workers=JOB_MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._futures = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, workspace=None, **kwargs):
+        """Queue `fn(*args, job=job, **kwargs)` and return the new job's ID.
+
+        The `workspace` is held until the job is forgotten, so it is not purged while the
+        job is queued, running or still shown.
+        """
+        self.purge()
+        job = Job(kind, workspace=workspace)
+        if workspace is not None:
+            workspace.hold()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._calls[job.id] = (fn, args, kwargs)
+            self._futures[job.id] = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def resume(self, job_id, **overrides):
+        """Submit a finished job's call again in its workspace, with `overrides` applied to its keyword arguments.
+
+        Pipelines restore the tasks the earlier run completed from their checkpoints, so
+        the new job starts from the first incomplete task. Returns the new job's ID, or
+        None when the job is unknown or still running.
+        """
+        job = self.get(job_id)
+        if job is None or not job.finished:
+            return None
+        with self._lock:
+            fn, args, kwargs = self._calls[job_id]
+        return self.submit(job.kind, fn, *args, workspace=job.workspace, **dict(kwargs, **overrides))
+
+    def _run(self, job, fn, args, kwargs):
+        # finished_at is set before the final status, so purge never sees a finished job without it.
+        if job.cancel_event.is_set():
+            job.finished_at = time.time()
+            job.status = CANCELLED
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, job=job, **kwargs)
+            status = SUCCEEDED
+        except RunCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+            traceback.print_exc()
+        job.finished_at = time.time()
+        job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return
+        job.cancel()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            job.finished_at = time.time()
+            job.status = CANCELLED
+
+    def purge(self, max_age_minutes=JOB_RETENTION_MINUTES):
+        """Forget finished jobs older than `max_age_minutes`, releasing their workspaces."""
+        cutoff = time.time() - max_age_minutes * 60
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+                job = self._jobs.pop(job_id)
+                self._futures.pop(job_id, None)
+                self._calls.pop(job_id, None)
+                if job.workspace is not None:
+                    job.workspace.release()
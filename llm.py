@@ -0,0 +1,300 @@
+"""LLM used by every pipeline agent, backed by a persistent per-call response cache.
+
+Each call is keyed on the model, the normalized messages and the sampling
+parameters, so when only a downstream task changes every upstream call is
+answered from the local SQLite cache instead of being re-billed. Calls that
+reach the provider go through the process-wide rate limiter (ratelimit.py) and
+are hedged and bounded by their task's deadline (hedging.py). With a cassette
+(cassettes.py) every call is recorded, or answered from the recording alone.
+"""
+import functools
+import itertools
+import threading
+import time
+
+import litellm
+from crewai import LLM
+
+from cassettes import active_cassette
+from hedging import (
+    LLM_HEDGING, TASK_DEADLINE_SECONDS, CallTimedOut, TaskDeadlineExceeded, hedge_budget, hedged_call,
+    latency_tracker,
+)
+from metrics import current_task, estimate_usage
+from ratelimit import call_priority, estimate_tokens, rate_limiter, retry_after
+from response_cache import LLM_CACHE_ENABLED, llm_cache
+from routing import default_model, model_router
+from scheduler import RunCancelled
+from streaming import current_stream
+
+_CACHED_PARAMS = (
+    "temperature", "top_p", "n", "max_tokens", "max_completion_tokens", "presence_penalty",
+    "frequency_penalty", "logit_bias", "seed", "logprobs", "top_logprobs", "reasoning_effort",
+)
+_CONNECTION_PARAMS = ("timeout", "api_key", "api_base", "base_url", "api_version")
+_FINAL_ANSWER = "Final Answer:"
+
+
+class CachedLLM(LLM):
+    """crewai LLM that answers repeated identical calls from `llm_cache`.
+
+    When `cancel_event` is set, every further call raises RunCancelled instead of reaching the provider.
+    Calls made inside a task tracked by `metrics.RunMetrics` are recorded against that task, and
+    calls made while a `streaming.DocumentStream` is bound to the thread stream their tokens into it.
+    With a `router` (routing.ModelRouter), each call goes to the models of the current task's route,
+    falling back to the next one when a call times out. `deadline` is the budget in seconds of all
+    calls of one task, and with `hedge` slow calls are duplicated (see hedging.py). A recording
+    `cassette` (cassettes.Cassette) gets every call and its response; a replaying one answers
+    every call instead of the cache and the provider.
+    """
+
+    def __init__(self, model, cache=None, cancel_event=None, router=None, deadline=None, hedge=False, cassette=None,
+                 **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.cache = cache if cache is not None else (llm_cache if LLM_CACHE_ENABLED else None)
+        self.cancel_event = cancel_event
+        self.router = router
+        self.deadline = deadline
+        self.hedge = hedge
+        self.cassette = cassette
+        self._routed = {}
+        self._routed_lock = threading.Lock()
+
+    def _cache_params(self):
+        params = {name: getattr(self, name) for name in _CACHED_PARAMS if getattr(self, name) is not None}
+        # The agent executor merges stop words through a set, so their order is not stable.
+        params["stop"] = sorted(self.stop)
+        if self.response_format is not None:
+            params["response_format"] = str(self.response_format)
+        params.update(self.additional_params)
+        return params
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise RunCancelled("Run was cancelled")
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        task_metrics = current_task()
+        if self.cassette is None:
+            return self._call_tracked(task_metrics, messages, tools, callbacks, available_functions)
+        task = task_metrics.task if task_metrics is not None else None
+        started = time.perf_counter()
+        if self.cassette.replaying:
+            response = self.cassette.replay(task, self.model, messages, self._cache_params())
+            stream = current_stream()
+            if stream is not None:
+                stream.begin()
+                stream.write(response)
+            if task_metrics is not None:
+                # Replayed calls cost nothing, like cache hits.
+                task_metrics.record_call(time.perf_counter() - started, cached=True)
+            return response
+        response = self._call_tracked(task_metrics, messages, tools, callbacks, available_functions)
+        self.cassette.record(task, self.model, messages, self._cache_params(), response, time.perf_counter() - started)
+        return response
+
+    def _call_tracked(self, task_metrics, messages, tools, callbacks, available_functions):
+        """Make the call through the router or this LLM's model, recording it in `task_metrics`."""
+        if self.router is not None:
+            route = self.router.route(task_metrics.task if task_metrics is not None else None)
+            return self._call_routed(route, messages, tools, callbacks, available_functions)
+        started = time.perf_counter()
+        try:
+            response, cached = self._call(messages, tools, callbacks, available_functions)
+        except RunCancelled:
+            raise
+        except Exception:
+            if task_metrics is not None:
+                task_metrics.record_call(time.perf_counter() - started, failed=True)
+            raise
+        if task_metrics is not None:
+            seconds = time.perf_counter() - started
+            if cached:
+                task_metrics.record_call(seconds, cached=True)
+            else:
+                usage = estimate_usage(self.model, messages, response if isinstance(response, str) else "")
+                task_metrics.record_call(seconds, *usage)
+        return response
+
+    def _call_routed(self, route, messages, tools, callbacks, available_functions):
+        """Try the route's models in order, moving on when a call times out."""
+        for i, model in enumerate(route.models):
+            llm = self._routed_llm(model, route)
+            # The agent executor sets stop words on the LLM it was given.
+            llm.stop = list(self.stop)
+            try:
+                return llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+            except (litellm.Timeout, CallTimedOut):
+                if i == len(route.models) - 1:
+                    raise
+
+    def _routed_llm(self, model, route):
+        """Unrouted LLM for `model` with this LLM's cache, cancel event and sampling parameters.
+
+        It uses the route's attempt timeout and deadline; hedging needs both this LLM and the route to allow it.
+        """
+        deadline = route.deadline or self.deadline
+        hedge = self.hedge and route.hedge
+        with self._routed_lock:
+            key = (model, route.timeout, deadline, hedge)
+            if key not in self._routed:
+                params = {name: getattr(self, name) for name in _CACHED_PARAMS if getattr(self, name) is not None}
+                params.update({name: getattr(self, name) for name in _CONNECTION_PARAMS if getattr(self, name, None)})
+                params.update(self.additional_params)
+                if route.timeout:
+                    params["timeout"] = route.timeout
+                self._routed[key] = CachedLLM(
+                    model=model, cache=self.cache, cancel_event=self.cancel_event, deadline=deadline, hedge=hedge,
+                    **params
+                )
+            return self._routed[key]
+
+    def _call(self, messages, tools, callbacks, available_functions):
+        """Return (response, whether it came from the cache)."""
+        # Function-calling responses execute tools as a side effect, so they are never cached.
+        if tools or available_functions:
+            call = functools.partial(
+                self._complete, messages, tools=tools, callbacks=callbacks, available_functions=available_functions
+            )
+            return self._limited(messages, call, hedge=False), False
+
+        stream = current_stream()
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.model, messages, self._cache_params())
+            cached = self.cache.get(key)
+            if cached is not None:
+                if stream is not None:
+                    stream.begin()
+                    stream.write(cached)
+                return cached, True
+
+        if stream is not None:
+            # Two attempts cannot stream into one document, so streamed calls are never hedged.
+            stop = threading.Event()
+            try:
+                response = self._limited(messages, functools.partial(self._stream, messages, stream, stop), hedge=False)
+            except TaskDeadlineExceeded:
+                stop.set()
+                partial = stream.text()
+                if not partial:
+                    raise
+                # Out of time: hand the agent the document received so far, and never cache it.
+                task_metrics = current_task()
+                if task_metrics is not None:
+                    task_metrics.record_truncated()
+                return f"{_FINAL_ANSWER} {partial}", False
+            except CallTimedOut:
+                stop.set()
+                raise
+        else:
+            response = self._limited(
+                messages, functools.partial(self._complete, messages, callbacks=callbacks), hedge=self.hedge
+            )
+        if key is not None and isinstance(response, str) and response:
+            self.cache.put(key, self.model, response)
+        return response, False
+
+    def _limited(self, messages, call, hedge=False):
+        """Make the provider call `call()` once `rate_limiter` admits it, retrying it on rate limit errors.
+
+        The call is abandoned after this LLM's timeout or when the task's deadline passes, and
+        with `hedge` it is duplicated once it runs past the p90 latency of its model and task.
+        """
+        task_metrics = current_task()
+        tokens = estimate_tokens(messages)
+        priority = call_priority()
+        latency_key = (self.model, task_metrics.task if task_metrics is not None else None)
+        for attempt in itertools.count():
+            waited = rate_limiter.acquire(self.model, tokens, priority, self.cancel_event)
+            if task_metrics is not None:
+                task_metrics.record_throttle(waited)
+            remaining = self._remaining(task_metrics)
+            if remaining is not None and remaining <= 0:
+                raise TaskDeadlineExceeded(f"Task deadline of {self.deadline:.0f}s was exceeded")
+            hedge_after = latency_tracker.percentile(latency_key) if hedge else None
+            timeout = self.timeout if isinstance(self.timeout, (int, float)) and self.timeout > 0 else None
+            hedge_budget.note_call()
+            started = time.perf_counter()
+            try:
+                if hedge_after is None and timeout is None and remaining is None:
+                    response, hedged = call(), False
+                else:
+                    response, hedged = hedged_call(
+                        call,
+                        hedge_after=hedge_after,
+                        timeout=timeout,
+                        deadline=remaining,
+                        may_hedge=lambda: (
+                            hedge_budget.available()
+                            and rate_limiter.try_acquire(self.model, tokens)
+                            and hedge_budget.try_spend()
+                        ),
+                    )
+            except litellm.RateLimitError as e:
+                if attempt >= rate_limiter.max_retries:
+                    raise
+                rate_limiter.backoff(self.model, attempt, retry_after(e))
+                if task_metrics is not None:
+                    task_metrics.record_throttle(0.0, rate_limited=True)
+                continue
+            latency_tracker.record(latency_key, time.perf_counter() - started)
+            if hedged and task_metrics is not None:
+                task_metrics.record_hedge()
+            rate_limiter.consume(self.model, len(response) // 4 if isinstance(response, str) else 0)
+            return response
+
+    def _remaining(self, task_metrics):
+        """Seconds left of the current task's deadline, or None without one."""
+        if not self.deadline or task_metrics is None or task_metrics.started is None:
+            return None
+        return self.deadline - (time.perf_counter() - task_metrics.started)
+
+    def _complete(self, messages, **kwargs):
+        """Call the provider (crewai's LLM.call) and return its answer."""
+        return super().call(messages, **kwargs)
+
+    def _stream_tokens(self, messages, params):
+        """Call the provider with streaming on and return an iterator over the tokens of its answer."""
+        response = litellm.completion(model=self.model, messages=messages, stream=True, **params)
+        return (chunk.choices[0].delta.content for chunk in response if chunk.choices and chunk.choices[0].delta.content)
+
+    def _stream(self, messages, stream, stop=None):
+        """Call the provider with streaming on, writing each token to `stream`, and return the full text.
+
+        Setting `stop` ends an abandoned call without writing further tokens.
+        """
+        params = self._cache_params()
+        params.update({name: getattr(self, name) for name in _CONNECTION_PARAMS if getattr(self, name, None)})
+        if not params["stop"]:
+            del params["stop"]
+        params.pop("response_format", None)
+        if self.response_format is not None:
+            params["response_format"] = self.response_format
+        tokens = self._stream_tokens(messages, params)
+        stream.begin()
+        chunks = []
+        for token in tokens:
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise RunCancelled("Run was cancelled")
+            if stop is not None and stop.is_set():
+                break
+            chunks.append(token)
+            stream.write(token)
+        return "".join(chunks)
+
+
+def build_llm(cancel_event=None):
+    """Create the LLM for pipeline agents: MODEL, routed per task when model_routes.yaml exists.
+
+    It records to or replays from the active cassette, if any (see cassettes.active_cassette).
+    """
+    return CachedLLM(
+        model=default_model(),
+        cancel_event=cancel_event,
+        router=model_router(),
+        deadline=TASK_DEADLINE_SECONDS or None,
+        hedge=LLM_HEDGING,
+        cassette=active_cassette(),
+    )
@@ -0,0 +1,252 @@
+"""Per-task latency, token and cost metrics for pipeline runs.
+
+The scheduler marks which task a worker thread is executing, and every LLM
+call made from that thread is attributed to it. After a run the per-task
+figures are appended to a JSON lines file and the cumulative totals for this
+process are rewritten as a Prometheus text-format file (suitable for the node
+exporter's textfile collector).
+
+Token counts are estimated locally with litellm's tokenizer and costs with its
+price table, since the provider usage reported to crewai callbacks is global
+rather than per call.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+METRICS_JSONL = os.getenv("METRICS_JSONL", os.path.join(METRICS_DIR, "task_metrics.jsonl"))
+METRICS_PROM = os.getenv("METRICS_PROM", os.path.join(METRICS_DIR, "pipeline_metrics.prom"))
+
+_COUNTERS = (
+    # (field, Prometheus name, help text)
+    ("runs", "docgen_task_runs_total", "Task executions."),
+    ("wall_seconds", "docgen_task_wall_seconds_total", "Wall time spent executing tasks."),
+    ("llm_calls", "docgen_llm_calls_total", "LLM calls made by tasks, including cache hits."),
+    ("cache_hits", "docgen_llm_cache_hits_total", "LLM calls answered from the response cache."),
+    ("retries", "docgen_llm_retries_total", "LLM calls that failed and were retried by the agent."),
+    ("rate_limited", "docgen_llm_rate_limited_total", "LLM calls rejected by the provider's rate limit and retried."),
+    ("throttled_seconds", "docgen_llm_throttled_seconds_total", "Time LLM calls waited for the rate limiter."),
+    ("hedged", "docgen_llm_hedged_total", "LLM calls duplicated after running past their hedging latency."),
+    ("truncated", "docgen_task_truncated_total", "Task results cut short by the task deadline."),
+    ("llm_seconds", "docgen_llm_seconds_total", "Wall time spent waiting on LLM calls."),
+    ("prompt_tokens", "docgen_llm_prompt_tokens_total", "Estimated prompt tokens sent."),
+    ("completion_tokens", "docgen_llm_completion_tokens_total", "Estimated completion tokens received."),
+    ("cost_usd", "docgen_llm_cost_usd_total", "Estimated LLM cost in US dollars."),
+)
+
+_active = threading.local()
+_totals = {}
+_totals_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+class TaskMetrics:
+    """Counters for one task in one run."""
+
+    def __init__(self, task, agent, run=None):
+        self.task = task
+        self.agent = agent
+        self.run = run
+        # perf_counter() when the task last started, for its deadline.
+        self.started = None
+        self.runs = 0
+        self.wall_seconds = 0.0
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+        self.hedged = 0
+        self.truncated = 0
+        self.llm_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def record_call(self, seconds, prompt_tokens=0, completion_tokens=0, cost_usd=0.0, cached=False, failed=False):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+            self.cache_hits += cached
+            self.retries += failed
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost_usd
+
+    def record_throttle(self, seconds, rate_limited=False):
+        """Record time spent waiting for the rate limiter, and whether the provider rejected a call."""
+        with self._lock:
+            self.throttled_seconds += seconds
+            self.rate_limited += rate_limited
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+
+    def record_truncated(self):
+        """Record that the task's result is the partial text it had when its deadline passed."""
+        with self._lock:
+            self.truncated += 1
+
+    def as_dict(self):
+        with self._lock:
+            row = {"task": self.task, "agent": self.agent}
+            row.update({field: getattr(self, field) for field, _, _ in _COUNTERS})
+        row["wall_seconds"] = round(row["wall_seconds"], 3)
+        row["llm_seconds"] = round(row["llm_seconds"], 3)
+        row["throttled_seconds"] = round(row["throttled_seconds"], 3)
+        row["cost_usd"] = round(row["cost_usd"], 6)
+        return row
+
+
+class RunMetrics:
+    """Per-task metrics of one pipeline run.
+
+    `planned` names the run's tasks; marking them completed tracks the run's progress.
+    """
+
+    def __init__(self, pipeline, run_id=None, planned=()):
+        self.pipeline = pipeline
+        self.run_id = run_id
+        self.started_at = datetime.now()
+        self.tasks = {}
+        self.planned = set(planned)
+        self.completed = set()
+        self._lock = threading.Lock()
+
+    def task(self, name, agent=""):
+        with self._lock:
+            if name not in self.tasks:
+                self.tasks[name] = TaskMetrics(name, agent, run=self)
+            return self.tasks[name]
+
+    def task_completed(self, name, output=None):
+        with self._lock:
+            if name in self.planned:
+                self.completed.add(name)
+
+    def truncated_tasks(self):
+        """Names of the tasks whose result was cut short by their deadline."""
+        with self._lock:
+            tasks = list(self.tasks.values())
+        return [metrics.task for metrics in tasks if metrics.truncated]
+
+    def progress(self):
+        """Fraction of the planned tasks completed, between 0 and 1 (0 without a plan)."""
+        with self._lock:
+            return len(self.completed) / len(self.planned) if self.planned else 0.0
+
+    @contextmanager
+    def track(self, name, agent=""):
+        """Attribute LLM calls made by this thread to task `name` and time the block."""
+        metrics = self.task(name, agent)
+        previous = getattr(_active, "task", None)
+        _active.task = metrics
+        started = time.perf_counter()
+        metrics.started = started
+        try:
+            yield metrics
+        finally:
+            with metrics._lock:
+                metrics.runs += 1
+                metrics.wall_seconds += time.perf_counter() - started
+            _active.task = previous
+
+    def rows(self):
+        """Per-task rows, in the order the tasks started."""
+        with self._lock:
+            tasks = list(self.tasks.values())
+        return [metrics.as_dict() for metrics in tasks]
+
+    def totals(self):
+        """Sums over all tasks (wall time is the sum of task durations, not elapsed time)."""
+        totals = {field: 0 for field, _, _ in _COUNTERS}
+        for row in self.rows():
+            for field in totals:
+                totals[field] += row[field]
+        totals["wall_seconds"] = round(totals["wall_seconds"], 3)
+        totals["llm_seconds"] = round(totals["llm_seconds"], 3)
+        totals["throttled_seconds"] = round(totals["throttled_seconds"], 3)
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return totals
+
+
+def current_task():
+    """TaskMetrics of the task running on this thread, or None outside a tracked task."""
+    return getattr(_active, "task", None)
+
+
+def estimate_usage(model, messages, response):
+    """Return (prompt tokens, completion tokens, cost in USD) for one call, estimated locally."""
+    import litellm  # deferred: importing litellm takes seconds and only running pipelines need it
+
+    try:
+        prompt_tokens = litellm.token_counter(model=model, messages=messages)
+        completion_tokens = litellm.token_counter(model=model, text=response or "")
+    except Exception:
+        # Rough fallback for models litellm cannot tokenize: ~4 characters per token.
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+        completion_tokens = len(response or "") // 4
+    try:
+        prompt_cost, completion_cost = litellm.cost_per_token(
+            model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+        cost = prompt_cost + completion_cost
+    except Exception:
+        cost = 0.0
+    return prompt_tokens, completion_tokens, cost
+
+
+def export_run(run_metrics, jsonl_path=METRICS_JSONL, prom_path=METRICS_PROM):
+    """Append the run's task rows to `jsonl_path` and rewrite the Prometheus file at `prom_path`."""
+    rows = run_metrics.rows()
+    with _totals_lock:
+        for row in rows:
+            key = (run_metrics.pipeline, row["task"], row["agent"])
+            totals = _totals.setdefault(key, {field: 0 for field, _, _ in _COUNTERS})
+            for field in totals:
+                totals[field] += row[field]
+        snapshot = {key: dict(values) for key, values in _totals.items()}
+
+    with _export_lock:
+        directory = os.path.dirname(jsonl_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        started_at = run_metrics.started_at.isoformat(timespec="seconds")
+        with open(jsonl_path, "a") as f:
+            for row in rows:
+                record = {"pipeline": run_metrics.pipeline, "run_id": run_metrics.run_id, "started_at": started_at}
+                record.update(row)
+                f.write(json.dumps(record) + "\n")
+        _write_atomic(prom_path, prometheus_text(snapshot))
+
+
+def prometheus_text(totals):
+    """Render {(pipeline, task, agent): counters} in the Prometheus text exposition format."""
+    lines = []
+    for field, name, help_text in _COUNTERS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (pipeline, task, agent), values in sorted(totals.items()):
+            labels = f'pipeline="{_escape(pipeline)}",task="{_escape(task)}",agent="{_escape(agent)}"'
+            lines.append(f"{name}{{{labels}}} {values[field]}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,157 @@
+"""Declarative agent and task definitions loaded from pipelines.yaml.
+
+The spec holds every prompt of the SRS, SDD and test case pipelines. Text shared
+between prompts is defined once under `fragments` and inserted with ${name};
+each task lists in `context` exactly the upstream tasks whose outputs it
+receives, so no step sees more of the run than it needs. A pipeline can reuse
+the agents of an earlier one with `agents_from`.
+
+The file is parsed and validated once per process. crewai is imported only
+when a pipeline is compiled.
+"""
+import functools
+import os
+from string import Template
+
+import yaml
+
+PIPELINE_SPEC_PATH = os.getenv(
+    "PIPELINE_SPEC_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipelines.yaml")
+)
+
+_AGENT_FIELDS = ("role", "goal", "backstory")
+_TASK_FIELDS = ("agent", "description", "expected_output")
+
+
+class PipelineSpecError(Exception):
+    """The pipeline spec is malformed or references something that is not defined."""
+
+
+@functools.lru_cache(maxsize=None)
+def load_spec(path=PIPELINE_SPEC_PATH):
+    """Parse and validate the spec at `path`, with fragments already substituted."""
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f) or {}
+    fragments = {name: str(text).strip() for name, text in (spec.get("fragments") or {}).items()}
+    pipelines = spec.get("pipelines") or {}
+    if not pipelines:
+        raise PipelineSpecError(f"{path} defines no pipelines")
+    resolved = {}
+    for name, pipeline in pipelines.items():
+        resolved[name] = _resolve_pipeline(name, pipeline, fragments, resolved)
+    return resolved
+
+
+def _resolve_pipeline(name, pipeline, fragments, resolved_pipelines):
+    agents = pipeline.get("agents") or {}
+    tasks = pipeline.get("tasks") or {}
+    if not tasks:
+        raise PipelineSpecError(f"pipeline {name!r} defines no tasks")
+
+    resolved_agents = {}
+    base = pipeline.get("agents_from")
+    if base:
+        if base not in resolved_pipelines:
+            raise PipelineSpecError(f"{name}.agents_from: pipeline {base!r} is not defined before it")
+        resolved_agents.update(resolved_pipelines[base]["agents"])
+    for agent_name, agent in agents.items():
+        where = f"{name}.agents.{agent_name}"
+        _require(agent, _AGENT_FIELDS, where)
+        resolved = {field: _substitute(agent[field], fragments, f"{where}.{field}") for field in _AGENT_FIELDS}
+        resolved["tools"] = [_check_tool(tool, f"{where}.tools") for tool in agent.get("tools") or []]
+        resolved_agents[agent_name] = resolved
+
+    resolved_tasks = {}
+    for task_name, task in tasks.items():
+        where = f"{name}.tasks.{task_name}"
+        _require(task, _TASK_FIELDS, where)
+        if task["agent"] not in resolved_agents:
+            raise PipelineSpecError(f"{where}: unknown agent {task['agent']!r}")
+        context = task.get("context") or []
+        for dep in context:
+            # Upstream tasks must come first, which also rules out cycles.
+            if dep not in resolved_tasks:
+                raise PipelineSpecError(f"{where}: context task {dep!r} is not defined before it")
+        resolved_tasks[task_name] = {
+            "agent": task["agent"],
+            "description": _substitute(task["description"], fragments, f"{where}.description"),
+            "expected_output": _substitute(task["expected_output"], fragments, f"{where}.expected_output"),
+            "context": list(context),
+        }
+    return {"agents": resolved_agents, "tasks": resolved_tasks}
+
+
+def _require(entry, fields, where):
+    if not isinstance(entry, dict):
+        raise PipelineSpecError(f"{where}: expected a mapping")
+    missing = [field for field in fields if not entry.get(field)]
+    if missing:
+        raise PipelineSpecError(f"{where}: missing {', '.join(missing)}")
+
+
+def _substitute(text, fragments, where):
+    try:
+        return Template(str(text).strip()).substitute(fragments)
+    except KeyError as e:
+        raise PipelineSpecError(f"{where}: unknown fragment {e.args[0]!r}") from None
+    except ValueError as e:
+        raise PipelineSpecError(f"{where}: {e}") from None
+
+
+def _check_tool(tool, where):
+    kind = tool.get("type") if isinstance(tool, dict) else None
+    if kind == "section_search":
+        _require(tool, ("file", "label"), where)
+    elif kind in ("file_writer", "file_reader"):
+        _require(tool, ("file",), where)
+    else:
+        raise PipelineSpecError(f"{where}: unknown tool type {kind!r}")
+    return dict(tool)
+
+
+def _build_tool(tool, workspace):
+    if tool["type"] == "section_search":
+        return workspace.section_search(tool["file"], tool["label"])
+    if tool["type"] == "file_writer":
+        return workspace.file_writer(tool["file"])
+    return workspace.file_reader(tool["file"])
+
+
+def compile_pipeline(name, workspace, llm, path=PIPELINE_SPEC_PATH):
+    """Build the crewai tasks of pipeline `name` for `workspace`, in spec order.
+
+    Agents are created once per pipeline and share `llm`; tools are bound to files in
+    `workspace`. Tasks without a `context` receive no upstream output.
+    """
+    from crewai import Agent, Task
+
+    spec = load_spec(path)
+    if name not in spec:
+        raise PipelineSpecError(f"unknown pipeline {name!r}; the spec defines {', '.join(spec)}")
+    pipeline = spec[name]
+
+    agents = {}
+    used = {task["agent"] for task in pipeline["tasks"].values()}
+    for agent_name, agent in pipeline["agents"].items():
+        if agent_name not in used:
+            continue
+        tools = [_build_tool(tool, workspace) for tool in agent["tools"]]
+        agents[agent_name] = Agent(
+            role=agent["role"],
+            goal=agent["goal"],
+            backstory=agent["backstory"],
+            llm=llm,
+            **({"tools": tools} if tools else {}),
+        )
+
+    tasks = {}
+    for task_name, task in pipeline["tasks"].items():
+        context = [tasks[dep] for dep in task["context"]]
+        tasks[task_name] = Task(
+            name=task_name,
+            description=task["description"],
+            expected_output=task["expected_output"],
+            agent=agents[task["agent"]],
+            **({"context": context} if context else {}),
+        )
+    return list(tasks.values())
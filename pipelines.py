@@ -0,0 +1,669 @@
+"""SRS, SDD and test case generation pipelines.
+
+Compiles each pipeline's agents and tasks from the declarative spec in
+pipelines.yaml (see pipeline_spec) and runs them through the DAG scheduler. Nothing here depends on Streamlit, so the same functions back the
+web app, background jobs and the batch CLI. Each generate function accepts an
+`llm` that replaces the configured model (the benchmark passes a stub).
+
+crewai is imported only when a pipeline is built, so importing this module
+(e.g. for the PIPELINES registry) stays cheap. Each pipeline's agents and tasks
+are built once per process as a template; every run gets shallow copies with
+its own LLM and workspace-bound tools.
+"""
+import functools
+import os
+from datetime import datetime
+
+from artifacts import ARTIFACT_TASKS, ARTIFACTS_ENABLED, ArtifactError, artifact_store
+from assembly import DOCUMENT_ASSEMBLY, assemble_document, layout_for, layout_signature
+from checkpoints import CHECKPOINTS_ENABLED, CheckpointStore
+from metrics import RunMetrics, export_run
+from pipeline_spec import compile_pipeline
+from revisions import RevisedRun, RevisionStore, format_changes, plan_revision
+from routing import models_signature
+from run_cache import CachedRun, RunCache, file_digest, prompt_fingerprint
+from scheduler import Step, StepOutput, run_crew_tasks
+from sharding import TEST_CASE_SHARD_CONCURRENCY, TEST_CASE_SHARDING, merge_shards, split_scenarios
+from streaming import DocumentStream
+from workspace import WORKSPACE_ROOT, Workspace
+
+PIPELINE_VERBOSE = os.getenv("PIPELINE_VERBOSE", "false").lower() in ("1", "true", "yes")
+PIPELINE_TEMPLATES = os.getenv("PIPELINE_TEMPLATES", "true").lower() not in ("0", "false", "no")
+
+run_cache = RunCache()
+revision_store = RevisionStore()
+checkpoint_store = CheckpointStore()
+
+
+class PartialRun:
+    """A run whose documents are incomplete: `truncated_tasks` ran out of their deadline.
+
+    Its documents are left for the user to read but never cached, stored as a revision
+    or mined for artifacts, and its checkpoints are kept so the run can be resumed.
+    """
+
+    from_cache = False
+
+    def __init__(self, raw, truncated_tasks):
+        self.raw = raw
+        self.truncated_tasks = truncated_tasks
+
+    def __str__(self):
+        return self.raw
+
+
+def collect_stage_timings(graph_timings, started_at):
+    """Build per-stage timing rows (offsets in seconds from kickoff) from scheduler timings."""
+    timings = []
+    for stage, (stage_start, stage_end) in graph_timings.items():
+        timings.append({
+            "Stage": stage,
+            "Started (s)": round((stage_start - started_at).total_seconds(), 2),
+            "Finished (s)": round((stage_end - started_at).total_seconds(), 2),
+            "Duration (s)": round((stage_end - stage_start).total_seconds(), 2),
+        })
+    return sorted(timings, key=lambda row: row["Started (s)"])
+
+
+def run_pipeline(pipeline, tasks, input_paths, documents, job=None, force=False, stored_extractions=None):
+    """Run pipeline tasks through the DAG scheduler, reusing cached results for identical inputs.
+
+    `documents` maps each output file path to the name of the task that produces it. Every
+    document is always left at its path so the UI can read it back, and the tasks writing
+    the documents stream their tokens into the job (see execute_tasks). Document tasks of
+    documents with a layout are replaced by local assembly (see with_assembly). Returns the
+    output of the last document's task, a CachedRun when nothing had to run, or a
+    PartialRun when a task's deadline cut its result short.
+
+    Each task's output is checkpointed as it completes. After a failed run, the next run
+    over the same inputs, models and prompts restores the completed tasks and only runs
+    the rest; `force` discards the checkpoints along with the cached documents.
+
+    `stored_extractions` maps extraction task names to the documents they extract from:
+    a record of the task's output stored for those documents, by the same models and task
+    prompt, replaces the task (see with_stored_extraction). Records are only consulted on
+    a run cache miss, and never change the cache or checkpoint keys.
+    """
+    tasks, streamed_tasks = with_assembly(tasks, documents) if DOCUMENT_ASSEMBLY else (tasks, documents.values())
+    # Keys come from the pipeline's own tasks, before any task is served from storage.
+    prompts = prompt_fingerprint(tasks)
+    model = models_signature()
+    own_tasks = {task.name: task for task in tasks}
+    cache_keys = {
+        path: run_cache.key(f"{pipeline}:{os.path.basename(path)}", input_paths, model, prompts)
+        for path in documents
+    }
+    checkpoint_key = run_cache.key(pipeline, input_paths, model, prompts)
+    if force:
+        for cache_key in cache_keys.values():
+            run_cache.invalidate(cache_key)
+        checkpoint_store.clear(checkpoint_key)
+    else:
+        cached = {path: run_cache.get(cache_key) for path, cache_key in cache_keys.items()}
+        if all(content is not None for content in cached.values()):
+            for path, content in cached.items():
+                with open(path, "w") as f:
+                    f.write(content)
+            last = list(documents)[-1]
+            return CachedRun(cache_keys[last], cached[last])
+
+    # Drop the previous run's documents so a stale file is never cached for this key.
+    for path in documents:
+        if os.path.exists(path):
+            os.remove(path)
+
+    for task_name, document_paths in (stored_extractions or {}).items():
+        tasks = with_stored_extraction(tasks, task_name, document_paths, force=force)
+    checkpoint = None
+    if CHECKPOINTS_ENABLED:
+        tasks, checkpoint = resume_from_checkpoints(tasks, checkpoint_key, job)
+    outputs, truncated = execute_tasks(pipeline, tasks, streamed_tasks, job=job, checkpoint=checkpoint)
+
+    for path, task_name in documents.items():
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                content = f.read()
+        else:
+            content = outputs[task_name].raw
+            with open(path, "w") as f:
+                f.write(content)
+        if not truncated:
+            run_cache.put(cache_keys[path], content)
+    last = outputs[list(documents.values())[-1]]
+    if truncated:
+        return PartialRun(last.raw, truncated)
+    checkpoint_store.clear(checkpoint_key)
+    record_artifacts(pipeline, own_tasks, outputs, list(input_paths) + list(documents))
+    return last
+
+
+def resume_from_checkpoints(tasks, key, job=None):
+    """Restore the tasks checkpointed under `key` and return (tasks, checkpoint hook for the others).
+
+    Restored tasks become Steps returning their saved output (their names are recorded in
+    `job.resumed_tasks`); the hook saves the output of every other task as it completes.
+    """
+    saved = checkpoint_store.load(key)
+    restored = [task.name for task in tasks if task.name in saved]
+    for task_name in restored:
+        tasks = use_stored_output(tasks, task_name, saved[task_name])
+    if job:
+        job.resumed_tasks = restored
+    pending = {task.name for task in tasks} - set(restored)
+
+    def checkpoint(name, output):
+        # Tasks run by Steps (e.g. test case shards) are covered by the Step's own output.
+        if name in pending:
+            checkpoint_store.save(key, name, output.raw)
+    return tasks, checkpoint
+
+
+def record_artifacts(pipeline, tasks, outputs, document_paths):
+    """Store the outputs of extraction tasks, linked to the run's input and output documents.
+
+    `tasks` are the pipeline's tasks by name, before any was served from storage; each
+    record is keyed on the models and the prompt of the task that produced it.
+    """
+    if not ARTIFACTS_ENABLED:
+        return
+    hashes = [file_digest(path) for path in document_paths if os.path.exists(path)]
+    for task_name, kind in ARTIFACT_TASKS.items():
+        output = outputs.get(task_name)
+        # Steps only hand on records that are already stored.
+        if output is None or isinstance(output, StepOutput) or task_name not in tasks:
+            continue
+        try:
+            artifact_store.put(
+                kind, output.raw, hashes, pipeline=pipeline, task=task_name,
+                models=models_signature(), prompt=prompt_fingerprint([tasks[task_name]]),
+            )
+        except ArtifactError:
+            continue  # e.g. a truncated answer; not worth reusing
+
+
+def use_stored_output(tasks, task_name, text):
+    """Replace task `task_name` with a Step returning `text` (a stored record) and rewire its dependents."""
+    stored = Step(task_name, lambda outputs, run: text)
+    replaced = []
+    for task in tasks:
+        if task.name == task_name:
+            replaced.append(stored)
+            continue
+        context = task.context or []
+        if any(dep.name == task_name for dep in context):
+            context = [stored if dep.name == task_name else dep for dep in context]
+            if isinstance(task, Step):
+                task = Step(task.name, task.fn, context, task.tasks, task.fingerprint)
+            else:
+                task = task.model_copy(update={"context": context})
+        replaced.append(task)
+    return replaced
+
+
+def with_assembly(tasks, documents):
+    """Replace the formatter task of each document that has a layout with a Step assembling it locally.
+
+    The Step renders the outputs its task would have received with the document's layout
+    (see assembly.py) instead of asking an agent to reformat them. Returns the tasks and
+    the names of the tasks to stream: the task feeding each assembled document, or the
+    document task itself.
+    """
+    steps, streamed = {}, []
+    by_name = {task.name: task for task in tasks}
+    for path, task_name in documents.items():
+        file_name = os.path.basename(path)
+        task = by_name.get(task_name)
+        if task is None or isinstance(task, Step) or layout_for(file_name) is None or not task.context:
+            streamed.append(task_name)
+            continue
+        steps[task_name] = Step(
+            task_name,
+            functools.partial(_assemble, file_name, [dep.name for dep in task.context]),
+            context=task.context,
+            fingerprint=f"assembly:{file_name}:{layout_signature(file_name)}",
+        )
+        streamed.append(task.context[-1].name)
+    return [steps.get(task.name, task) for task in tasks], streamed
+
+
+def _assemble(file_name, names, outputs, run):
+    return assemble_document(file_name, [output.raw for output in outputs], names)
+
+
+def stored_extraction(task, document_paths):
+    """The stored output of extraction `task` over `document_paths`, or None.
+
+    Only records of the same task, made with the current models and the task's current
+    prompt, are used: a changed extraction prompt or model means extracting again.
+    """
+    record = artifact_store.latest(
+        ARTIFACT_TASKS[task.name], *(file_digest(path) for path in document_paths),
+        task=task.name, models=models_signature(), prompt=prompt_fingerprint([task]),
+    )
+    return record.text if record is not None else None
+
+
+def with_stored_extraction(tasks, task_name, document_paths, force=False):
+    """Use the record stored for extraction task `task_name` over `document_paths` in its place, if any.
+
+    Downstream tasks get exactly the text the extraction would have handed them, so
+    their LLM calls stay cached.
+    """
+    task = next((task for task in tasks if task.name == task_name), None)
+    if force or not ARTIFACTS_ENABLED or task is None or isinstance(task, Step):
+        return tasks
+    text = stored_extraction(task, document_paths)
+    return use_stored_output(tasks, task_name, text) if text else tasks
+
+
+def execute_tasks(pipeline, tasks, streamed_tasks, job=None, checkpoint=None):
+    """Run `tasks` through the DAG scheduler and return (their outputs by task name, truncated tasks).
+
+    The truncated tasks are those whose result was cut short by their deadline (see llm.py).
+
+    When a `job` is given, its per-task progress, stage timings and metrics are updated, the
+    `streamed_tasks` stream their tokens into `job.streams` and its cancel event stops the run.
+    `checkpoint(name, output)` is called as each task completes. Per-task metrics are
+    exported after every run that reached the agents.
+    """
+    run_metrics = RunMetrics(
+        pipeline, run_id=job.workspace.run_id if job and job.workspace else None, planned=[task.name for task in tasks]
+    )
+    if job:
+        job.set_tasks([task.name for task in tasks])
+        job.metrics = run_metrics
+        job.streams = {task_name: DocumentStream() for task_name in streamed_tasks}
+    started_at = datetime.now()
+    try:
+        outputs, graph = run_crew_tasks(
+            tasks,
+            verbose=PIPELINE_VERBOSE,
+            on_task_start=job.task_started if job else None,
+            on_task_complete=_track_completion(run_metrics, job, checkpoint),
+            cancel_event=job.cancel_event if job else None,
+            metrics=run_metrics,
+            streams=job.streams if job else None,
+        )
+    finally:
+        if run_metrics.tasks:
+            export_run(run_metrics)
+    if job:
+        job.timings.extend(collect_stage_timings(graph.timings, started_at))
+    return outputs, run_metrics.truncated_tasks()
+
+
+def _track_completion(run_metrics, job=None, checkpoint=None):
+    """Task completion hook that advances the run's progress, which orders its rate-limited calls.
+
+    Once a task of the run was truncated by its deadline nothing more is checkpointed, so a
+    resume regenerates the truncated task and everything that may have built on it.
+    """
+    def task_completed(name, output=None):
+        run_metrics.task_completed(name, output)
+        if checkpoint and not run_metrics.truncated_tasks():
+            checkpoint(name, output)
+        if job:
+            job.task_completed(name, output)
+    return task_completed
+
+
+def run_revisable(pipeline, workspace, source_name, document_name, full_run, lineage=None, job=None,
+                  force=False, llm=None):
+    """Generate `document_name` from a new revision of `source_name`, rewriting only what changed.
+
+    With a `lineage`, the input is diffed section by section against the previous revision
+    of the same lineage and only the output sections it touches are regenerated (see
+    revisions.py). `full_run()` runs the whole pipeline instead when there is no usable
+    previous revision, regeneration is forced, the models or prompts changed since it (see
+    revision_signature) or too much changed. Either way the new input and output become the
+    lineage's previous revision, unless the result is a PartialRun.
+    """
+    source = workspace.read_text(source_name)
+    signature = revision_signature(pipeline, document_name) if lineage else None
+    previous = revision_store.get(pipeline, lineage, signature) if lineage and not force else None
+    plan = None
+    if previous and source_name in previous["inputs"] and document_name in previous["outputs"]:
+        plan = plan_revision(previous["inputs"][source_name], source, previous["outputs"][document_name])
+    if plan is None:
+        result = full_run()
+    else:
+        result = _revise_document(pipeline, workspace, source_name, document_name, plan, job, llm)
+    if lineage and not isinstance(result, PartialRun):
+        revision_store.put(
+            pipeline, lineage, {source_name: source}, {document_name: workspace.read_text(document_name)},
+            signature=signature,
+        )
+    return result
+
+
+def revision_signature(pipeline, document_name):
+    """Models, prompts and layout that a revision of `document_name` was generated with."""
+    prompts = prompt_fingerprint(list(pipeline_template(pipeline)) + list(pipeline_template("revise_section")))
+    layout = layout_signature(document_name) if DOCUMENT_ASSEMBLY else None
+    return f"{models_signature()}:{prompts}:{layout}"
+
+
+def _revise_document(pipeline, workspace, source_name, document_name, plan, job, llm):
+    """Rewrite the output sections routed by `plan` in parallel and splice the document."""
+    revised = {}
+    if plan.routed:
+        labels = {
+            "source": os.path.splitext(source_name)[0].upper(),
+            "document": PIPELINES[pipeline]["outputs"][document_name],
+        }
+        tasks = {}
+        llm = llm or _build_llm(job)
+        for i, changes in plan.routed.items():
+            template = pipeline_tasks("revise_section", workspace, llm)[0]
+            tasks[i] = template.model_copy(update={
+                "name": f"revise_section_{i + 1}",
+                "description": template.description.format(
+                    section=plan.blocks[i]["text"], changes=format_changes(changes), **labels
+                ),
+            })
+        outputs, truncated = execute_tasks(
+            pipeline, list(tasks.values()), [task.name for task in tasks.values()], job=job
+        )
+        revised = {i: outputs[task.name].raw for i, task in tasks.items()}
+    content = plan.splice(revised)
+    with open(workspace.file_path(document_name), "w") as f:
+        f.write(content)
+    if plan.routed and truncated:
+        return PartialRun(content, truncated)
+    return RevisedRun(content, len(revised), len(plan.blocks))
+
+
+def replace_context(tasks, replaced, replacements):
+    """Point every task that depended on `replaced` at `replacements` instead."""
+    for task in tasks:
+        if not task.context or replaced not in task.context:
+            continue
+        context = []
+        for dep in task.context:
+            for new_dep in (replacements if dep is replaced else [dep]):
+                if new_dep not in context:
+                    context.append(new_dep)
+        task.context = context
+
+
+def build_srs_tasks(workspace, llm):
+    """Build the BRD -> SRS agents and tasks, reading brd.txt and writing srs1.md in `workspace`."""
+    return compile_pipeline("srs", workspace, llm)
+
+
+def generate_srs(workspace, job=None, force=False, llm=None, lineage=None):
+    """Generate the SRS (srs1.md) from the BRD saved as brd.txt in `workspace`.
+
+    With a `lineage`, only the SRS sections affected by changes since the lineage's
+    previous BRD revision are regenerated.
+    """
+    return run_revisable(
+        "generate_srs", workspace, "brd.txt", "srs1.md",
+        lambda: run_pipeline(
+            "generate_srs",
+            pipeline_tasks("generate_srs", workspace, llm or _build_llm(job)),
+            [workspace.file_path("brd.txt")],
+            {workspace.file_path("srs1.md"): "srs_format_task"},
+            job=job,
+            force=force
+        ),
+        lineage=lineage, job=job, force=force, llm=llm
+    )
+
+
+# ================================
+# SRS to SDD Conversion
+# ================================
+
+def build_sdd_tasks(workspace, llm):
+    """Build the SRS -> SDD agents and tasks, reading srs.txt and writing sdd.md in `workspace`."""
+    return compile_pipeline("sdd", workspace, llm)
+
+
+def generate_sdd(workspace, job=None, force=False, llm=None, lineage=None):
+    """Generate the SDD (sdd.md) from the SRS saved as srs.txt in `workspace`.
+
+    The output of extract_srs already stored for the same SRS, models and extraction
+    prompt is taken from the artifact store instead of running the task again. With a `lineage`,
+    only the SDD sections affected by changes since the lineage's previous SRS revision
+    are regenerated.
+    """
+    return run_revisable(
+        "generate_sdd", workspace, "srs.txt", "sdd.md",
+        lambda: run_pipeline(
+            "generate_sdd",
+            pipeline_tasks("generate_sdd", workspace, llm or _build_llm(job)),
+            [workspace.file_path("srs.txt")],
+            {workspace.file_path("sdd.md"): "format_export_sdd"},
+            job=job,
+            force=force,
+            stored_extractions={"extract_srs": [workspace.file_path("srs.txt")]},
+        ),
+        lineage=lineage, job=job, force=force, llm=llm
+    )
+
+# ================================
+# SRS + SDD to Test Cases Conversion
+# ================================
+
+def build_test_case_tasks(workspace, llm):
+    """Build the SRS + SDD -> test case agents and tasks, writing testcases.md in `workspace`."""
+    return compile_pipeline("test_cases", workspace, llm)
+
+
+def sharded_test_case_tasks(workspace, llm):
+    """Test case tasks that generate and review one shard per feature, then merge them.
+
+    A Step between scenario extraction and formatting splits the scenarios by feature,
+    runs a generate/review pair per shard (at most TEST_CASE_SHARD_CONCURRENCY shards at
+    a time) and merges the reviewed shards with stable Test Case IDs, so run time follows
+    the largest feature instead of the whole system.
+    """
+    tasks = {task.name: task for task in pipeline_tasks("generate_test_cases", workspace, llm)}
+    shard_templates = pipeline_template("test_case_shard")
+
+    def generate_shards(outputs, run):
+        shards = split_scenarios(outputs[0].raw)
+        shard_tasks, reviews = [], []
+        for i, shard in enumerate(shards):
+            generate, review = pipeline_tasks("test_case_shard", workspace, llm)
+            values = {"feature": shard["feature"], "scenarios": shard["text"]}
+            generate = generate.model_copy(update={
+                "name": f"generate_shard_{i + 1}",
+                "description": generate.description.format(**values),
+                "expected_output": generate.expected_output.format(**values),
+            })
+            review = review.model_copy(update={
+                "name": f"review_shard_{i + 1}",
+                "description": review.description.format(**values),
+                "expected_output": review.expected_output.format(**values),
+                "context": [generate],
+            })
+            shard_tasks += [generate, review]
+            reviews.append(review.name)
+        results = run.run_tasks(shard_tasks, max_workers=TEST_CASE_SHARD_CONCURRENCY)
+        return merge_shards(shards, [results[name].raw for name in reviews])
+
+    extract = tasks["extract_test_scenarios"]
+    merge = Step("merge_test_case_shards", generate_shards, context=[extract], tasks=shard_templates)
+    format_task = tasks["format_and_save_test_cases_task"].model_copy(update={"context": [merge]})
+    return [extract, merge, format_task]
+
+
+def generate_test_cases(workspace, job=None, force=False, llm=None, sharded=None):
+    """Generate test cases (testcases.md) from srs.txt and sdd.txt in `workspace`.
+
+    Scenarios already extracted from the same SRS and SDD, with the same models and
+    extraction prompt, replace extract_test_scenarios. `sharded` (default:
+    TEST_CASE_SHARDING) generates and reviews the test cases per feature in parallel,
+    see sharded_test_case_tasks.
+    """
+    llm = llm or _build_llm(job)
+    sharded = TEST_CASE_SHARDING if sharded is None else sharded
+    tasks = sharded_test_case_tasks(workspace, llm) if sharded else pipeline_tasks("generate_test_cases", workspace, llm)
+    return run_pipeline(
+        "generate_test_cases",
+        tasks,
+        [workspace.file_path("srs.txt"), workspace.file_path("sdd.txt")],
+        {workspace.file_path("testcases.md"): "format_and_save_test_cases_task"},
+        job=job,
+        force=force,
+        stored_extractions={
+            "extract_test_scenarios": [workspace.file_path("srs.txt"), workspace.file_path("sdd.txt")],
+        },
+    )
+
+
+# ================================
+# BRD to SRS, SDD and Test Cases in one run
+# ================================
+
+def build_full_chain_tasks(workspace, llm):
+    """Build the SRS, SDD and test case tasks as one graph reading only brd.txt.
+
+    Stages hand their outputs to each other in memory instead of re-reading generated files:
+    the SDD tasks start from the SRS analysts' structured outputs in place of extract_srs, and
+    test case generation starts from the categorized requirements and interface validation
+    rules in place of extract_test_scenarios. Each stage starts as soon as its inputs exist.
+    """
+    srs_tasks = build_srs_tasks(workspace, llm)
+    sdd_tasks = build_sdd_tasks(workspace, llm)
+    test_case_tasks = build_test_case_tasks(workspace, llm)
+    srs = {task.name: task for task in srs_tasks}
+    sdd = {task.name: task for task in sdd_tasks}
+
+    extract_srs = sdd["extract_srs"]
+    sdd_tasks.remove(extract_srs)
+    replace_context(sdd_tasks, extract_srs, [
+        srs["business_analysis_task"],
+        srs["technical_analysis_task"],
+        srs["requirement_categorize_task"],
+    ])
+    extract_test_scenarios = test_case_tasks[0]
+    test_case_tasks.remove(extract_test_scenarios)
+    replace_context(test_case_tasks, extract_test_scenarios, [
+        srs["requirement_categorize_task"],
+        sdd["define_interface_validation_rules"],
+    ])
+
+    return srs_tasks + sdd_tasks + test_case_tasks
+
+
+def generate_full_chain(workspace, job=None, force=False, llm=None):
+    """Generate srs1.md, sdd.md and testcases.md from brd.txt as a single task graph."""
+    return run_pipeline(
+        "generate_full_chain",
+        pipeline_tasks("generate_full_chain", workspace, llm or _build_llm(job)),
+        [workspace.file_path("brd.txt")],
+        {
+            workspace.file_path("srs1.md"): "srs_format_task",
+            workspace.file_path("sdd.md"): "format_export_sdd",
+            workspace.file_path("testcases.md"): "format_and_save_test_cases_task",
+        },
+        job=job,
+        force=force
+    )
+
+
+# ================================
+# Pipeline templates
+# ================================
+
+_BUILDERS = {
+    "generate_srs": build_srs_tasks,
+    "generate_sdd": build_sdd_tasks,
+    "generate_test_cases": build_test_case_tasks,
+    "generate_full_chain": build_full_chain_tasks,
+    "revise_section": lambda workspace, llm: compile_pipeline("revise_section", workspace, llm),
+    "test_case_shard": lambda workspace, llm: compile_pipeline("test_case_shard", workspace, llm),
+}
+# Templates are built against a workspace that is never created; tools are rebound per run.
+_TEMPLATE_WORKSPACE = os.path.join(WORKSPACE_ROOT, "_template")
+
+
+def _build_llm(job):
+    from llm import build_llm
+
+    return build_llm(cancel_event=job.cancel_event if job else None)
+
+
+@functools.lru_cache(maxsize=None)
+def pipeline_template(kind):
+    """Agents and tasks of pipeline `kind`, built once per process and never executed."""
+    return tuple(_BUILDERS[kind](Workspace(_TEMPLATE_WORKSPACE), _build_llm(None)))
+
+
+def pipeline_tasks(kind, workspace, llm):
+    """Tasks for one run of pipeline `kind`, using `llm` and tools bound to `workspace`.
+
+    Agents and tasks are shallow copies of the cached template, so the prompts, task
+    wiring and crewai validation are reused; each run only gets its own LLM, tool
+    instances, tool result cache and task state. Set PIPELINE_TEMPLATES=false to build
+    every run from scratch instead.
+    """
+    if not PIPELINE_TEMPLATES:
+        return _BUILDERS[kind](workspace, llm)
+    from crewai.agents.cache import CacheHandler
+
+    tools, agents, tasks = {}, {}, {}
+
+    def bind(template_tools):
+        bound = []
+        for tool in template_tools or []:
+            if id(tool) not in tools:
+                tools[id(tool)] = workspace.bind_tool(tool)
+            bound.append(tools[id(tool)])
+        return bound
+
+    def copy_task(template):
+        if id(template) in tasks:
+            return tasks[id(template)]
+        agent = template.agent
+        if id(agent) not in agents:
+            copy = agent.model_copy(update={"llm": llm, "tools": bind(agent.tools)})
+            # A fresh cache handler: tool results must never leak between runs.
+            copy.set_cache_handler(CacheHandler())
+            agents[id(agent)] = copy
+        context = template.context
+        tasks[id(template)] = template.model_copy(update={
+            "agent": agents[id(agent)],
+            "context": [copy_task(dep) for dep in context] if isinstance(context, list) else context,
+            "tools": bind(template.tools),
+            "processed_by_agents": set(),
+        })
+        return tasks[id(template)]
+
+    return [copy_task(template) for template in pipeline_template(kind)]
+
+
+# Pipeline registry: display label, entry point, input file names expected in the
+# workspace, the final documents each run produces, with their labels, and whether
+# the entry point accepts a revision `lineage` for incremental regeneration.
+PIPELINES = {
+    "generate_srs": {
+        "label": "SRS",
+        "run": generate_srs,
+        "inputs": ["brd.txt"],
+        "outputs": {"srs1.md": "SRS"},
+        "revisable": True,
+    },
+    "generate_sdd": {
+        "label": "SDD",
+        "run": generate_sdd,
+        "inputs": ["srs.txt"],
+        "outputs": {"sdd.md": "SDD"},
+        "revisable": True,
+    },
+    "generate_test_cases": {
+        "label": "Test Cases",
+        "run": generate_test_cases,
+        "inputs": ["srs.txt", "sdd.txt"],
+        "outputs": {"testcases.md": "Test Cases"},
+    },
+    "generate_full_chain": {
+        "label": "Full Chain",
+        "run": generate_full_chain,
+        "inputs": ["brd.txt"],
+        "outputs": {"srs1.md": "SRS", "sdd.md": "SDD", "testcases.md": "Test Cases"},
+    },
+}
@@ -0,0 +1,199 @@
+"""Process-wide rate limiter in front of every LLM call the pipelines make.
+
+All runs in the process (every Streamlit session, every job worker and every
+agent thread) share one limiter, so concurrent runs queue for the provider's
+quota instead of each discovering it through HTTP 429 errors. Each model has a
+token bucket for requests per minute and one for tokens per minute; a call
+waits until both have room.
+
+Waiting calls are admitted in priority order: calls from runs that have
+completed more of their tasks go first, so under load runs finish one after
+another instead of all slowing down together. When the provider still answers
+with a rate limit error, the model is paused for a jittered exponential
+backoff (or the provider's Retry-After) and the call queues again, so
+every caller backs off together instead of retrying in a storm.
+"""
+import bisect
+import itertools
+import os
+import random
+import threading
+import time
+
+from metrics import current_task
+from scheduler import RunCancelled
+
+# 0 disables a bucket; 429 responses are still retried with backoff.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "2"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+
+# Waiting calls re-check cancellation at least this often.
+_POLL_SECONDS = 1.0
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute and holds at most a minute's worth."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (a full bucket for calls larger than it)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        # The level may go negative: completion tokens are charged after the call.
+        self.level -= amount
+
+
+class _ModelLimits:
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+
+
+class RateLimiter:
+    """Per-model request and token buckets shared by all threads, admitting waiting calls by priority."""
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_retries=LLM_RATE_LIMIT_RETRIES, backoff_base=LLM_BACKOFF_BASE_SECONDS,
+                 backoff_max=LLM_BACKOFF_MAX_SECONDS):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._models = {}
+        # Tickets of waiting calls, (priority, arrival, model), most urgent first.
+        self._waiting = []
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+        self._random = random.Random()
+
+    def _limits(self, model):
+        if model not in self._models:
+            self._models[model] = _ModelLimits(self.requests_per_minute, self.tokens_per_minute)
+        return self._models[model]
+
+    def acquire(self, model, tokens=0, priority=1.0, cancel_event=None):
+        """Block until a call to `model` estimated at `tokens` tokens may start; return the seconds waited.
+
+        Lower `priority` values are admitted first, ties in arrival order. Setting
+        `cancel_event` while waiting raises RunCancelled.
+        """
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._arrivals), model)
+            bisect.insort(self._waiting, ticket)
+            try:
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise RunCancelled("Run was cancelled")
+                    delay = self._delay(ticket, tokens)
+                    if delay <= 0:
+                        break
+                    self._cond.wait(min(delay, _POLL_SECONDS))
+                self._take(model, tokens)
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+        return time.monotonic() - started
+
+    def try_acquire(self, model, tokens=0):
+        """Admit a call to `model` only if it can start now without overtaking a waiting call.
+
+        Returns whether it was admitted; used for optional requests such as hedges.
+        """
+        with self._cond:
+            if any(other[2] == model for other in self._waiting) or self._wait_time(model, tokens) > 0:
+                return False
+            self._take(model, tokens)
+            return True
+
+    def _take(self, model, tokens):
+        limits = self._limits(model)
+        if limits.requests is not None:
+            limits.requests.take(1)
+        if limits.tokens is not None:
+            limits.tokens.take(tokens)
+
+    def _delay(self, ticket, tokens):
+        model = ticket[2]
+        for other in self._waiting:
+            if other == ticket:
+                break
+            if other[2] == model:
+                # A more urgent call to the same model goes first; it notifies when admitted.
+                return _POLL_SECONDS
+        return self._wait_time(model, tokens)
+
+    def _wait_time(self, model, tokens):
+        now = time.monotonic()
+        limits = self._limits(model)
+        delays = [limits.paused_until - now]
+        if limits.requests is not None:
+            delays.append(limits.requests.wait_time(1, now))
+        if limits.tokens is not None:
+            delays.append(limits.tokens.wait_time(tokens, now))
+        return max(delays)
+
+    def consume(self, model, tokens):
+        """Charge `tokens` more to the token bucket of `model`, e.g. the completion of an admitted call."""
+        with self._cond:
+            limits = self._limits(model)
+            if limits.tokens is not None:
+                limits.tokens.take(tokens)
+
+    def backoff(self, model, attempt, retry_after=None):
+        """Pause every call to `model` after its `attempt`-th rate limit error; return the pause in seconds.
+
+        The pause is `retry_after` when the provider sent one, otherwise an exponential
+        backoff with jitter, so retries from many threads spread out.
+        """
+        if retry_after:
+            delay = min(retry_after, self.backoff_max)
+        else:
+            ceiling = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+            delay = ceiling / 2 + self._random.uniform(0, ceiling / 2)
+        with self._cond:
+            limits = self._limits(model)
+            limits.paused_until = max(limits.paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+
+def call_priority():
+    """Priority of a call from this thread: the fraction of its run's tasks not yet completed."""
+    task_metrics = current_task()
+    run = task_metrics.run if task_metrics is not None else None
+    return 1.0 if run is None else 1.0 - run.progress()
+
+
+def retry_after(error):
+    """Seconds from the Retry-After header of a provider error, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(messages):
+    """Rough token count of `messages` (~4 characters per token), cheap enough to run before every call."""
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,58 @@
+"""Section retrieval tool for uploaded documents.
+
+Instead of handing agents the whole BRD/SRS/SDD through FileReadTool, each
+document is split into sections along its headings and indexed locally (see
+sections.py), and agents query it for the few sections relevant to their step.
+"""
+import os
+from typing import Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field, PrivateAttr
+
+from sections import RETRIEVAL_TOP_K, SectionIndex
+
+
+class SectionSearchInput(BaseModel):
+    """Input for SectionSearchTool."""
+
+    query: str = Field(..., description="What you are looking for, e.g. a section name or topic keywords")
+
+
+class SectionSearchTool(BaseTool):
+    """Returns only the sections of one document that match a query."""
+
+    name: str = "Search document sections"
+    description: str = "Searches a document and returns the sections most relevant to the query."
+    args_schema: Type[BaseModel] = SectionSearchInput
+    file_path: str
+    document_label: str = "document"
+    top_k: int = RETRIEVAL_TOP_K
+    _index: SectionIndex = PrivateAttr(default=None)
+
+    def __init__(self, file_path, document_label="document", top_k=RETRIEVAL_TOP_K, **kwargs):
+        # The file may not exist yet when a pipeline is built (e.g. the SRS in the full chain);
+        # the index is then built on first use.
+        index = _load_index(file_path) if os.path.isfile(file_path) else None
+        outline = f" Its sections are: {'; '.join(index.outline())}" if index else ""
+        kwargs.setdefault("name", f"Search {document_label} sections")
+        kwargs.setdefault(
+            "description",
+            f"Searches the {document_label} and returns only the sections relevant to 'query'. "
+            f"Call it once per topic you need.{outline}",
+        )
+        super().__init__(file_path=file_path, document_label=document_label, top_k=top_k, **kwargs)
+        self._index = index
+
+    def _run(self, query, **kwargs):
+        if self._index is None:
+            self._index = _load_index(self.file_path)
+        sections = self._index.search(query, top_k=self.top_k)
+        if not sections:
+            return f"No sections matched '{query}'. Try a section name from the tool description."
+        return "\n\n----------\n\n".join(f"[{s['title']}]\n{s['text']}" for s in sections)
+
+
+def _load_index(file_path):
+    with open(file_path, "r", errors="replace") as f:
+        return SectionIndex.from_text(f.read())
@@ -0,0 +1,236 @@
+"""Section-level incremental regeneration for new revisions of an input document.
+
+The input and generated output of the latest run of each document lineage (a
+pipeline plus the uploaded file name without its version suffix, scoped to the
+user or directory it came from) are kept on disk, along with the signature of
+the models and prompts that produced them. When a new revision arrives, it is diffed against the previous one
+section by section. If only a few sections changed, each changed section is
+routed to the output sections that cover it, only those are rewritten, and
+every other output section is spliced back in unchanged.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sections import SectionIndex, split_sections
+
+REVISIONS_DIR = os.getenv("REVISIONS_DIR", os.path.join(".cache", "revisions"))
+REVISIONS_MAX_AGE_DAYS = float(os.getenv("REVISIONS_MAX_AGE_DAYS", "30"))
+# Above this share of changed input sections a full run is cheaper and safer than patching.
+REVISION_MAX_CHANGED_RATIO = float(os.getenv("REVISION_MAX_CHANGED_RATIO", "0.3"))
+# Output sections each changed input section is routed to.
+REVISION_TOP_K = int(os.getenv("REVISION_TOP_K", "2"))
+
+_VERSION_SUFFIX = re.compile(r"([\s._-]*(v|ver|version|rev|revision|r)?[\s._-]*\d+(\.\d+)*|\s*\(\d+\))$")
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def revision_lineage(file_name, scope=None):
+    """Name shared by all revisions of a document, e.g. "Portal BRD v3.pdf" -> "portal brd".
+
+    With a `scope` (e.g. the session or source directory), documents of the same name
+    from different scopes get separate lineages: "<scope>:portal brd".
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0].strip().lower()
+    lineage = stem
+    while True:
+        trimmed = _VERSION_SUFFIX.sub("", lineage).strip()
+        if trimmed == lineage or not trimmed:
+            break
+        lineage = trimmed
+    lineage = lineage or stem
+    return f"{scope}:{lineage}" if scope else lineage
+
+
+class RevisedRun:
+    """A document updated from the previous revision's output instead of a full run."""
+
+    from_cache = False
+
+    def __init__(self, raw, revised_sections, total_sections):
+        self.raw = raw
+        self.revised_sections = revised_sections
+        self.total_sections = total_sections
+
+    def __str__(self):
+        return self.raw
+
+
+class RevisionStore:
+    """Latest input and outputs per (pipeline, lineage), one JSON file each."""
+
+    def __init__(self, directory=REVISIONS_DIR, max_age_seconds=None):
+        self.directory = directory
+        self.max_age_seconds = (
+            max_age_seconds if max_age_seconds is not None else REVISIONS_MAX_AGE_DAYS * 24 * 3600
+        )
+        self._lock = threading.Lock()
+
+    def _path(self, pipeline, lineage):
+        key = hashlib.sha256(f"{pipeline}:{lineage}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, pipeline, lineage, signature=None):
+        """Return {"inputs": {...}, "outputs": {...}} of the previous revision, or None.
+
+        A revision produced under another `signature` (models and prompts) is not returned,
+        so its outputs are never patched with a different configuration.
+        """
+        path = self._path(pipeline, lineage)
+        try:
+            if self.max_age_seconds and time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return record if record.get("signature") == signature else None
+
+    def put(self, pipeline, lineage, inputs, outputs, signature=None):
+        """Replace the stored revision with `inputs` and `outputs` ({file name: text}) made under `signature`."""
+        record = {
+            "pipeline": pipeline,
+            "lineage": lineage,
+            "signature": signature,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "inputs": inputs,
+            "outputs": outputs,
+        }
+        path = self._path(pipeline, lineage)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+
+
+def diff_sections(old_text, new_text):
+    """Compare two revisions section by section.
+
+    Returns (changes, section count) where each change is a dict with the section `title`
+    and its `old` and `new` text ("" for added or removed sections). Sections are matched
+    by heading path; whitespace-only edits are not changes.
+    """
+    def keyed(text):
+        sections, seen = {}, {}
+        for section in split_sections(text):
+            occurrence = seen[section["title"]] = seen.get(section["title"], 0) + 1
+            sections[(section["title"], occurrence)] = section["text"]
+        return sections
+
+    old, new = keyed(old_text), keyed(new_text)
+    changes = []
+    for key in list(new) + [key for key in old if key not in new]:
+        before, after = old.get(key, ""), new.get(key, "")
+        if _normalize(before) != _normalize(after):
+            changes.append({"title": key[0], "old": before, "new": after})
+    return changes, max(len(old), len(new))
+
+
+def _normalize(text):
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def split_blocks(text):
+    """Split a markdown document into blocks that concatenate back to exactly `text`.
+
+    Blocks start at headings of the document's section level (the shallowest heading
+    level used more than once) or above, so a lone title heading starts the first block.
+    Returns a list of {"title", "text"} dicts.
+    """
+    lines = text.splitlines(keepends=True)
+    headings = []
+    for i, line in enumerate(lines):
+        match = _MARKDOWN_HEADING.match(line.strip())
+        if match:
+            headings.append((i, len(match.group(1)), match.group(2).strip("*_ ")))
+    levels = [level for _, level, _ in headings]
+    repeated = [level for level in set(levels) if levels.count(level) > 1]
+    if not repeated:
+        return [{"title": "Document", "text": text}]
+    section_level = min(repeated)
+
+    blocks, start, title = [], 0, "Preamble"
+    for i, level, heading_title in headings:
+        if level > section_level:
+            continue
+        if i > start:
+            blocks.append({"title": title, "text": "".join(lines[start:i])})
+        start, title = i, heading_title
+    blocks.append({"title": title, "text": "".join(lines[start:])})
+    return blocks
+
+
+class RevisionPlan:
+    """Which output blocks to rewrite for a new input revision, and with which changes."""
+
+    def __init__(self, blocks, changes, routed):
+        self.blocks = blocks
+        self.changes = changes
+        # {block index: [change, ...]}, in document order
+        self.routed = routed
+
+    @property
+    def unchanged(self):
+        return not self.changes
+
+    def splice(self, revised):
+        """Rebuild the document with `revised` ({block index: new text}) in place of old blocks."""
+        parts = []
+        for i, block in enumerate(self.blocks):
+            text = revised.get(i, "").strip()
+            if not text:
+                parts.append(block["text"])
+                continue
+            # Keep the block's trailing blank lines so the sections stay separated.
+            trailing = block["text"][len(block["text"].rstrip()):] or "\n"
+            parts.append(text + trailing)
+        return "".join(parts)
+
+
+def plan_revision(old_input, new_input, old_output, max_changed_ratio=REVISION_MAX_CHANGED_RATIO,
+                  top_k=REVISION_TOP_K):
+    """Plan an incremental update of `old_output`, or return None when a full run is needed.
+
+    A full run is needed when too large a share of the input sections changed, when the
+    previous output has no section structure, or when a changed section matches no
+    output section at all (e.g. a whole new topic).
+    """
+    changes, total = diff_sections(old_input, new_input)
+    blocks = split_blocks(old_output)
+    if not changes:
+        return RevisionPlan(blocks, [], {})
+    if len(changes) > max_changed_ratio * total or len(blocks) < 2:
+        return None
+
+    index = SectionIndex(blocks)
+    positions = {id(block): i for i, block in enumerate(blocks)}
+    routed = {}
+    for change in changes:
+        matches = index.search(f"{change['title']}\n{change['old']}\n{change['new']}", top_k=top_k)
+        if not matches:
+            return None
+        for block in matches:
+            routed.setdefault(positions[id(block)], []).append(change)
+    return RevisionPlan(blocks, changes, dict(sorted(routed.items())))
+
+
+def format_changes(changes):
+    """Render input changes for a revision prompt."""
+    parts = []
+    for change in changes:
+        if not change["old"]:
+            parts.append(f"Added section '{change['title']}':\n{change['new']}")
+        elif not change["new"]:
+            parts.append(f"Removed section '{change['title']}':\n{change['old']}")
+        else:
+            parts.append(f"Section '{change['title']}' before:\n{change['old']}\n\nafter:\n{change['new']}")
+    return "\n\n----------\n\n".join(parts)
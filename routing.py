@@ -0,0 +1,138 @@
+"""Per-task model routing loaded from model_routes.yaml.
+
+Tasks are assigned to tiers (e.g. a strong model for analysis and writing, a
+fast one for mechanical formatting) by task name or by the name of their agent
+in pipelines.yaml. Each tier lists models in order of preference with a
+timeout; when a call times out, the next model of the tier is tried. A tier
+can also set the deadline budget of its tasks and opt out of hedging (see
+hedging.py).
+
+Model names may reference environment variables as ${NAME} or ${NAME:-default},
+so deployments can pick models in .env without editing the routes. Without a
+routes file every task uses MODEL.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+
+import yaml
+
+from pipeline_spec import load_spec
+
+MODEL_ROUTES_PATH = os.getenv(
+    "MODEL_ROUTES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_routes.yaml")
+)
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_ENV_REFERENCE = re.compile(r"\$\{(\w+)(?::-([^}]*))?\}")
+# Tasks created per section or shard are named after their template plus a number.
+_INSTANCE_SUFFIX = re.compile(r"_\d+$")
+
+
+class ModelRoutingError(Exception):
+    """The routes file is malformed or assigns an unknown tier."""
+
+
+class Route:
+    """Models to try in order for one task, the timeout of each attempt and the task's deadline, in seconds."""
+
+    def __init__(self, tier, models, timeout=None, deadline=None, hedge=True):
+        self.tier = tier
+        self.models = models
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge = hedge
+
+
+def default_model():
+    return os.getenv("MODEL") or DEFAULT_MODEL
+
+
+def _expand(value):
+    return _ENV_REFERENCE.sub(lambda match: os.getenv(match.group(1)) or (match.group(2) or ""), str(value)).strip()
+
+
+class ModelRouter:
+    """Resolves the Route of a task from tier definitions and task/agent assignments."""
+
+    def __init__(self, tiers, default_tier, tasks=None, agents=None):
+        if default_tier not in tiers:
+            raise ModelRoutingError(f"default tier {default_tier!r} is not defined")
+        for name, tier in list((tasks or {}).items()) + list((agents or {}).items()):
+            if tier not in tiers:
+                raise ModelRoutingError(f"{name!r} is assigned to unknown tier {tier!r}")
+        self.tiers = tiers
+        self.default_tier = default_tier
+        self.tasks = dict(tasks or {})
+        self.agents = dict(agents or {})
+        self._task_agents = {
+            task_name: task["agent"]
+            for pipeline in load_spec().values()
+            for task_name, task in pipeline["tasks"].items()
+        }
+
+    @classmethod
+    def from_file(cls, path=MODEL_ROUTES_PATH):
+        with open(path, "r") as f:
+            config = yaml.safe_load(f) or {}
+        tiers = {}
+        for name, tier in (config.get("tiers") or {}).items():
+            models = []
+            for model in tier.get("models") or []:
+                model = _expand(model)
+                if model and model not in models:
+                    models.append(model)
+            timeout, deadline = tier.get("timeout"), tier.get("deadline")
+            tiers[name] = Route(
+                name,
+                models or [default_model()],
+                float(timeout) if timeout else None,
+                float(deadline) if deadline else None,
+                bool(tier.get("hedge", True)),
+            )
+        if not tiers:
+            raise ModelRoutingError(f"{path} defines no tiers")
+        return cls(tiers, config.get("default_tier") or next(iter(tiers)), config.get("tasks"), config.get("agents"))
+
+    def route(self, task_name=None):
+        """Route for the task named `task_name` (the default tier when it has no assignment)."""
+        for name in (task_name, _INSTANCE_SUFFIX.sub("", task_name or "")):
+            if not name:
+                continue
+            if name in self.tasks:
+                return self.tiers[self.tasks[name]]
+            agent = self._task_agents.get(name)
+            if agent in self.agents:
+                return self.tiers[self.agents[agent]]
+        return self.tiers[self.default_tier]
+
+    def signature(self):
+        """Stable description of the resolved routes, for cache keys.
+
+        Only the models are included: timeouts, deadlines and hedging change how long a
+        call may take, not what a completed output says, so tuning them keeps cached runs
+        and checkpoints usable (e.g. raising a deadline to resume a run that ran out of it).
+        """
+        payload = {
+            "tiers": {name: route.models for name, route in sorted(self.tiers.items())},
+            "default": self.default_tier,
+            "tasks": self.tasks,
+            "agents": self.agents,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def model_router(path=MODEL_ROUTES_PATH):
+    """The router configured in `path`, or None when there is no routes file."""
+    if not os.path.isfile(path):
+        return None
+    return ModelRouter.from_file(path)
+
+
+def models_signature():
+    """The configured models as a string: MODEL, plus the routes' signature when routing is on."""
+    router = model_router()
+    return default_model() if router is None else f"{default_model()}+routes:{router.signature()}"
@@ -0,0 +1,184 @@
+"""Content-addressed on-disk cache of whole pipeline results.
+
+A cache key combines the hashes of the input documents, the pipeline name, the
+model and the prompt text of every agent/task, so any change to one of those
+produces a fresh run while byte-identical re-uploads return the stored document.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+RUN_CACHE_DIR = os.getenv("RUN_CACHE_DIR", os.path.join(".cache", "runs"))
+RUN_CACHE_MAX_MB = float(os.getenv("RUN_CACHE_MAX_MB", "200"))
+RUN_CACHE_MAX_AGE_DAYS = float(os.getenv("RUN_CACHE_MAX_AGE_DAYS", "7"))
+
+_CHUNK_SIZE = 1024 * 1024
+_DIGEST_MEMO_SIZE = 4096
+
+# Digests by (path, inode, size, mtime), so an unchanged file is hashed at most once.
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def remember_digest(path, digest):
+    """Record the known SHA-256 `digest` of the file at `path`, e.g. one hashed while it was written."""
+    key = _stat_key(path)
+    with _digests_lock:
+        _digests[key] = digest
+        while len(_digests) > _DIGEST_MEMO_SIZE:
+            del _digests[next(iter(_digests))]
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file, read in chunks (memoized while the file is unchanged)."""
+    key = _stat_key(path)
+    with _digests_lock:
+        cached = _digests.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    remember_digest(path, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def prompt_fingerprint(tasks):
+    """Hash the agent and task prompt text (and task wiring) of a pipeline."""
+    parts = []
+    for task in tasks:
+        if not hasattr(task, "agent"):
+            # A scheduler.Step: its wiring plus the prompts of the tasks it runs.
+            parts.append({
+                "step": task.name,
+                "context": [dep.name for dep in task.context or []],
+                "tasks": prompt_fingerprint(task.tasks),
+                "fingerprint": task.fingerprint,
+            })
+            continue
+        agent = task.agent
+        parts.append({
+            "task": task.name,
+            "description": task.description,
+            "expected_output": task.expected_output,
+            "context": [dep.name for dep in task.context or []],
+            "role": agent.role,
+            "goal": agent.goal,
+            "backstory": agent.backstory,
+        })
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CachedRun:
+    """A pipeline result served from the run cache instead of a fresh crew run."""
+
+    from_cache = True
+
+    def __init__(self, key, raw):
+        self.key = key
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+
+class RunCache:
+    """Stores one markdown document per key with age- and size-based eviction."""
+
+    def __init__(self, directory=RUN_CACHE_DIR, max_bytes=None, max_age_seconds=None):
+        self.directory = directory
+        self.max_bytes = max_bytes if max_bytes is not None else int(RUN_CACHE_MAX_MB * 1024 * 1024)
+        self.max_age_seconds = (
+            max_age_seconds if max_age_seconds is not None else RUN_CACHE_MAX_AGE_DAYS * 24 * 3600
+        )
+        self._lock = threading.Lock()
+
+    def key(self, pipeline, input_paths, model, prompts):
+        """Build the cache key for a pipeline run over the given input files."""
+        payload = {
+            "pipeline": pipeline,
+            "inputs": [file_digest(path) for path in input_paths],
+            "model": model,
+            "prompts": prompts,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.md")
+
+    def get(self, key):
+        """Return the cached document for `key`, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+            self.invalidate(key)
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            # Access time drives LRU eviction; mtime stays the creation time for age checks.
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            return None  # evicted by another thread or process since the stat
+        return content
+
+    def put(self, key, content):
+        """Store `content` under `key` and evict entries over the age/size limits."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def invalidate(self, key):
+        """Drop a single entry, e.g. when regeneration is forced."""
+        _remove(self._path(key))
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".md"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                        _remove(path)
+                        continue
+                    entries.append((stat.st_atime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+
+
+def _remove(path):
+    """Delete a cache file that another thread or process may have deleted already."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
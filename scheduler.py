@@ -0,0 +1,234 @@
+"""Dependency-aware scheduler that runs pipeline steps on a bounded worker pool.
+
+Each step declares which earlier steps it needs; steps whose dependencies are
+satisfied run at the same time (fan-out) and later steps wait for all of their
+inputs (fan-in).
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from datetime import datetime
+
+from streaming import stream_to
+
+DEFAULT_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "4"))
+
+
+class TaskGraphError(Exception):
+    """Raised when a task graph has unknown dependencies, duplicates or cycles."""
+
+
+class RunCancelled(Exception):
+    """Raised when a run is cancelled before it finished."""
+
+
+class TaskGraph:
+    """A DAG of named steps, each called with the results of its dependencies."""
+
+    def __init__(self):
+        self._steps = {}
+        self.timings = {}
+
+    def add(self, name, fn, depends_on=()):
+        """Register `fn(upstream)` under `name`; `upstream` maps dependency names to results."""
+        if name in self._steps:
+            raise TaskGraphError(f"Duplicate step name: {name}")
+        self._steps[name] = (fn, tuple(depends_on))
+
+    def validate(self):
+        """Check that every dependency exists and the graph has no cycles."""
+        for name, (_, deps) in self._steps.items():
+            for dep in deps:
+                if dep not in self._steps:
+                    raise TaskGraphError(f"Step '{name}' depends on unknown step '{dep}'")
+
+        resolved = set()
+        remaining = dict(self._steps)
+        while remaining:
+            ready = [name for name, (_, deps) in remaining.items() if resolved.issuperset(deps)]
+            if not ready:
+                raise TaskGraphError(f"Dependency cycle between steps: {', '.join(sorted(remaining))}")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
+
+    def run(self, max_workers=None, on_step_start=None, on_step_complete=None, cancel_event=None):
+        """Run all steps, at most `max_workers` at a time, and return their results by name.
+
+        The first failing step stops the scheduling of new steps and its exception is re-raised
+        once the steps already running have finished; those that succeed are still reported to
+        `on_step_complete`, so their (already paid for) results can be checkpointed. Setting
+        `cancel_event` stops new steps from starting and raises RunCancelled; running steps
+        are expected to watch it themselves (pipeline LLMs stop at their next call).
+        """
+        self.validate()
+        self.timings = {}
+        results = {}
+        pending = dict(self._steps)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers or DEFAULT_MAX_WORKERS) as pool:
+            try:
+                while pending or running:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise RunCancelled("Run was cancelled")
+                    for name in [n for n, (_, deps) in pending.items() if all(d in results for d in deps)]:
+                        fn, deps = pending.pop(name)
+                        upstream = {dep: results[dep] for dep in deps}
+                        running[pool.submit(self._run_step, name, fn, upstream, on_step_start)] = name
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name] = future.result()
+                        if on_step_complete:
+                            on_step_complete(name, results[name])
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                self._finish_running(running, on_step_complete)
+                raise
+
+        return results
+
+    @staticmethod
+    def _finish_running(running, on_step_complete):
+        """Wait for the steps that were already running and report the ones that succeeded."""
+        for future, name in running.items():
+            if future.cancelled() or future.exception() is not None:
+                continue
+            if on_step_complete:
+                try:
+                    on_step_complete(name, future.result())
+                except Exception:
+                    continue  # the error being raised matters more than this report
+
+    def _run_step(self, name, fn, upstream, on_step_start):
+        if on_step_start:
+            on_step_start(name)
+        started_at = datetime.now()
+        try:
+            return fn(upstream)
+        finally:
+            self.timings[name] = (started_at, datetime.now())
+
+
+class Step:
+    """A plain Python step among crewai tasks, e.g. a deterministic merge or a dynamic fan-out.
+
+    `fn(outputs, run)` is called with the outputs of the `context` tasks, in order, and the
+    CrewRun executing the graph, and returns the step's text. Downstream tasks list the
+    step in their `context` like any task. `tasks` are the crewai tasks the step may run
+    through `run`, so their prompts count towards the pipeline's fingerprint, as does
+    `fingerprint`, a description of anything else that determines the step's output.
+    """
+
+    def __init__(self, name, fn, context=(), tasks=(), fingerprint=None):
+        self.name = name
+        self.fn = fn
+        self.context = list(context)
+        self.tasks = list(tasks)
+        self.fingerprint = fingerprint
+
+
+class StepOutput:
+    """Text produced by a Step, shaped like a crewai TaskOutput for downstream tasks."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+
+class CrewRun:
+    """Hooks of one run of crewai tasks, so Steps can run more tasks the same way."""
+
+    def __init__(self, verbose=False, on_task_start=None, on_task_complete=None, cancel_event=None,
+                 metrics=None, streams=None):
+        self.verbose = verbose
+        self.on_task_start = on_task_start
+        self.on_task_complete = on_task_complete
+        self.cancel_event = cancel_event
+        self.metrics = metrics
+        self.streams = streams
+        self.graph = None
+
+    def run_tasks(self, tasks, max_workers=None):
+        """Run `tasks` as a DAG with this run's hooks and return their outputs by name.
+
+        Their timings are added to the timings of the graph being run.
+        """
+        graph = build_task_graph(tasks, run=self)
+        outputs = graph.run(
+            max_workers=max_workers,
+            on_step_start=self.on_task_start,
+            on_step_complete=self.on_task_complete,
+            cancel_event=self.cancel_event,
+        )
+        if self.graph is not None:
+            self.graph.timings.update(graph.timings)
+        return outputs
+
+
+def build_task_graph(tasks, verbose=False, metrics=None, streams=None, run=None):
+    """Build a TaskGraph from crewai tasks and Steps, using each one's `context` as its dependencies.
+
+    With `metrics` (a metrics.RunMetrics), each task's execution is tracked under its name.
+    `streams` maps task names to streaming.DocumentStream objects that receive their tokens.
+    A `run` (CrewRun) supplies all of these instead.
+    """
+    run = run or CrewRun(verbose=verbose, metrics=metrics, streams=streams)
+    graph = TaskGraph()
+    for task in tasks:
+        if not task.name:
+            raise TaskGraphError(f"Task '{task.description[:60]}...' needs a name to be scheduled")
+        deps = [dep.name for dep in task.context or []]
+        if isinstance(task, Step):
+            graph.add(task.name, _step_runner(task, deps, run), deps)
+            continue
+        task.agent.verbose = run.verbose
+        graph.add(task.name, _task_runner(task, deps, run.metrics, (run.streams or {}).get(task.name)), deps)
+    return graph
+
+
+def run_crew_tasks(tasks, max_workers=None, verbose=False, on_task_start=None, on_task_complete=None,
+                   cancel_event=None, metrics=None, streams=None):
+    """Run crewai tasks (and Steps) as a DAG and return (outputs by task name, TaskGraph)."""
+    run = CrewRun(
+        verbose=verbose,
+        on_task_start=on_task_start,
+        on_task_complete=on_task_complete,
+        cancel_event=cancel_event,
+        metrics=metrics,
+        streams=streams,
+    )
+    graph = build_task_graph(tasks, run=run)
+    run.graph = graph
+    outputs = graph.run(
+        max_workers=max_workers,
+        on_step_start=on_task_start,
+        on_step_complete=on_task_complete,
+        cancel_event=cancel_event,
+    )
+    return outputs, graph
+
+
+def _step_runner(step, deps, run):
+    def execute(upstream):
+        return StepOutput(step.fn([upstream[dep] for dep in deps], run))
+    return execute
+
+
+def _task_runner(task, deps, metrics=None, stream=None):
+    from crewai.utilities.formatter import aggregate_raw_outputs_from_task_outputs
+
+    def run(upstream):
+        context = aggregate_raw_outputs_from_task_outputs([upstream[dep] for dep in deps])
+        with ExitStack() as stack:
+            if metrics is not None:
+                stack.enter_context(metrics.track(task.name, task.agent.role))
+            if stream is not None:
+                stack.enter_context(stream_to(stream))
+            return task.execute_sync(context=context or None)
+    return run
@@ -0,0 +1,126 @@
+"""Heading-aware section splitting and a BM25 index over document sections.
+
+Documents are split into sections along their markdown or numbered headings
+and ranked locally, with no dependencies, for the retrieval tool agents query
+(retrieval.py) and for diffing and routing revisions (revisions.py).
+"""
+import math
+import os
+import re
+from collections import Counter
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_MAX_SECTION_CHARS = int(os.getenv("RETRIEVAL_MAX_SECTION_CHARS", "4000"))
+
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+([A-Z][^.!?]{1,90})$")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+_OUTLINE_LIMIT = 60
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _heading(line):
+    """Return (level, title) if `line` looks like a heading, else None."""
+    match = _MARKDOWN_HEADING.match(line)
+    if match:
+        return len(match.group(1)), match.group(2).strip("*_ ")
+    match = _NUMBERED_HEADING.match(line)
+    if match:
+        return match.group(1).count(".") + 1, f"{match.group(1)} {match.group(2)}"
+    return None
+
+
+def _split_long(title, body, max_chars):
+    """Split an oversized section body on paragraph boundaries."""
+    if len(body) <= max_chars:
+        return [(title, body)]
+    parts, current = [], ""
+    for paragraph in body.split("\n\n"):
+        if current and len(current) + len(paragraph) > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        parts.append(current)
+    return [(f"{title} (part {i + 1}/{len(parts)})", part) for i, part in enumerate(parts)]
+
+
+def split_sections(text, max_chars=RETRIEVAL_MAX_SECTION_CHARS):
+    """Split a document into sections along markdown or numbered headings.
+
+    Each section is a dict with `title` (its heading path, e.g. "3 Requirements > 3.1 Login"),
+    `level` and `text`. Text before the first heading becomes a "Preamble" section.
+    """
+    sections = []
+    path = []
+    title, level, lines = "Preamble", 0, []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            for part_title, part in _split_long(title, body, max_chars):
+                sections.append({"title": part_title, "level": level, "text": part})
+
+    for line in text.splitlines():
+        heading = _heading(line.strip())
+        if heading is None:
+            lines.append(line)
+            continue
+        flush()
+        level, heading_title = heading
+        path = [entry for entry in path if entry[0] < level] + [(level, heading_title)]
+        title = " > ".join(entry[1] for entry in path)
+        lines = [line]
+    flush()
+    return sections
+
+
+class SectionIndex:
+    """Okapi BM25 index over document sections."""
+
+    def __init__(self, sections, k1=1.5, b=0.75):
+        self.sections = sections
+        self.k1 = k1
+        self.b = b
+        self._terms = [Counter(tokenize(f"{s['title']}\n{s['text']}")) for s in sections]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if sections else 0.0
+        document_frequency = Counter(term for terms in self._terms for term in terms)
+        total = len(sections)
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(split_sections(text))
+
+    def search(self, query, top_k=RETRIEVAL_TOP_K):
+        """Return up to `top_k` sections ranked by BM25 score, in document order."""
+        query_terms = set(tokenize(query))
+        scored = []
+        for i, terms in enumerate(self._terms):
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term)
+                if not frequency:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_length or 1))
+                score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scored.append((score, i))
+        best = sorted(scored, reverse=True)[:top_k]
+        return [self.sections[i] for _, i in sorted(best, key=lambda item: item[1])]
+
+    def outline(self, limit=_OUTLINE_LIMIT):
+        """Top-level section titles, for telling agents what they can ask for."""
+        titles = [s["title"] for s in self.sections if s["level"] <= 2]
+        if len(titles) > limit:
+            titles = titles[:limit] + [f"... and {len(titles) - limit} more"]
+        return titles
@@ -0,0 +1,124 @@
+"""Map-reduce test case generation, one shard per feature of the extracted scenarios.
+
+The scenarios are split along the features they are grouped under, each shard
+is generated and reviewed on its own (several at a time), and the reviewed
+shards are merged in document order. Test Case IDs are assigned during the
+merge as TC-<FEATURE>-<NNN>, numbered per feature, so an edit to one feature
+never renumbers the test cases of another.
+"""
+import os
+import re
+
+from revisions import split_blocks
+
+TEST_CASE_SHARDING = os.getenv("TEST_CASE_SHARDING", "false").lower() in ("1", "true", "yes")
+TEST_CASE_SHARD_CONCURRENCY = int(os.getenv("TEST_CASE_SHARD_CONCURRENCY", "4"))
+TEST_CASE_MAX_SHARDS = int(os.getenv("TEST_CASE_MAX_SHARDS", "12"))
+
+# Top-level list items that name a feature, e.g. "1. **Patient Registration**" or "- **Billing:**".
+_FEATURE_ITEM = re.compile(r"^(?:\d+[.)]|[-*])\s+\*\*(.+?)\*\*")
+_BOLD_LINE = re.compile(r"^\*\*(.+?)\*\*:?\s*$")
+_CASE_HEADING = re.compile(r"^#{2,6}\s*(?:TC|Test Case)\b[^:\n]*:[ \t]*(.*?)[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_NUMBERING = re.compile(r"^(?:feature\s+)?[\d.]+[.):]?\s+|^feature\s*:\s*", re.IGNORECASE)
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_MAX_CODE_WORDS = 3
+
+
+def split_scenarios(text, max_shards=TEST_CASE_MAX_SHARDS):
+    """Split extracted test scenarios into at most `max_shards` feature shards.
+
+    Features are the document's section headings or, without those, its top-level bold
+    list items or lines. Text before the first feature is shared context and goes with
+    every shard. Returns a list of {"feature", "text"} dicts in document order.
+    """
+    blocks = split_blocks(text)
+    if len(blocks) < 2:
+        blocks = _split_feature_items(text)
+    preamble = ""
+    if blocks and blocks[0]["title"] in ("Preamble", "Document") and len(blocks) > 1:
+        preamble = blocks.pop(0)["text"].strip()
+    shards = [
+        {"feature": _clean_title(block["title"]), "text": block["text"].strip()}
+        for block in blocks if block["text"].strip()
+    ]
+    shards = _pack(shards, max_shards)
+    if preamble:
+        for shard in shards:
+            shard["text"] = f"{preamble}\n\n{shard['text']}"
+    return shards
+
+
+def _split_feature_items(text):
+    """Split at top-level lines that name a feature in bold."""
+    blocks, title, lines = [], "Preamble", []
+    for line in text.splitlines(keepends=True):
+        match = _FEATURE_ITEM.match(line) or _BOLD_LINE.match(line)
+        if match:
+            if lines:
+                blocks.append({"title": title, "text": "".join(lines)})
+            title, lines = match.group(1).strip().rstrip(":"), []
+        lines.append(line)
+    if lines:
+        blocks.append({"title": title, "text": "".join(lines)})
+    if len(blocks) < 2:
+        return [{"title": "All Features", "text": text}]
+    return blocks
+
+
+def _pack(shards, max_shards):
+    """Merge neighbouring shards until at most `max_shards` remain, keeping sizes even."""
+    if len(shards) <= max_shards:
+        return shards
+    target = sum(len(shard["text"]) for shard in shards) / max_shards
+    packed = []
+    for shard in shards:
+        remaining_slots = max_shards - len(packed)
+        if packed and (len(packed[-1]["text"]) < target or remaining_slots <= 0):
+            packed[-1] = {
+                "feature": f"{packed[-1]['feature']}, {shard['feature']}",
+                "text": f"{packed[-1]['text']}\n\n{shard['text']}",
+            }
+        else:
+            packed.append(dict(shard))
+    return packed
+
+
+def _clean_title(title):
+    # Heading paths from split_blocks are single titles; strip numbering such as "3.1 ".
+    return _NUMBERING.sub("", title.strip("*_ ")).strip() or title
+
+
+def feature_code(feature, taken=()):
+    """Stable ID prefix for a feature, e.g. "Patient Registration & Login" -> "PATIENT-REGISTRATION-LOGIN"."""
+    words = _WORD.findall(feature.split(",")[0].upper())[:_MAX_CODE_WORDS] or ["FEATURE"]
+    code = "-".join(words)
+    candidate, n = code, 2
+    while candidate in taken:
+        candidate, n = f"{code}-{n}", n + 1
+    return candidate
+
+
+def assign_test_case_ids(text, code):
+    """Replace each `### TC: <title>` line with a numbered `### TC-<code>-<NNN>: <title>` heading.
+
+    Returns (text, number of test cases). Shards whose cases are not marked keep their text.
+    """
+    count = 0
+
+    def number(match):
+        nonlocal count
+        count += 1
+        return f"### TC-{code}-{count:03d}: {match.group(1)}"
+
+    return _CASE_HEADING.sub(number, text), count
+
+
+def merge_shards(shards, outputs):
+    """Merge reviewed shard outputs (in shard order) into one document with stable IDs."""
+    parts, taken = [], set()
+    for shard, output in zip(shards, outputs):
+        code = feature_code(shard["feature"], taken)
+        taken.add(code)
+        text, _ = assign_test_case_ids(output.strip(), code)
+        parts.append(f"## {shard['feature']}\n\n{text}")
+    return "\n\n".join(parts) + "\n"
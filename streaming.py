@@ -0,0 +1,114 @@
+"""Live token streams for tasks whose output is shown while it is generated.
+
+The scheduler binds a DocumentStream to the worker thread running a streamed
+task, and CachedLLM writes tokens into it as they arrive from the provider.
+The UI polls `DocumentStream.text()`, which strips the agent's ReAct
+scaffolding so only the document itself is shown.
+"""
+import json
+import re
+import threading
+from contextlib import contextmanager
+
+_active = threading.local()
+_FINAL_ANSWER = "Final Answer:"
+_CONTENT_FIELD = re.compile(r'"content"\s*:\s*"')
+# Models often put raw newlines inside JSON strings, so control characters are allowed.
+_DECODER = json.JSONDecoder(strict=False)
+
+
+class DocumentStream:
+    """Thread-safe buffer of the tokens of a task's current LLM call."""
+
+    def __init__(self):
+        self._chunks = []
+        self._previous = ""
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.finished = False
+
+    def begin(self):
+        """Start a new LLM call; the previous call's document is kept until this one outgrows it."""
+        with self._lock:
+            previous = extract_document("".join(self._chunks))
+            if len(previous) >= len(self._previous):
+                self._previous = previous
+            self._chunks = []
+            self.calls += 1
+
+    def write(self, token):
+        with self._lock:
+            self._chunks.append(token)
+
+    def finish(self):
+        self.finished = True
+
+    @property
+    def started(self):
+        return self.calls > 0
+
+    def raw(self):
+        with self._lock:
+            return "".join(self._chunks)
+
+    def text(self):
+        """The document part of the streamed text so far.
+
+        A short closing answer (e.g. "the file was saved") after the agent wrote the document
+        through a tool does not replace the document.
+        """
+        current = extract_document(self.raw())
+        with self._lock:
+            previous = self._previous
+        return current if len(current) >= len(previous) else previous
+
+
+def extract_document(raw):
+    """Pull the document out of a partial ReAct response.
+
+    Text after "Final Answer:" is returned as is; while the agent is still writing the
+    file through a tool, the (possibly unterminated) JSON "content" string is decoded.
+    """
+    if _FINAL_ANSWER in raw:
+        return raw.split(_FINAL_ANSWER, 1)[1].lstrip()
+    match = _CONTENT_FIELD.search(raw)
+    if match:
+        return _decode_partial_string(raw[match.end():])
+    return ""
+
+
+def _decode_partial_string(value):
+    end = 0
+    while end < len(value):
+        if value[end] == "\\":
+            end += 2
+        elif value[end] == '"':
+            break
+        else:
+            end += 1
+    candidate = value[:end]
+    # Drop a trailing half escape sequence, e.g. a lone backslash or a partial \u escape.
+    for trim in range(6):
+        try:
+            return _DECODER.decode(f'"{candidate[:len(candidate) - trim]}"')
+        except ValueError:
+            continue
+    return candidate
+
+
+@contextmanager
+def stream_to(stream):
+    """Send LLM tokens produced on this thread to `stream` for the duration of the block."""
+    previous = getattr(_active, "stream", None)
+    _active.stream = stream
+    try:
+        yield stream
+    finally:
+        if stream is not None:
+            stream.finish()
+        _active.stream = previous
+
+
+def current_stream():
+    """DocumentStream bound to this thread, or None."""
+    return getattr(_active, "stream", None)
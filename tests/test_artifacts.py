@@ -0,0 +1,98 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import pipelines
+from artifacts import ArtifactError, ArtifactStore, validate_artifact
+from run_cache import prompt_fingerprint
+from scheduler import Step
+
+REQUIREMENTS = "## Functional Requirements\n\n" + "- FR-1: Customers pay invoices by card.\n" * 10
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "artifacts.sqlite3"))
+
+
+def test_validate_keeps_the_text_and_parses_json():
+    text = (
+        "  Scenarios:\n```json\n"
+        '[{"feature": "Login", "scenarios": ["Valid login", "Wrong password", "Locked account"]}]\n```\n'
+    )
+
+    kept, data = validate_artifact("scenarios", text)
+
+    assert kept == text
+    assert data == [{"feature": "Login", "scenarios": ["Valid login", "Wrong password", "Locked account"]}]
+    with pytest.raises(ArtifactError, match="too short"):
+        validate_artifact("requirements", "FR-1")
+    with pytest.raises(ArtifactError, match="Unknown"):
+        validate_artifact("data_model", REQUIREMENTS)
+
+
+def test_latest_matches_documents_task_models_and_prompt(store):
+    store.put("requirements", REQUIREMENTS, ["srs"], task="extract_srs", models="gpt-4o", prompt="p1")
+    newer = store.put("requirements", REQUIREMENTS + "- FR-2\n", ["srs", "sdd"], task="extract_srs",
+                      models="gpt-4o", prompt="p1")
+
+    record = store.latest("requirements", "srs", task="extract_srs", models="gpt-4o", prompt="p1")
+    assert record.id == newer and record.models == "gpt-4o" and record.prompt == "p1"
+    assert store.latest("requirements", "srs", "sdd").id == newer
+    assert store.latest("requirements", "srs", "other") is None
+    assert store.latest("requirements", "srs", task="extract_test_scenarios") is None
+    assert store.latest("requirements", "srs", models="gpt-4o-mini") is None
+    assert store.latest("requirements", "srs", prompt="p2") is None
+
+
+def test_prune_keeps_the_newest_records_per_document(store):
+    ids = [store.put("requirements", REQUIREMENTS + f"v{i}", ["srs"]) for i in range(5)]
+
+    store.prune(keep_per_document=2)
+
+    assert store.latest("requirements", "srs").id == ids[-1]
+    count = store._connect().execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+    assert count == 2
+
+
+def test_stores_from_before_models_and_prompts_are_upgraded(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE artifacts (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, text TEXT NOT NULL, data TEXT,"
+            " pipeline TEXT, task TEXT, created_at REAL)"
+        )
+        conn.execute("INSERT INTO artifacts (kind, text) VALUES ('requirements', 'old')")
+    store = ArtifactStore(path)
+
+    store.put("requirements", REQUIREMENTS, ["srs"], models="gpt-4o", prompt="p1")
+
+    assert store.latest("requirements", "srs", models="gpt-4o", prompt="p1").text == REQUIREMENTS
+
+
+def _extract_task(description="Extract the requirements"):
+    agent = SimpleNamespace(role="Extractor", goal="Extract", backstory="Careful")
+    return SimpleNamespace(
+        name="extract_srs", description=description, expected_output="Requirements", context=[], agent=agent
+    )
+
+
+def test_stored_extractions_are_reused_only_for_the_same_prompt(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipelines, "artifact_store", store)
+    srs = tmp_path / "srs.txt"
+    srs.write_text("The portal lets customers pay invoices.")
+    task = _extract_task()
+    write = Step("write", lambda outputs, run: "", context=[task])
+    pipelines.record_artifacts(
+        "generate_sdd", {"extract_srs": task}, {"extract_srs": SimpleNamespace(raw=REQUIREMENTS)}, [str(srs)]
+    )
+
+    tasks = pipelines.with_stored_extraction([task, write], "extract_srs", [str(srs)])
+    assert isinstance(tasks[0], Step) and tasks[0].fn([], None) == REQUIREMENTS
+    assert tasks[1].context == [tasks[0]]
+
+    changed = _extract_task("Extract the requirements as a table")
+    assert pipelines.stored_extraction(changed, [str(srs)]) is None
+    assert pipelines.with_stored_extraction([task, write], "extract_srs", [str(srs)], force=True)[0] is task
+    assert prompt_fingerprint([changed]) != store.latest("requirements", pipelines.file_digest(str(srs))).prompt
@@ -0,0 +1,154 @@
+import pytest
+
+from assembly import (
+    LayoutError, assemble_document, assemble_sections, load_layouts, parse_sections, parse_test_cases,
+)
+
+LAYOUT = {
+    "title": "Software Requirements Specification",
+    "number_depth": 2,
+    "order": ["Introduction", ["Scope", "Project Scope"], "Requirements"],
+    "rules": [{"move": "Glossary", "into": "Introduction"}],
+}
+
+
+def _headings(document):
+    return [line for line in document.splitlines() if line.startswith("#")]
+
+
+def test_parse_sections_builds_a_tree_and_reads_named_bold_headings():
+    root = parse_sections("Intro text\n# Scope\n**In Scope**\nPayments\n## Notes\n```\n# not a heading\n```\n",
+                          heading_names=["In Scope"])
+
+    assert root.lines == ["Intro text"]
+    scope = root.children[0]
+    assert scope.title == "Scope"
+    assert [child.title for child in scope.children] == ["In Scope", "Notes"]
+    assert scope.children[1].lines == ["```", "# not a heading", "```"]
+
+
+def test_sections_are_ordered_renumbered_and_moved():
+    text = (
+        "# Portal SRS\n\n## 3. Requirements\n\nPay invoices.\n\n## Glossary\n\nBRD: business requirements.\n\n"
+        "## 1. Project Scope\n\nCustomers.\n\n## Risks\n\nLate data.\n\n## Introduction\n\nThe portal.\n"
+    )
+
+    document = assemble_sections(text, LAYOUT)
+
+    assert _headings(document) == [
+        "# Portal SRS",
+        "## 1. Introduction",
+        "### 1.1 Glossary",
+        "## 2. Project Scope",
+        "## 3. Risks",  # unlisted: stays after the section it followed
+        "## 4. Requirements",
+    ]
+    assert "BRD: business requirements." in document
+
+
+def test_documents_without_a_title_get_the_layout_title():
+    document = assemble_sections("```markdown\n## Scope\n\nCustomers.\n\n## Introduction\n\nThe portal.\n```", LAYOUT)
+
+    assert _headings(document) == ["# Software Requirements Specification", "## 1. Introduction", "## 2. Scope"]
+
+
+def test_sdd_sections_missing_from_the_validated_document_are_filled_in():
+    draft = "# SDD\n\n## Introduction\n\nDraft intro.\n\n## API Design\n\nREST.\n"
+    er_schema = "# Entity Relationship Schema\n\nusers(id, email)\n"
+    wireframes = "# Wireframes\n\n## Login Screen\n\nEmail and password.\n\n## Dashboard\n\nOpen invoices.\n"
+    rules = "## Interface Validation Rules\n\nEmail is required.\n"
+    validated = "# SDD\n\n## Introduction\n\nFinal intro.\n\n## System Architecture\n\nThree tiers.\n"
+
+    document = assemble_document(
+        "sdd.md",
+        [draft, er_schema, wireframes, rules, validated],
+        ["generate_sdd_content", "generate_er_schema", "generate_wireframe_descriptions",
+         "define_interface_validation_rules", "validate_sdd"],
+    )
+
+    assert _headings(document) == [
+        "# SDD",
+        "## 1. Introduction",
+        "## 2. System Architecture",
+        "### 2.1 ER Schema",
+        "## 3. API Design",
+        "## 4. Wireframe Designs",
+        "### 4.1 Login Screen",
+        "### 4.2 Dashboard",
+        "## 5. Interface Validation Rules",
+    ]
+    assert "Final intro." in document and "Draft intro." not in document
+    assert "users(id, email)" in document and "Email is required." in document
+
+
+def test_sections_the_document_has_are_not_filled_in_again():
+    validated = "# SDD\n\n## Wireframe Designs\n\nFinal wireframes.\n"
+
+    document = assemble_document(
+        "sdd.md", ["Draft wireframes.", validated], ["generate_wireframe_descriptions", "validate_sdd"]
+    )
+
+    assert "Final wireframes." in document and "Draft wireframes." not in document
+
+
+def test_test_cases_are_rendered_as_tables_and_completed_from_earlier_outputs():
+    generated = (
+        "## Login\n\n### TC-001: Valid login\n- Preconditions: Account exists\n- Test Steps: Sign in\n"
+        "- Expected Output: Dashboard shown\n- Priority: High\n"
+    )
+    reviewed = (
+        "## Login\n\n### TC-001: Valid login\n- Expected Result: Dashboard shown\n\n"
+        "### Test Case: Wrong password\n- Expected Result: Error shown\n"
+    )
+
+    document = assemble_document("testcases.md", [generated, reviewed])
+
+    lines = document.splitlines()
+    assert lines[0] == "# Test Cases" and "## Login" in lines
+    assert "| TC-001 | Valid login | Account exists | Sign in | Dashboard shown |  | High |  |" in lines
+    assert "| TC-002 | Wrong password |  |  | Error shown |  |  |  |" in lines
+
+
+def test_unparseable_test_cases_fall_back_to_the_last_output():
+    document = assemble_document("testcases.md", ["# Draft\n\nNothing yet.", "# Review\n\nNo cases found."])
+
+    assert _headings(document) == ["# Review"]
+    assert "Nothing yet." not in document
+
+
+def test_parse_test_cases_reads_tables():
+    spec = load_layouts()["testcases.md"]["test_cases"]
+
+    cases = parse_test_cases(
+        "| TC ID | Scenario | Expected Result |\n| --- | --- | --- |\n| TC-9 | Logout | Signed out<br>Cookie cleared |\n",
+        spec,
+    )
+
+    assert [case.fields for case in cases] == [
+        {"Test Case ID": ["TC-9"], "Title": ["Logout"], "Expected Output": ["Signed out", "Cookie cleared"]}
+    ]
+
+
+def test_parse_test_cases_reads_labelled_fields():
+    spec = load_layouts()["testcases.md"]["test_cases"]
+
+    cases = parse_test_cases("**Test Case ID:** TC-7\n**Steps:**\n1. Open\n2. Submit\n**Severity:** Major\n", spec)
+
+    assert len(cases) == 1
+    assert cases[0].fields["Test Case ID"] == ["TC-7"]
+    assert cases[0].fields["Test Steps"] == ["1. Open", "2. Submit"]
+    assert cases[0].fields["Severity Level"] == ["Major"]
+
+
+@pytest.mark.parametrize("layout, message", [
+    ("rules:\n      - {move: A}", "needs `move`"),
+    ("test_cases: {columns: [{fields: [ID]}]}", "named columns"),
+    ("test_cases: {id_column: ID, columns: [{name: Title}]}", "is not a column"),
+    ("fill: [ER Schema]", "fill maps"),
+])
+def test_malformed_layouts_are_rejected(tmp_path, layout, message):
+    path = tmp_path / "layouts.yaml"
+    path.write_text(f"documents:\n  doc.md:\n    {layout}\n")
+
+    with pytest.raises(LayoutError, match=message):
+        load_layouts(str(path))
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("pysqlite3")
+pytest.importorskip("crewai")
+
+import benchmark  # noqa: E402  (redirects every store to a scratch directory)
+from response_cache import LLMCache  # noqa: E402
+
+
+def test_stores_are_redirected_to_the_scratch_directory():
+    import artifacts, blobs, checkpoints, response_cache, revisions, run_cache
+
+    for path in (artifacts.ARTIFACT_DB_PATH, blobs.BLOB_DIR, checkpoints.CHECKPOINT_DIR,
+                 response_cache.LLM_CACHE_PATH, revisions.REVISIONS_DIR, run_cache.RUN_CACHE_DIR):
+        assert path.startswith(benchmark._SCRATCH)
+
+
+def test_stub_answers_through_the_response_cache(tmp_path):
+    llm = benchmark.StubLLM(latency_mean=0, cache=LLMCache(str(tmp_path / "llm.sqlite3")))
+    messages = [{"role": "user", "content": "Write the SRS"}]
+
+    first = llm.call(messages)
+    second = llm.call(messages)
+
+    assert first == second and "Final Answer:" in first
+    assert (llm.cache.misses, llm.cache.hits) == (1, 1)
+
+
+def test_compare_flags_slowdowns_beyond_the_tolerance():
+    base = {"e2e_p50": 1.0, "e2e_p95": 2.0, "peak_memory_mb": 10.0, "throughput_per_min": 60.0}
+    result = dict(base, pipeline="generate_srs", concurrency=4, e2e_p95=2.2, throughput_per_min=40.0)
+
+    regressions = benchmark.compare([result], {"generate_srs@4": base}, tolerance=0.2)
+
+    assert regressions == ["generate_srs x4: throughput_per_min 60.0 -> 40.0"]
@@ -0,0 +1,74 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from blobs import BlobStore, UploadTooLarge
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"), max_upload_bytes=1024, max_bytes=10 ** 6, max_age_seconds=3600)
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_uploads_are_stored_once_under_their_hash(store):
+    data = b"The portal lets customers pay invoices."
+
+    digest = store.put_stream(io.BytesIO(data))
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert open(store.path(digest), "rb").read() == data
+    _age(store.path(digest), 600)
+    assert store.put_stream(io.BytesIO(data)) == digest
+    assert time.time() - os.path.getmtime(store.path(digest)) < 60
+    assert [name for _, _, files in os.walk(store.directory) for name in files] == [digest]
+
+
+def test_oversized_uploads_are_rejected_and_not_stored(store):
+    with pytest.raises(UploadTooLarge, match="spec.pdf is larger than"):
+        store.put_stream(io.BytesIO(b"x" * 2048), name="spec.pdf")
+
+    assert [name for _, _, files in os.walk(store.directory) for name in files] == []
+
+
+def test_a_blob_evicted_meanwhile_is_stored_again(store):
+    data = b"A requirements document."
+    digest = store.put_stream(io.BytesIO(data))
+    os.remove(store.path(digest))
+
+    assert store.put_stream(io.BytesIO(data)) == digest
+    assert open(store.path(digest), "rb").read() == data
+
+
+def test_evict_removes_old_then_least_recently_used_blobs(store):
+    digests = [store.put_stream(io.BytesIO(bytes([i]) * 100)) for i in range(4)]
+    for digest, age in zip(digests, [7200, 1200, 900, 10]):
+        _age(store.path(digest), age)
+    store.max_bytes = 150
+
+    store.evict()
+
+    remaining = [os.path.exists(store.path(digest)) for digest in digests]
+    # Too old; least recently used over the size limit; kept; in use.
+    assert remaining == [False, False, True, True]
+
+
+def test_evict_tolerates_blobs_removed_concurrently(store, monkeypatch):
+    digest = store.put_stream(io.BytesIO(b"x" * 100))
+    _age(store.path(digest), 7200)
+    real_remove = os.remove
+
+    def remove_twice(path):
+        real_remove(path)
+        real_remove(path)  # as if another process evicted it first
+
+    monkeypatch.setattr(os, "remove", remove_twice)
+    store.evict()
+    assert not os.path.exists(store.path(digest))
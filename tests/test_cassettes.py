@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import cassettes
+from cassettes import Cassette, CassetteError, CassetteMismatch, active_cassette, use_cassette
+
+MODEL = "gpt-4o-mini"
+PARAMS = {"temperature": 0.2}
+
+
+def _messages(brd):
+    return [
+        {"role": "system", "content": "You are a business analyst."},
+        {"role": "user", "content": f"Extract the requirements.\n\n{brd}"},
+    ]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cassettes" / "run.jsonl")
+
+
+def test_recorded_calls_replay_in_any_order(path):
+    recorder = Cassette(path, "record")
+    recorder.record("extract_srs", MODEL, _messages("Customers pay invoices."), PARAMS, "FR-1 Pay invoices", 3.2)
+    recorder.record("extract_srs", MODEL, _messages("Staff approve refunds."), PARAMS, "FR-1 Approve refunds", 2.0)
+
+    player = Cassette(path, "replay")
+
+    assert player.replay("extract_srs", MODEL, _messages("Staff approve refunds."), PARAMS) == "FR-1 Approve refunds"
+    assert player.replay("extract_srs", MODEL, _messages("Customers pay invoices."), PARAMS) == "FR-1 Pay invoices"
+
+
+def test_repeated_calls_replay_in_recorded_order_then_repeat_the_last(path):
+    recorder = Cassette(path, "record")
+    recorder.record("review", MODEL, _messages("BRD"), PARAMS, "first", 1.0)
+    recorder.record("review", MODEL, _messages("BRD"), PARAMS, "second", 1.0)
+
+    player = Cassette(path, "replay")
+
+    assert [player.replay("review", MODEL, _messages("BRD"), PARAMS) for _ in range(3)] == [
+        "first", "second", "second",
+    ]
+
+
+def test_recording_starts_the_file_afresh(path):
+    Cassette(path, "record").record("review", MODEL, _messages("old"), PARAMS, "old", 1.0)
+    Cassette(path, "record").record("review", MODEL, _messages("new"), PARAMS, "new", 1.0)
+
+    with open(path) as f:
+        assert [json.loads(line)["response"] for line in f] == ["new"]
+
+
+def test_mismatch_shows_how_the_prompt_differs(path):
+    Cassette(path, "record").record("extract_srs", MODEL, _messages("Customers pay invoices."), PARAMS, "FR-1", 1.0)
+    player = Cassette(path, "replay")
+
+    with pytest.raises(CassetteMismatch) as error:
+        player.replay("extract_srs", MODEL, _messages("Customers pay invoices by card."), PARAMS)
+
+    message = str(error.value)
+    assert "task 'extract_srs'" in message
+    assert "message 2 differs" in message
+    assert "-Customers pay invoices." in message
+    assert "+Customers pay invoices by card." in message
+
+
+def test_mismatch_on_parameters_and_model(path):
+    Cassette(path, "record").record("extract_srs", MODEL, _messages("BRD"), PARAMS, "FR-1", 1.0)
+    player = Cassette(path, "replay")
+
+    with pytest.raises(CassetteMismatch, match="parameters differ"):
+        player.replay("extract_srs", MODEL, _messages("BRD"), {"temperature": 0.7})
+    with pytest.raises(CassetteMismatch, match="used model gpt-4o-mini"):
+        player.replay("extract_srs", "claude-3-haiku", _messages("BRD"), PARAMS)
+
+
+def test_missing_or_invalid_cassettes(path, tmp_path):
+    with pytest.raises(CassetteError, match="record it first"):
+        Cassette(path, "replay").replay("extract_srs", MODEL, _messages("BRD"), PARAMS)
+
+    broken = tmp_path / "broken.jsonl"
+    broken.write_text("not json\n")
+    with pytest.raises(CassetteError, match="not valid JSON lines"):
+        Cassette(str(broken), "replay").replay("extract_srs", MODEL, _messages("BRD"), PARAMS)
+
+    with pytest.raises(CassetteError):
+        Cassette(path, "off")
+
+
+def test_use_cassette_overrides_the_environment(path, monkeypatch):
+    monkeypatch.setattr(cassettes, "_active", None)
+    monkeypatch.setattr(cassettes, "_configured", False)
+    monkeypatch.setattr(cassettes, "LLM_CASSETTE_MODE", "off")
+
+    assert active_cassette() is None
+    cassette = use_cassette(path, "replay")
+    assert active_cassette() is cassette and cassette.replaying
+    assert use_cassette(path, "off") is None
+    with pytest.raises(CassetteError):
+        use_cassette(path, "rewind")
@@ -0,0 +1,58 @@
+import os
+import time
+
+import pytest
+
+from checkpoints import CheckpointStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints"), max_age_seconds=3600)
+
+
+def test_saved_outputs_are_restored_per_run(store):
+    store.save("run-a", "extract_srs", "FR-1 Customers pay invoices.")
+    store.save("run-a", "generate_srs", "# SRS")
+    store.save("run-b", "extract_srs", "FR-1 Staff approve refunds.")
+
+    assert store.load("run-a") == {"extract_srs": "FR-1 Customers pay invoices.", "generate_srs": "# SRS"}
+    assert store.load("run-c") == {}
+
+
+def test_saving_again_replaces_the_output(store):
+    store.save("run-a", "extract_srs", "draft")
+    store.save("run-a", "extract_srs", "final")
+
+    assert store.load("run-a") == {"extract_srs": "final"}
+    assert sorted(os.listdir(os.path.join(store.directory, "run-a"))) == ["extract_srs.md"]
+
+
+def test_task_names_must_be_safe_file_names(store):
+    with pytest.raises(ValueError):
+        store.save("run-a", "../extract_srs", "FR-1")
+
+
+def test_clear_drops_a_run(store):
+    store.save("run-a", "extract_srs", "FR-1")
+    store.save("run-b", "extract_srs", "FR-1")
+
+    store.clear("run-a")
+    store.clear("run-missing")
+
+    assert store.load("run-a") == {}
+    assert store.load("run-b") == {"extract_srs": "FR-1"}
+
+
+def test_runs_not_touched_within_the_maximum_age_are_purged(store):
+    store.save("stale", "extract_srs", "FR-1")
+    store.save("fresh", "extract_srs", "FR-1")
+    then = time.time() - 7200
+    os.utime(os.path.join(store.directory, "stale"), (then, then))
+
+    assert store.load("fresh") == {"extract_srs": "FR-1"}
+    assert not os.path.exists(os.path.join(store.directory, "stale"))
+
+
+def test_purge_without_a_directory_does_nothing(tmp_path):
+    CheckpointStore(str(tmp_path / "missing"), max_age_seconds=60).purge()
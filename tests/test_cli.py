@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+pytest.importorskip("pysqlite3")
+pytest.importorskip("dotenv")
+pytest.importorskip("crewai")
+
+from cli import collect_jobs, expand_inputs, find_sdd_for, output_stems  # noqa: E402
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("# Document\n")
+    return path
+
+
+def test_outputs_keep_the_path_below_the_shared_directory(tmp_path):
+    a = _touch(str(tmp_path / "brds" / "a" / "spec.md"))
+    b = _touch(str(tmp_path / "brds" / "b" / "spec.md"))
+
+    assert output_stems([a, b]) == {a: os.path.join("a", "spec"), b: os.path.join("b", "spec")}
+
+
+def test_sources_in_one_directory_are_named_after_their_file(tmp_path):
+    portal = _touch(str(tmp_path / "brds" / "portal_brd.md"))
+    billing = _touch(str(tmp_path / "brds" / "billing_brd.txt"))
+
+    assert output_stems([portal, billing]) == {portal: "portal_brd", billing: "billing_brd"}
+    assert output_stems([]) == {}
+
+
+def test_sources_differing_only_in_extension_keep_it(tmp_path):
+    md = _touch(str(tmp_path / "brds" / "spec.md"))
+    pdf = _touch(str(tmp_path / "brds" / "spec.pdf"))
+    notes = _touch(str(tmp_path / "brds" / "notes.md"))
+
+    assert output_stems([md, pdf, notes]) == {md: "spec.md", pdf: "spec.pdf", notes: "notes"}
+
+
+def test_inputs_are_expanded_to_documents(tmp_path):
+    brd = _touch(str(tmp_path / "brds" / "portal_brd.md"))
+    _touch(str(tmp_path / "brds" / "logo.png"))
+
+    assert expand_inputs([str(tmp_path / "brds")]) == [brd]
+    assert expand_inputs([str(tmp_path / "brds" / "*.md"), brd]) == [brd]
+
+
+def test_test_case_inputs_pair_each_srs_with_its_sdd(tmp_path):
+    srs = _touch(str(tmp_path / "portal_srs.md"))
+    sdd = _touch(str(tmp_path / "portal_sdd.md"))
+    orphan = _touch(str(tmp_path / "billing_srs.md"))
+
+    assert find_sdd_for(srs) == sdd
+    jobs, failures = collect_jobs("generate_test_cases", [orphan, sdd, srs])
+
+    assert jobs == [(srs, {"srs.txt": srs, "sdd.txt": sdd})]
+    assert [failure["input"] for failure in failures] == [orphan]
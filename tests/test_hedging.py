@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from hedging import CallTimedOut, HedgeBudget, LatencyTracker, TaskDeadlineExceeded, hedged_call
+
+
+def test_percentile_needs_enough_samples():
+    tracker = LatencyTracker(window=10, min_samples=3)
+    tracker.record("gpt-4o-mini", 1.0)
+    tracker.record("gpt-4o-mini", 2.0)
+
+    assert tracker.percentile("gpt-4o-mini", 0.9) is None
+
+    tracker.record("gpt-4o-mini", 3.0)
+    assert tracker.percentile("gpt-4o-mini", 0.9) == 2.0
+    assert tracker.percentile("gpt-4o-mini", 1.0) == 3.0
+
+
+def test_percentile_only_sees_the_recent_window():
+    tracker = LatencyTracker(window=3, min_samples=1)
+    for seconds in (50.0, 1.0, 1.0, 1.0):
+        tracker.record("gpt-4o-mini", seconds)
+
+    assert tracker.percentile("gpt-4o-mini", 1.0) == 1.0
+
+
+def test_budget_caps_hedges_at_a_share_of_calls():
+    budget = HedgeBudget(max_extra=0.5)
+    assert not budget.available()
+    assert not budget.try_spend()
+
+    budget.note_call()
+    budget.note_call()
+    assert budget.available()
+    assert budget.try_spend()
+    assert not budget.available()
+    assert not budget.try_spend()
+    assert budget.hedges == 1
+
+
+def test_fast_call_is_not_hedged():
+    assert hedged_call(lambda: "done", hedge_after=5, timeout=5) == ("done", False)
+
+
+def test_slow_call_is_hedged_and_the_first_result_wins():
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) == 1:
+            release.wait(5)
+            return "first"
+        return "second"
+
+    try:
+        assert hedged_call(call, hedge_after=0.05, timeout=5) == ("second", True)
+    finally:
+        release.set()
+
+
+def test_refused_hedge_waits_for_the_original_call():
+    asked = []
+
+    def call():
+        time.sleep(0.2)
+        return "only"
+
+    assert hedged_call(call, hedge_after=0.05, may_hedge=lambda: asked.append(None) or False) == ("only", False)
+    assert len(asked) == 1
+
+
+def test_failed_attempt_is_ignored_while_another_runs():
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise RuntimeError("provider error")
+        time.sleep(0.2)
+        return "retry"
+
+    assert hedged_call(call, hedge_after=0.05, timeout=5) == ("retry", True)
+
+
+def test_error_without_other_attempts_is_raised():
+    def call():
+        raise RuntimeError("provider error")
+
+    with pytest.raises(RuntimeError):
+        hedged_call(call, timeout=5)
+
+
+def test_slow_call_times_out():
+    release = threading.Event()
+    try:
+        with pytest.raises(CallTimedOut):
+            hedged_call(lambda: release.wait(5), timeout=0.05)
+    finally:
+        release.set()
+
+
+def test_deadline_before_timeout_raises_task_deadline_exceeded():
+    release = threading.Event()
+    try:
+        with pytest.raises(TaskDeadlineExceeded):
+            hedged_call(lambda: release.wait(5), timeout=1, deadline=0.05)
+    finally:
+        release.set()
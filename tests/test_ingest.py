@@ -0,0 +1,53 @@
+import os
+
+from ingest import ingest_file, page_to_markdown
+from run_cache import file_digest
+
+
+def test_text_inputs_are_hardlinked_into_the_workspace(tmp_path):
+    source = tmp_path / "blob"
+    source.write_text("# BRD\n\nCustomers pay invoices.\n")
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+
+    path = ingest_file(str(source), str(workspace / "brd.txt"), digest="known digest")
+
+    assert open(path).read() == "# BRD\n\nCustomers pay invoices.\n"
+    assert os.path.samefile(path, source)
+    assert file_digest(path) == "known digest"
+
+
+def test_an_existing_workspace_file_is_replaced(tmp_path):
+    source = tmp_path / "blob"
+    source.write_text("New revision")
+    dest = tmp_path / "brd.txt"
+    dest.write_text("Old revision")
+
+    ingest_file(str(source), str(dest))
+
+    assert dest.read_text() == "New revision"
+
+
+def test_numbered_headings_and_wrapped_list_items():
+    page = "\n".join([
+        "3 Functional Requirements",
+        "3.1 Appointments",
+        "1. The system shall send appointment reminders to",
+        "patients a day ahead.",
+        "2. Reminders shall go out by e-mail and",
+        "text message.",
+        "12",
+    ])
+
+    assert page_to_markdown(page) == "\n\n".join([
+        "# 3 Functional Requirements",
+        "## 3.1 Appointments",
+        "1. The system shall send appointment reminders to patients a day ahead.",
+        "2. Reminders shall go out by e-mail and text message.",
+    ])
+
+
+def test_long_numbered_lines_are_not_headings():
+    line = "4 Patients Can Reschedule Or Cancel Appointments Online Without Calling The Front Desk"
+
+    assert page_to_markdown(line) == line
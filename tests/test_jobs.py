@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from jobs import CANCELLED, FAILED, SUCCEEDED, Job, JobManager
+from scheduler import RunCancelled
+
+
+class _Workspace:
+    def __init__(self):
+        self.holds = 0
+
+    def hold(self):
+        self.holds += 1
+
+    def release(self):
+        self.holds -= 1
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1)
+    yield manager
+    manager._pool.shutdown(wait=True)
+
+
+def _wait(manager, job_id):
+    manager._futures[job_id].result(timeout=5)
+    return manager.get(job_id)
+
+
+def test_job_runs_with_itself_as_keyword_and_keeps_its_result(manager):
+    def run(brd, job):
+        job.set_tasks(["extract_srs", "generate_srs"])
+        job.task_started("extract_srs")
+        job.task_completed("extract_srs")
+        return f"SRS for {brd}"
+
+    job = _wait(manager, manager.submit("srs", run, "portal"))
+
+    assert job.status == SUCCEEDED
+    assert job.result == "SRS for portal"
+    assert job.progress() == 0.5
+    assert [row["Status"] for row in job.task_rows()] == [SUCCEEDED, "queued"]
+
+
+def test_errors_fail_the_job(manager):
+    def run(job):
+        raise ValueError("no BRD uploaded")
+
+    job = _wait(manager, manager.submit("srs", run))
+
+    assert job.status == FAILED
+    assert job.error == "no BRD uploaded"
+
+
+def test_running_job_is_cancelled(manager):
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        job.cancel_event.wait(5)
+        raise RunCancelled()
+
+    job_id = manager.submit("srs", run)
+    started.wait(5)
+    manager.cancel(job_id)
+
+    assert _wait(manager, job_id).status == CANCELLED
+
+
+def test_queued_job_is_cancelled_before_it_starts(manager):
+    release = threading.Event()
+    ran = []
+    blocker = manager.submit("srs", lambda job: release.wait(5))
+    queued = manager.submit("sdd", lambda job: ran.append(job))
+
+    manager.cancel(queued)
+    release.set()
+    _wait(manager, blocker)
+
+    assert manager.get(queued).status == CANCELLED
+    assert ran == []
+
+
+def test_workspace_is_held_until_the_job_is_purged(manager):
+    workspace = _Workspace()
+    job_id = manager.submit("srs", lambda job: "done", workspace=workspace)
+    _wait(manager, job_id)
+
+    manager.purge(max_age_minutes=60)
+    assert workspace.holds == 1
+    assert manager.get(job_id) is not None
+
+    manager.purge(max_age_minutes=-1)
+    assert workspace.holds == 0
+    assert manager.get(job_id) is None
+
+
+def test_resume_reruns_the_call_with_overrides(manager):
+    workspace = _Workspace()
+
+    def run(brd, job, force=False):
+        if not force:
+            raise RuntimeError("provider unavailable")
+        return f"SRS for {brd}"
+
+    failed = manager.submit("srs", run, "portal", workspace=workspace)
+    assert _wait(manager, failed).status == FAILED
+
+    resumed = manager.resume(failed, force=True)
+
+    job = _wait(manager, resumed)
+    assert job.status == SUCCEEDED
+    assert job.result == "SRS for portal"
+    assert job.workspace is workspace
+    assert workspace.holds == 2
+    assert manager.resume("unknown") is None
+
+
+def test_progress_without_tasks_follows_the_status():
+    job = Job("srs")
+    assert job.progress() == 0.0
+    job.status = SUCCEEDED
+    assert job.progress() == 1.0
@@ -0,0 +1,82 @@
+import textwrap
+
+import pytest
+
+from pipeline_spec import PIPELINE_SPEC_PATH, PipelineSpecError, load_spec
+
+SPEC = """
+fragments:
+  audience: Write for the product owner of the customer portal.
+pipelines:
+  srs:
+    agents:
+      analyst:
+        role: Business Analyst
+        goal: Extract the requirements. ${audience}
+        backstory: Ten years of requirements work.
+        tools:
+          - {type: section_search, file: brd.md, label: BRD}
+    tasks:
+      extract:
+        agent: analyst
+        description: List the requirements of the BRD.
+        expected_output: A numbered list.
+      write:
+        agent: analyst
+        description: Write the SRS. ${audience}
+        expected_output: The SRS in markdown.
+        context: [extract]
+  review:
+    agents_from: srs
+    tasks:
+      review:
+        agent: analyst
+        description: Review the SRS.
+        expected_output: Review notes.
+"""
+
+
+def _load(tmp_path, text):
+    path = tmp_path / "pipelines.yaml"
+    path.write_text(textwrap.dedent(text))
+    return load_spec(str(path))
+
+
+def test_fragments_are_substituted_and_agents_shared(tmp_path):
+    spec = _load(tmp_path, SPEC)
+
+    analyst = spec["srs"]["agents"]["analyst"]
+    assert analyst["goal"] == "Extract the requirements. Write for the product owner of the customer portal."
+    assert analyst["tools"] == [{"type": "section_search", "file": "brd.md", "label": "BRD"}]
+    assert spec["srs"]["tasks"]["write"]["context"] == ["extract"]
+    assert spec["srs"]["tasks"]["extract"]["context"] == []
+    assert spec["review"]["agents"]["analyst"] == analyst
+
+
+@pytest.mark.parametrize("change, message", [
+    (("${audience}", "${tone}"), "unknown fragment 'tone'"),
+    (("context: [extract]", "context: [review]"), "context task 'review' is not defined before it"),
+    (("agent: analyst\n        description: Review", "agent: reviewer\n        description: Review"),
+     "unknown agent 'reviewer'"),
+    (("agents_from: srs", "agents_from: review"), "pipeline 'review' is not defined before it"),
+    (("expected_output: A numbered list.", ""), "srs.tasks.extract: missing expected_output"),
+    (("type: section_search", "type: web_search"), "unknown tool type 'web_search'"),
+    (("label: BRD", "lable: BRD"), "missing label"),
+])
+def test_invalid_specs_name_the_problem(tmp_path, change, message):
+    with pytest.raises(PipelineSpecError, match=message):
+        _load(tmp_path, SPEC.replace(*change, 1))
+
+
+def test_a_spec_without_pipelines_is_rejected(tmp_path):
+    with pytest.raises(PipelineSpecError, match="defines no pipelines"):
+        _load(tmp_path, "fragments: {}\n")
+
+
+def test_the_shipped_spec_is_valid():
+    spec = load_spec(PIPELINE_SPEC_PATH)
+
+    assert {"srs", "sdd", "test_cases"} <= set(spec)
+    for pipeline in spec.values():
+        for task in pipeline["tasks"].values():
+            assert task["agent"] in pipeline["agents"]
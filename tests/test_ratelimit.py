@@ -0,0 +1,100 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ratelimit import RateLimiter, TokenBucket, estimate_tokens, retry_after
+from scheduler import RunCancelled
+
+
+def test_bucket_refills_over_a_minute():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == pytest.approx(0.0)
+    assert bucket.wait_time(500, now + 60) == 0.0
+
+
+def test_calls_beyond_the_request_quota_are_refused_until_it_refills():
+    limiter = RateLimiter(requests_per_minute=2)
+
+    assert limiter.try_acquire("gpt-4o-mini")
+    assert limiter.try_acquire("gpt-4o-mini")
+    assert not limiter.try_acquire("gpt-4o-mini")
+    assert limiter.try_acquire("claude-3-haiku")
+
+
+def test_completion_tokens_are_charged_after_the_call():
+    limiter = RateLimiter(tokens_per_minute=1000)
+
+    assert limiter.try_acquire("gpt-4o-mini", tokens=400)
+    limiter.consume("gpt-4o-mini", 600)
+
+    assert not limiter.try_acquire("gpt-4o-mini", tokens=100)
+
+
+def test_backoff_pauses_the_model_for_retry_after():
+    limiter = RateLimiter(backoff_max=30)
+
+    assert limiter.backoff("gpt-4o-mini", 1, retry_after=120) == 30
+    assert not limiter.try_acquire("gpt-4o-mini")
+    assert limiter.try_acquire("claude-3-haiku")
+
+
+def test_backoff_without_retry_after_is_jittered_exponential():
+    limiter = RateLimiter(backoff_base=2, backoff_max=60)
+
+    delays = [limiter.backoff(f"model-{attempt}", attempt) for attempt in range(1, 6)]
+
+    for attempt, delay in enumerate(delays, start=1):
+        ceiling = min(60, 2 * 2 ** attempt)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+def test_waiting_calls_are_admitted_in_priority_order():
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.backoff("gpt-4o-mini", 1, retry_after=0.3)
+    admitted = []
+
+    def call(name, priority):
+        limiter.acquire("gpt-4o-mini", priority=priority)
+        admitted.append(name)
+
+    threads = [threading.Thread(target=call, args=("new run", 1.0))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=call, args=("nearly done", 0.1)))
+    threads[1].start()
+    time.sleep(0.05)
+
+    assert not limiter.try_acquire("gpt-4o-mini")
+    for thread in threads:
+        thread.join(5)
+    assert admitted == ["nearly done", "new run"]
+
+
+def test_cancelled_wait_raises():
+    limiter = RateLimiter()
+    limiter.backoff("gpt-4o-mini", 1, retry_after=30)
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(RunCancelled):
+        limiter.acquire("gpt-4o-mini", cancel_event=cancel)
+    assert limiter._waiting == []
+
+
+def test_retry_after_header():
+    error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "12"}))
+
+    assert retry_after(error) == 12.0
+    assert retry_after(SimpleNamespace(response=None)) is None
+    assert retry_after(SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "soon"}))) is None
+
+
+def test_estimate_tokens():
+    assert estimate_tokens([{"role": "user", "content": "x" * 400}, {"role": "system", "content": None}]) == 100
@@ -0,0 +1,155 @@
+import os
+import time
+
+import pytest
+
+from revisions import (
+    RevisionPlan, RevisionStore, diff_sections, format_changes, plan_revision, revision_lineage, split_blocks,
+)
+
+OUTPUT = """# Software Requirements Specification
+
+## 1. Introduction
+
+The portal lets customers pay invoices.
+
+## 2. Functional Requirements
+
+### 2.1 Payments
+
+Customers pay by card.
+
+## 3. Security
+
+All traffic uses TLS.
+"""
+
+
+@pytest.mark.parametrize("file_name", [
+    "Portal BRD.pdf", "Portal BRD v3.pdf", "portal brd_v2.1.md", "Portal BRD (2).txt", "Portal BRD-rev4.md",
+])
+def test_lineage_ignores_version_suffixes(file_name):
+    assert revision_lineage(file_name) == "portal brd"
+
+
+def test_lineage_is_scoped():
+    assert revision_lineage("uploads/Portal BRD v3.pdf", scope="alice") == "alice:portal brd"
+    assert revision_lineage("Portal BRD v3.pdf", scope="alice") != revision_lineage("Portal BRD v3.pdf", scope="bob")
+    assert revision_lineage("2024.md") == "2024"
+
+
+def test_split_blocks_concatenates_back_to_the_document():
+    blocks = split_blocks(OUTPUT)
+
+    assert "".join(block["text"] for block in blocks) == OUTPUT
+    assert [block["title"] for block in blocks] == [
+        "Software Requirements Specification", "1. Introduction", "2. Functional Requirements", "3. Security",
+    ]
+    assert "### 2.1 Payments" in blocks[2]["text"]
+
+
+def test_split_blocks_without_sections_is_one_block():
+    assert split_blocks("# Title\n\nJust text.\n") == [{"title": "Document", "text": "# Title\n\nJust text.\n"}]
+
+
+def test_splice_replaces_only_revised_blocks():
+    blocks = split_blocks(OUTPUT)
+    plan = RevisionPlan(blocks, [{"title": "Payments", "old": "", "new": ""}], {2: []})
+
+    document = plan.splice({2: "## 2. Functional Requirements\n\nCustomers pay by card or bank transfer.", 3: "  "})
+
+    assert document == OUTPUT.replace(blocks[2]["text"], (
+        "## 2. Functional Requirements\n\nCustomers pay by card or bank transfer.\n\n"
+    ))
+    assert not plan.unchanged
+
+
+def test_store_returns_the_latest_revision_for_its_signature(tmp_path):
+    store = RevisionStore(str(tmp_path), max_age_seconds=3600)
+    store.put("generate_srs", "alice:portal brd", {"brd.txt": "v1"}, {"srs1.md": "old"}, signature="a")
+    store.put("generate_srs", "alice:portal brd", {"brd.txt": "v2"}, {"srs1.md": "new"}, signature="a")
+
+    record = store.get("generate_srs", "alice:portal brd", signature="a")
+    assert record["inputs"] == {"brd.txt": "v2"}
+    assert record["outputs"] == {"srs1.md": "new"}
+    assert store.get("generate_srs", "alice:portal brd", signature="b") is None
+    assert store.get("generate_srs", "bob:portal brd", signature="a") is None
+    assert store.get("generate_sdd", "alice:portal brd", signature="a") is None
+
+
+def test_store_drops_expired_revisions(tmp_path):
+    store = RevisionStore(str(tmp_path), max_age_seconds=3600)
+    store.put("generate_srs", "portal brd", {}, {"srs1.md": "old"})
+    path = store._path("generate_srs", "portal brd")
+    os.utime(path, (time.time() - 7200, time.time() - 7200))
+
+    assert store.get("generate_srs", "portal brd") is None
+    assert not os.path.exists(path)
+
+
+def test_diff_sections_reports_changed_added_and_removed_sections():
+    old = "# BRD\n\n## Payments\n\nBy card.\n\n## Reports\n\nMonthly.\n\n## Legacy\n\nFax.\n"
+    new = "# BRD\n\n## Payments\n\nBy card or transfer.\n\n## Reports\n\nMonthly.  \n\n## Refunds\n\nWithin 14 days.\n"
+
+    changes, total = diff_sections(old, new)
+
+    by_title = {change["title"].split(" > ")[-1]: change for change in changes}
+    assert set(by_title) == {"Payments", "Refunds", "Legacy"}
+    assert by_title["Refunds"]["old"] == "" and by_title["Legacy"]["new"] == ""
+    assert total >= 3
+
+
+BRD = """## Payments
+
+Customers pay invoices by card.
+
+## Reports
+
+Finance downloads monthly reports.
+
+## Notifications
+
+Customers get an email when an invoice is due.
+
+## Accounts
+
+Customers sign in with email and password.
+"""
+
+
+def test_plan_revision_routes_changes_to_the_output_sections_covering_them():
+    new = BRD.replace("by card.", "by card or bank transfer.")
+
+    plan = plan_revision(BRD, new, OUTPUT, top_k=1)
+
+    assert [change["title"] for change in plan.changes] == ["Payments"]
+    assert list(plan.routed) == [2]  # Functional Requirements, which covers payments
+    assert plan.routed[2] == plan.changes
+
+
+def test_plan_revision_without_changes_keeps_the_output():
+    plan = plan_revision(BRD, BRD.replace("monthly reports.", "monthly  reports.\n"), OUTPUT)
+
+    assert plan.unchanged
+    assert plan.splice({}) == OUTPUT
+
+
+def test_plan_revision_needs_a_full_run_for_large_or_unmatched_changes():
+    rewritten = BRD.replace("Customers", "Clients").replace("Finance", "Accounting")
+    assert plan_revision(BRD, rewritten, OUTPUT) is None
+
+    new_topic = BRD + "\n## Loyalty\n\nMembers collect stamps.\n"
+    assert plan_revision(BRD, new_topic, OUTPUT) is None
+    assert plan_revision(BRD, BRD.replace("by card.", "by cheque."), "No headings at all.\n") is None
+
+
+def test_format_changes_describes_each_kind_of_change():
+    text = format_changes([
+        {"title": "Refunds", "old": "", "new": "Within 14 days."},
+        {"title": "Legacy", "old": "Fax.", "new": ""},
+        {"title": "Payments", "old": "By card.", "new": "By card or transfer."},
+    ])
+
+    assert "Added section 'Refunds':\nWithin 14 days." in text
+    assert "Removed section 'Legacy':\nFax." in text
+    assert "Section 'Payments' before:\nBy card.\n\nafter:\nBy card or transfer." in text
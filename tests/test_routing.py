@@ -0,0 +1,78 @@
+import pytest
+
+from routing import ModelRouter, ModelRoutingError, Route
+
+ROUTES = """
+tiers:
+  strong:
+    models: ["${STRONG_MODEL:-gpt-4o}", "${FALLBACK_MODEL}"]
+    timeout: 300
+  fast:
+    models: ["${FAST_MODEL}", "${MODEL:-gpt-4o-mini}"]
+    timeout: 90
+    deadline: 240
+    hedge: false
+default_tier: strong
+agents:
+  srs_formatter: fast
+tasks:
+  generate_shard: fast
+"""
+
+
+@pytest.fixture
+def routes(tmp_path, monkeypatch):
+    for name in ("STRONG_MODEL", "FALLBACK_MODEL", "FAST_MODEL", "MODEL"):
+        monkeypatch.delenv(name, raising=False)
+    path = tmp_path / "model_routes.yaml"
+    path.write_text(ROUTES)
+    return str(path)
+
+
+def test_tiers_expand_environment_variables_and_skip_empty_models(routes, monkeypatch):
+    monkeypatch.setenv("FALLBACK_MODEL", "claude-3-haiku")
+
+    router = ModelRouter.from_file(routes)
+
+    assert router.tiers["strong"].models == ["gpt-4o", "claude-3-haiku"]
+    assert router.tiers["strong"].timeout == 300 and router.tiers["strong"].deadline is None
+    assert router.tiers["fast"].models == ["gpt-4o-mini"]
+    assert router.tiers["fast"].deadline == 240 and not router.tiers["fast"].hedge
+
+
+def test_tasks_route_by_name_then_agent_then_default(routes):
+    router = ModelRouter.from_file(routes)
+
+    assert router.route("generate_shard").tier == "fast"
+    assert router.route("generate_shard_3").tier == "fast"
+    assert router.route("srs_format_task").tier == "fast"
+    assert router.route("srs_write_task").tier == "strong"
+    assert router.route(None).tier == "strong"
+
+
+def test_unknown_tiers_are_rejected():
+    tiers = {"strong": Route("strong", ["gpt-4o"])}
+
+    with pytest.raises(ModelRoutingError):
+        ModelRouter(tiers, "fast")
+    with pytest.raises(ModelRoutingError, match="srs_formatter"):
+        ModelRouter(tiers, "strong", agents={"srs_formatter": "fast"})
+
+
+def test_a_file_without_tiers_is_rejected(tmp_path):
+    path = tmp_path / "model_routes.yaml"
+    path.write_text("default_tier: strong\n")
+
+    with pytest.raises(ModelRoutingError, match="no tiers"):
+        ModelRouter.from_file(str(path))
+
+
+def test_signature_changes_with_models_but_not_with_timing(routes, tmp_path, monkeypatch):
+    signature = ModelRouter.from_file(routes).signature()
+    retimed = tmp_path / "retimed.yaml"
+    retimed.write_text(ROUTES.replace("timeout: 300", "timeout: 600\n    deadline: 900").replace("hedge: false", ""))
+
+    assert ModelRouter.from_file(str(retimed)).signature() == signature
+
+    monkeypatch.setenv("FAST_MODEL", "claude-3-haiku")
+    assert ModelRouter.from_file(routes).signature() != signature
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from run_cache import RunCache, file_digest, prompt_fingerprint, remember_digest
+from scheduler import Step
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RunCache(str(tmp_path / "runs"), max_bytes=1024 * 1024, max_age_seconds=3600)
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "brd.txt"
+    path.write_text("The portal lets customers pay invoices.")
+    return str(path)
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_key_depends_on_content_pipeline_model_and_prompts(cache, document, tmp_path):
+    key = cache.key("generate_srs", [document], "gpt-4o", "prompts")
+    copy = tmp_path / "copy.txt"
+    copy.write_bytes(open(document, "rb").read())
+
+    assert cache.key("generate_srs", [str(copy)], "gpt-4o", "prompts") == key
+    assert cache.key("generate_sdd", [document], "gpt-4o", "prompts") != key
+    assert cache.key("generate_srs", [document], "gpt-4o-mini", "prompts") != key
+    assert cache.key("generate_srs", [document], "gpt-4o", "other prompts") != key
+    copy.write_text("The portal lets customers dispute invoices.")
+    assert cache.key("generate_srs", [str(copy)], "gpt-4o", "prompts") != key
+
+
+def test_put_get_and_invalidate(cache):
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, "# SRS\n")
+    assert cache.get("ab" * 32) == "# SRS\n"
+    cache.invalidate("ab" * 32)
+    cache.invalidate("ab" * 32)
+    assert cache.get("ab" * 32) is None
+
+
+def test_expired_entries_are_dropped(cache):
+    cache.put("cd" * 32, "old")
+    _age(cache._path("cd" * 32), 7200)
+
+    assert cache.get("cd" * 32) is None
+    assert not os.path.exists(cache._path("cd" * 32))
+
+
+def test_evict_removes_least_recently_used_until_under_max_bytes(tmp_path):
+    cache = RunCache(str(tmp_path / "runs"), max_bytes=100, max_age_seconds=0)
+    for i, key in enumerate(["aa" * 32, "bb" * 32, "cc" * 32]):
+        cache.put(key, "x" * 10)
+        _age(cache._path(key), 300 - i * 100)
+    cache.get("aa" * 32)  # the oldest entry was just used
+
+    cache.max_bytes = 25
+    cache.evict()
+
+    assert cache.get("bb" * 32) is None
+    assert cache.get("aa" * 32) == "x" * 10
+    assert cache.get("cc" * 32) == "x" * 10
+
+
+def test_file_digest_is_memoized_while_the_file_is_unchanged(document):
+    assert file_digest(document) == hashlib.sha256(open(document, "rb").read()).hexdigest()
+
+    remember_digest(document, "known digest")
+    assert file_digest(document) == "known digest"
+
+    with open(document, "a") as f:
+        f.write(" And download receipts.")
+    assert file_digest(document) == hashlib.sha256(open(document, "rb").read()).hexdigest()
+
+
+def _task(name, description, context=()):
+    agent = SimpleNamespace(role="Analyst", goal="Write", backstory="Experienced")
+    return SimpleNamespace(
+        name=name, description=description, expected_output="A document", context=list(context), agent=agent
+    )
+
+
+def test_prompt_fingerprint_covers_prompts_wiring_and_steps():
+    extract = _task("extract", "Extract requirements")
+    write = _task("write", "Write the SRS", [extract])
+    fingerprint = prompt_fingerprint([extract, write])
+
+    assert prompt_fingerprint([extract, _task("write", "Write the SRS", [extract])]) == fingerprint
+    assert prompt_fingerprint([extract, _task("write", "Write the SDD", [extract])]) != fingerprint
+    assert prompt_fingerprint([extract, _task("write", "Write the SRS")]) != fingerprint
+
+    step = Step("write", None, context=[extract], fingerprint="assembly:v1")
+    with_step = prompt_fingerprint([extract, step])
+    assert with_step != fingerprint
+    step.fingerprint = "assembly:v2"
+    assert prompt_fingerprint([extract, step]) != with_step
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import RunCancelled, Step, TaskGraph, TaskGraphError, run_crew_tasks
+
+
+def test_fan_out_and_fan_in_pass_upstream_results():
+    graph = TaskGraph()
+    graph.add("extract", lambda upstream: "doc")
+    graph.add("left", lambda upstream: upstream["extract"] + ":left", ["extract"])
+    graph.add("right", lambda upstream: upstream["extract"] + ":right", ["extract"])
+    graph.add("merge", lambda upstream: sorted(upstream.items()), ["left", "right"])
+
+    results = graph.run(max_workers=2)
+
+    assert results["merge"] == [("left", "doc:left"), ("right", "doc:right")]
+    assert set(graph.timings) == {"extract", "left", "right", "merge"}
+
+
+def test_independent_steps_run_at_the_same_time():
+    both_started = threading.Barrier(2, timeout=5)
+    graph = TaskGraph()
+    graph.add("a", lambda upstream: both_started.wait())
+    graph.add("b", lambda upstream: both_started.wait())
+
+    graph.run(max_workers=2)
+
+
+def test_cycles_are_rejected():
+    graph = TaskGraph()
+    graph.add("a", lambda upstream: None, ["c"])
+    graph.add("b", lambda upstream: None, ["a"])
+    graph.add("c", lambda upstream: None, ["b"])
+    graph.add("free", lambda upstream: None)
+
+    with pytest.raises(TaskGraphError, match="cycle between steps: a, b, c"):
+        graph.validate()
+
+
+def test_unknown_dependencies_and_duplicates_are_rejected():
+    graph = TaskGraph()
+    graph.add("a", lambda upstream: None, ["missing"])
+    with pytest.raises(TaskGraphError, match="unknown step 'missing'"):
+        graph.run()
+    with pytest.raises(TaskGraphError, match="Duplicate"):
+        graph.add("a", lambda upstream: None)
+
+
+def test_failure_propagates_and_stops_dependents():
+    ran = []
+
+    def fail(upstream):
+        raise ValueError("boom")
+
+    graph = TaskGraph()
+    graph.add("fail", fail)
+    graph.add("after", lambda upstream: ran.append("after"), ["fail"])
+
+    with pytest.raises(ValueError, match="boom"):
+        graph.run()
+    assert ran == []
+
+
+def test_running_siblings_are_reported_after_a_failure():
+    slow_started = threading.Event()
+    completed = []
+
+    def slow(upstream):
+        slow_started.set()
+        time.sleep(0.2)
+        return "slow done"
+
+    def fail(upstream):
+        slow_started.wait(5)
+        raise ValueError("boom")
+
+    graph = TaskGraph()
+    graph.add("slow", slow)
+    graph.add("fail", fail)
+
+    with pytest.raises(ValueError):
+        graph.run(max_workers=2, on_step_complete=lambda name, result: completed.append((name, result)))
+    assert completed == [("slow", "slow done")]
+
+
+def test_cancelled_runs_start_no_more_steps():
+    cancel = threading.Event()
+    ran = []
+
+    def first(upstream):
+        cancel.set()
+        return "first"
+
+    graph = TaskGraph()
+    graph.add("first", first)
+    graph.add("second", lambda upstream: ran.append("second"), ["first"])
+
+    with pytest.raises(RunCancelled):
+        graph.run(cancel_event=cancel)
+    assert ran == []
+
+
+def test_steps_receive_their_context_outputs_in_order():
+    a = Step("a", lambda outputs, run: "A")
+    b = Step("b", lambda outputs, run: "B")
+    joined = Step("joined", lambda outputs, run: "+".join(output.raw for output in outputs), context=[b, a])
+    started, completed = [], []
+
+    outputs, graph = run_crew_tasks(
+        [a, b, joined],
+        on_task_start=started.append,
+        on_task_complete=lambda name, output: completed.append(name),
+    )
+
+    assert str(outputs["joined"]) == "B+A"
+    assert sorted(started) == sorted(completed) == ["a", "b", "joined"]
+    assert set(graph.timings) == {"a", "b", "joined"}
+
+
+def test_steps_can_run_more_tasks_through_the_run():
+    inner = Step("inner", lambda outputs, run: "inner output")
+
+    def outer(outputs, run):
+        return "outer:" + run.run_tasks([inner])["inner"].raw
+
+    outputs, graph = run_crew_tasks([Step("outer", outer, tasks=[inner])])
+
+    assert outputs["outer"].raw == "outer:inner output"
+    assert set(graph.timings) == {"outer", "inner"}
@@ -0,0 +1,48 @@
+from sections import SectionIndex, split_sections
+
+DOCUMENT = """Prepared for the finance team.
+
+# 1 Introduction
+
+The portal lets customers pay invoices.
+
+## 1.1 Scope
+
+Card payments only.
+
+2 Reporting
+Finance downloads monthly reports.
+"""
+
+
+def test_split_sections_follows_markdown_and_numbered_headings():
+    sections = split_sections(DOCUMENT)
+
+    assert [(section["title"], section["level"]) for section in sections] == [
+        ("Preamble", 0),
+        ("1 Introduction", 1),
+        ("1 Introduction > 1.1 Scope", 2),
+        ("2 Reporting", 1),
+    ]
+    assert sections[2]["text"] == "## 1.1 Scope\n\nCard payments only."
+
+
+def test_long_sections_are_split_on_paragraphs():
+    body = "\n\n".join(f"Paragraph {i} " + "word " * 20 for i in range(6))
+
+    sections = split_sections(f"# Notes\n\n{body}", max_chars=300)
+
+    assert len(sections) > 1
+    assert sections[0]["title"] == f"Notes (part 1/{len(sections)})"
+    assert all(len(section["text"]) <= 300 for section in sections)
+
+
+def test_search_ranks_matching_sections_and_returns_them_in_document_order():
+    index = SectionIndex.from_text(DOCUMENT)
+
+    assert [section["title"] for section in index.search("monthly reports", top_k=1)] == ["2 Reporting"]
+    assert [section["title"] for section in index.search("card payments invoices")] == [
+        "1 Introduction", "1 Introduction > 1.1 Scope",
+    ]
+    assert index.search("the of and") == []
+    assert index.outline() == ["Preamble", "1 Introduction", "1 Introduction > 1.1 Scope", "2 Reporting"]
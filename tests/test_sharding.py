@@ -0,0 +1,67 @@
+from sharding import assign_test_case_ids, feature_code, merge_shards, split_scenarios
+
+SCENARIOS = """Scenarios for the patient portal.
+
+## 1. Patient Registration
+- Register with an email address
+- Register with an email that is already taken
+
+## 2. Billing
+- Pay an invoice by card
+"""
+
+
+def test_scenarios_split_along_headings_with_the_preamble_in_every_shard():
+    shards = split_scenarios(SCENARIOS)
+
+    assert [shard["feature"] for shard in shards] == ["Patient Registration", "Billing"]
+    assert all(shard["text"].startswith("Scenarios for the patient portal.\n\n") for shard in shards)
+    assert "already taken" in shards[0]["text"] and "already taken" not in shards[1]["text"]
+
+
+def test_scenarios_without_headings_split_along_bold_items():
+    text = "Scenarios:\n1. **Patient Registration**\n   - Register\n2. **Billing:**\n   - Pay an invoice\n"
+
+    shards = split_scenarios(text)
+
+    assert [shard["feature"] for shard in shards] == ["Patient Registration", "Billing"]
+    assert shards[1]["text"] == "Scenarios:\n\n2. **Billing:**\n   - Pay an invoice"
+
+
+def test_scenarios_without_features_are_one_shard():
+    assert split_scenarios("Pay an invoice by card.") == [{"feature": "All Features", "text": "Pay an invoice by card."}]
+
+
+def test_small_neighbouring_features_are_packed_together():
+    text = "".join(f"## {name}\n- {name} scenario\n\n" for name in ("Login", "Billing", "Reports", "Refunds"))
+
+    shards = split_scenarios(text, max_shards=2)
+
+    assert [shard["feature"] for shard in shards] == ["Login, Billing", "Reports, Refunds"]
+    assert "Billing scenario" in shards[0]["text"]
+
+
+def test_feature_codes_are_stable_and_unique():
+    assert feature_code("Patient Registration & Login") == "PATIENT-REGISTRATION-LOGIN"
+    assert feature_code("Login, Billing") == "LOGIN"
+    assert feature_code("Billing", taken={"BILLING"}) == "BILLING-2"
+    assert feature_code("???") == "FEATURE"
+
+
+def test_test_case_ids_are_numbered_per_feature():
+    text, count = assign_test_case_ids("### TC: Pay by card\nSteps\n### Test Case 7: Pay by transfer\n", "BILLING")
+
+    assert count == 2
+    assert text == "### TC-BILLING-001: Pay by card\nSteps\n### TC-BILLING-002: Pay by transfer\n"
+
+
+def test_merge_keeps_shard_order_and_numbers_each_feature_on_its_own():
+    shards = [{"feature": "Login", "text": ""}, {"feature": "Billing", "text": ""}]
+    outputs = ["### TC: Sign in\n", "### TC: Pay by card\n\n### TC: Pay by transfer\n"]
+
+    merged = merge_shards(shards, outputs)
+
+    assert merged == (
+        "## Login\n\n### TC-LOGIN-001: Sign in\n\n"
+        "## Billing\n\n### TC-BILLING-001: Pay by card\n\n### TC-BILLING-002: Pay by transfer\n"
+    )
@@ -0,0 +1,57 @@
+import threading
+
+from streaming import DocumentStream, current_stream, extract_document, stream_to
+
+
+def test_final_answer_is_the_document():
+    raw = "Thought: I now know the final answer\nFinal Answer: # SRS\n\n1 Introduction"
+
+    assert extract_document(raw) == "# SRS\n\n1 Introduction"
+
+
+def test_partial_tool_content_is_decoded():
+    raw = 'Action: FileWriterTool\nAction Input: {"filename": "srs.md", "content": "# SRS\\n\\nCustomers pay \\"inv'
+
+    assert extract_document(raw) == '# SRS\n\nCustomers pay "inv'
+
+
+def test_a_trailing_half_escape_is_dropped():
+    assert extract_document('{"content": "Caf\\u00') == "Caf"
+    assert extract_document('{"content": "line\\') == "line"
+
+
+def test_raw_newlines_in_tool_content_are_allowed():
+    assert extract_document('{"content": "# SRS\n\nScope"}') == "# SRS\n\nScope"
+
+
+def test_scaffolding_alone_shows_nothing():
+    assert extract_document("Thought: I should read the BRD first") == ""
+
+
+def test_short_closing_answer_keeps_the_written_document():
+    stream = DocumentStream()
+    stream.begin()
+    stream.write('Action Input: {"content": "# SRS\\n\\nCustomers pay invoices online."}')
+    stream.begin()
+    for token in ("Final ", "Answer: ", "Saved."):
+        stream.write(token)
+
+    assert stream.calls == 2
+    assert stream.text() == "# SRS\n\nCustomers pay invoices online."
+    stream.write(" The SRS covers billing, refunds, reporting and user accounts in full detail.")
+    assert stream.text().startswith("Saved. The SRS")
+
+
+def test_stream_is_bound_to_the_thread_for_the_block():
+    stream = DocumentStream()
+    seen = []
+
+    with stream_to(stream):
+        assert current_stream() is stream
+        thread = threading.Thread(target=lambda: seen.append(current_stream()))
+        thread.start()
+        thread.join()
+
+    assert seen == [None]
+    assert current_stream() is None
+    assert stream.finished
@@ -0,0 +1,146 @@
+"""Per-run workspaces so concurrent sessions never share input or output files.
+
+Every generation gets its own directory under WORKSPACE_ROOT holding the
+uploaded inputs and the documents the agents write. Old workspaces are purged
+by age and count whenever a new one is created, except those held by a job that
+is queued, running or still shown to its user. Inputs go through the blob
+store first, which streams and hashes them and enforces the upload size limit.
+
+Tool classes are imported when a tool is first requested, so importing this
+module does not pull in crewai.
+"""
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from blobs import blob_store
+from ingest import ingest_file
+
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "workspaces")
+WORKSPACE_RETENTION_HOURS = float(os.getenv("WORKSPACE_RETENTION_HOURS", "24"))
+WORKSPACE_MAX_COUNT = int(os.getenv("WORKSPACE_MAX_COUNT", "100"))
+
+# Reference counts of workspaces in use, by absolute path; purging skips them.
+_held = {}
+_held_lock = threading.Lock()
+
+
+class Workspace:
+    """Directory holding one run's inputs and outputs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.run_id = os.path.basename(path)
+
+    @classmethod
+    def create(cls, root=WORKSPACE_ROOT):
+        """Create a uniquely named workspace, purging expired ones first."""
+        purge_workspaces(root)
+        run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(root, run_id)
+        os.makedirs(path)
+        return cls(path)
+
+    def hold(self):
+        """Protect the workspace from purging until a matching release()."""
+        path = os.path.abspath(self.path)
+        with _held_lock:
+            _held[path] = _held.get(path, 0) + 1
+
+    def release(self):
+        path = os.path.abspath(self.path)
+        with _held_lock:
+            if _held.get(path, 0) <= 1:
+                _held.pop(path, None)
+            else:
+                _held[path] -= 1
+
+    def file_path(self, file_name):
+        """Path of `file_name` inside the workspace."""
+        return os.path.join(self.path, file_name)
+
+    def save_upload(self, uploaded_file, file_name):
+        """Save a Streamlit upload into the workspace as text (PDFs are extracted) and return its path.
+
+        Raises blobs.UploadTooLarge when the upload is over the size limit.
+        """
+        uploaded_file.seek(0)
+        digest = blob_store.put_stream(uploaded_file, name=getattr(uploaded_file, "name", file_name))
+        return ingest_file(blob_store.path(digest), self.file_path(file_name), digest=digest)
+
+    def add_file(self, source_path, file_name):
+        """Copy a document from disk into the workspace as text (PDFs are extracted) and return its path."""
+        digest = blob_store.put_file(source_path)
+        return ingest_file(blob_store.path(digest), self.file_path(file_name), digest=digest)
+
+    def file_reader(self, file_name):
+        """FileReadTool bound to a file in this workspace."""
+        from crewai_tools import FileReadTool
+
+        return FileReadTool(file_path=self.file_path(file_name))
+
+    def section_search(self, file_name, document_label):
+        """Section retrieval tool over a file in this workspace."""
+        from retrieval import SectionSearchTool
+
+        return SectionSearchTool(file_path=self.file_path(file_name), document_label=document_label)
+
+    def file_writer(self, file_name):
+        """File writer tool that can only write `file_name` in this workspace."""
+        from agent_tools import WorkspaceFileWriterTool
+
+        return WorkspaceFileWriterTool(directory=self.path, filename=file_name)
+
+    def bind_tool(self, tool):
+        """Rebuild a tool made for another workspace so it uses the same file name in this one.
+
+        Tools that are not tied to a workspace file are returned unchanged.
+        """
+        from crewai_tools import FileReadTool
+
+        from agent_tools import WorkspaceFileWriterTool
+        from retrieval import SectionSearchTool
+
+        if isinstance(tool, WorkspaceFileWriterTool):
+            return self.file_writer(tool.filename)
+        if isinstance(tool, SectionSearchTool):
+            return self.section_search(os.path.basename(tool.file_path), tool.document_label)
+        if isinstance(tool, FileReadTool) and tool.file_path:
+            return self.file_reader(os.path.basename(tool.file_path))
+        return tool
+
+    def read_text(self, file_name):
+        """Read a text file from the workspace."""
+        with open(self.file_path(file_name), "r") as f:
+            return f.read()
+
+    def cleanup(self):
+        """Remove the workspace and everything in it."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def purge_workspaces(root=WORKSPACE_ROOT, max_age_hours=WORKSPACE_RETENTION_HOURS, max_count=WORKSPACE_MAX_COUNT):
+    """Delete workspaces older than `max_age_hours`, then the oldest beyond `max_count`.
+
+    Held workspaces (see Workspace.hold) are never deleted and do not count towards `max_count`.
+    """
+    if not os.path.isdir(root):
+        return
+    with _held_lock:
+        held = set(_held)
+    now = time.time()
+    workspaces = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path) or os.path.abspath(path) in held:
+            continue
+        mtime = os.path.getmtime(path)
+        if max_age_hours and now - mtime > max_age_hours * 3600:
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            workspaces.append((mtime, path))
+    for _, path in sorted(workspaces, reverse=True)[max_count:]:
+        shutil.rmtree(path, ignore_errors=True)